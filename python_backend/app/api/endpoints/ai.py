@@ -1,19 +1,33 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import asyncio
+import hashlib
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
-from app.core.database import get_db
+from app.core.cache import SingleFlight
+from app.core.database import get_db, get_read_db
+from app.core.metrics import record_cache
 from app.models.models import Audit, AuditItem
 from app.schemas.schemas import (
     PhotoAnalysisRequest, PhotoAnalysisResponse,
     ReportGenerationRequest, ReportGenerationResponse,
-    ScoreSuggestionRequest, ScoreSuggestionResponse
+    ScoreSuggestionRequest, ScoreSuggestionResponse,
+    SimilarFindingsRequest, SimilarFinding
 )
+from app.services.ai_writeback import ai_results
 from app.services.gemini_service import gemini_service
+from app.services.idempotency import IdempotencyKeyReused, load_result, store_result
+from app.services.report_prompts import compact_json, report_audit_data, report_findings
+from app.services.search import item_text
 from app.api.endpoints.auth import get_current_user
 
 router = APIRouter()
 
+# Shared computations for identical in-flight AI requests. This only coalesces
+# requests within one worker; replay across workers comes from the stored
+# idempotency results.
+ai_flights = SingleFlight("ai_single_flight")
+
 @router.post("/analyze-photo", response_model=PhotoAnalysisResponse)
 async def analyze_photo(
     request: PhotoAnalysisRequest,
@@ -60,12 +74,17 @@ async def suggest_score(
 @router.post("/generate-report/{audit_id}", response_model=ReportGenerationResponse)
 async def generate_audit_report(
     audit_id: int,
-    background_tasks: BackgroundTasks,
+    response: Response,
     include_action_plan: bool = True,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Generate comprehensive audit report using Gemini AI"""
+    """Generate comprehensive audit report using Gemini AI
+    
+    Concurrent identical requests share one generation, and retries carrying the
+    same Idempotency-Key get the original response back.
+    """
     # Get audit with all related data
     audit = db.query(Audit).options(
         joinedload(Audit.property),
@@ -81,73 +100,36 @@ async def generate_audit_report(
     if current_user.role not in ["admin", "reviewer"] and audit.auditor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    try:
-        # Prepare audit data for AI analysis
-        audit_data = {
-            "property_name": audit.property.name if audit.property else "Unknown",
-            "location": audit.property.location if audit.property else "Unknown",
-            "audit_date": audit.created_at.isoformat() if audit.created_at else None,
-            "auditor_name": audit.auditor.name if audit.auditor else "Unknown",
-            "overall_score": audit.overall_score,
-            "cleanliness_score": audit.cleanliness_score,
-            "branding_score": audit.branding_score,
-            "operational_score": audit.operational_score,
-            "audit_items": [
-                {
-                    "category": item.category,
-                    "item": item.item,
-                    "score": item.score,
-                    "comments": item.comments,
-                    "photos_count": len(item.photos) if item.photos else 0
-                }
-                for item in audit.audit_items
-            ]
-        }
-        
-        # Generate AI report
-        ai_report = await gemini_service.generate_audit_report(audit_data)
-        
-        # Generate action plan if requested
-        ai_action_plan = None
-        if include_action_plan and audit.audit_items:
-            findings = [
-                {
-                    "category": item.category,
-                    "issue": item.item,
-                    "score": item.score,
-                    "comments": item.comments
-                }
-                for item in audit.audit_items if item.score and item.score < 4
-            ]
-            
-            if findings:
-                ai_action_plan = await gemini_service.generate_action_plan(
-                    findings, 
-                    "luxury hotel"
-                )
-        
-        # Generate insights
-        ai_insights = await gemini_service.generate_compliance_insights(audit_data)
-        
-        # Store AI results in database
-        background_tasks.add_task(
-            update_audit_ai_data,
-            db, audit_id, ai_report, ai_action_plan, ai_insights
-        )
-        
-        return ReportGenerationResponse(
-            report=ai_report,
-            action_plan=ai_action_plan,
-            insights=ai_insights
+    # Prepare audit data for AI analysis
+    audit_data = report_audit_data(audit)
+    findings = report_findings(audit) if include_action_plan else []
+    previous_report = audit.ai_report
+    
+    async def generate():
+        # Generate AI report, reusing section analyses whose items have not changed
+        ai_report, ai_action_plan, ai_insights = await asyncio.gather(
+            gemini_service.regenerate_audit_report(audit_data, previous_report),
+            gemini_service.generate_action_plan(findings, "luxury hotel") if findings else _none(),
+            gemini_service.generate_compliance_insights(audit_data),
         )
-        
+        # Queue AI results for the batched database write
+        await asyncio.to_thread(ai_results.submit_audit, audit_id, ai_report, ai_action_plan, ai_insights)
+        return ReportGenerationResponse(**ai_report).dict()
+    
+    request_key = f"generate-report:{audit_id}:{include_action_plan}"
+    try:
+        return await _single_flight(request_key, _digest(audit_data, findings), idempotency_key,
+                                    current_user.id, response, generate)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate report: {str(e)}")
 
 @router.post("/update-item-ai/{item_id}")
 async def update_audit_item_ai(
     item_id: int,
-    background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -156,37 +138,34 @@ async def update_audit_item_ai(
     if not item:
         raise HTTPException(status_code=404, detail="Audit item not found")
     
-    try:
+    description, category = item.item, item.category
+    photos, comments = item.photos or [], item.comments or ""
+    
+    async def analyze():
         # Get AI score suggestion
-        score_suggestion = await gemini_service.suggest_audit_score(
-            item.item,
-            item.photos or [],
-            item.comments or ""
-        )
+        score_suggestion = await gemini_service.suggest_audit_score(description, photos, comments)
         
-        # Analyze photos if available
-        ai_analysis = {}
-        if item.photos:
-            for i, photo in enumerate(item.photos):
-                if photo:  # Assuming base64 encoded images
-                    photo_analysis = await gemini_service.analyze_audit_photo(
-                        photo,
-                        f"{item.category}: {item.item}"
-                    )
-                    ai_analysis[f"photo_{i+1}"] = photo_analysis
+        # Analyze photos if available (assuming base64 encoded images)
+        indexed = [(i, photo) for i, photo in enumerate(photos) if photo]
+        analyses = await asyncio.gather(*(
+            gemini_service.analyze_audit_photo(photo, f"{category}: {description}") for _, photo in indexed
+        ))
+        ai_analysis = {f"photo_{i+1}": analysis for (i, _), analysis in zip(indexed, analyses)}
         
-        # Update item with AI data
-        background_tasks.add_task(
-            update_audit_item_ai_data,
-            db, item_id, score_suggestion, ai_analysis
-        )
+        # Queue item AI data for the batched database write
+        await asyncio.to_thread(ai_results.submit_item, item_id, score_suggestion, ai_analysis)
         
         return {
-            "message": "AI analysis queued successfully",
+            "message": "AI analysis saved successfully",
             "suggested_score": score_suggestion.get("suggested_score"),
             "ai_analysis": ai_analysis
         }
-        
+    
+    try:
+        return await _single_flight(f"update-item-ai:{item_id}", _digest(description, category, photos, comments),
+                                    idempotency_key, current_user.id, response, analyze)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update item AI: {str(e)}")
 
@@ -197,7 +176,9 @@ async def get_audit_insights(
     current_user = Depends(get_current_user)
 ):
     """Get AI-generated insights for an audit"""
-    audit = db.query(Audit).filter(Audit.id == audit_id).first()
+    audit = db.query(Audit).options(
+        joinedload(Audit.property)
+    ).filter(Audit.id == audit_id).first()
     if not audit:
         raise HTTPException(status_code=404, detail="Audit not found")
     
@@ -230,24 +211,54 @@ async def get_audit_insights(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate insights: {str(e)}")
 
-# Background task functions
-def update_audit_ai_data(db: Session, audit_id: int, ai_report: dict, ai_action_plan: dict, ai_insights: dict):
-    """Background task to update audit with AI-generated data"""
-    audit = db.query(Audit).filter(Audit.id == audit_id).first()
-    if audit:
-        audit.ai_report = ai_report
-        if ai_action_plan:
-            audit.action_plan = ai_action_plan
-        audit.ai_insights = ai_insights
-        db.commit()
+@router.post("/similar-findings", response_model=List[SimilarFinding])
+async def similar_findings(
+    request: SimilarFindingsRequest,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """Find past findings similar to a text or an audit item, with how they were resolved"""
+    text = request.text
+    if request.audit_item_id is not None:
+        item = db.query(AuditItem).filter(AuditItem.id == request.audit_item_id).first()
+        if not item:
+            raise HTTPException(status_code=404, detail="Audit item not found")
+        text = text or item_text(item)
+    if not text:
+        raise HTTPException(status_code=400, detail="Provide text or audit_item_id")
+    
+    # Imported here so NumPy stays out of application startup
+    from app.services.similarity import IndexNotReady, find_similar
+    
+    try:
+        return await find_similar(db, text, limit=min(max(request.limit, 1), 50),
+                                  exclude_item_id=request.audit_item_id)
+    except IndexNotReady:
+        raise HTTPException(status_code=503, detail="Similar-findings index is loading, retry shortly",
+                            headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find similar findings: {str(e)}")
 
-def update_audit_item_ai_data(db: Session, item_id: int, score_suggestion: dict, ai_analysis: dict):
-    """Background task to update audit item with AI data"""
-    item = db.query(AuditItem).filter(AuditItem.id == item_id).first()
-    if item:
-        item.ai_suggested_score = score_suggestion.get("suggested_score")
-        item.ai_analysis = {
-            "score_suggestion": score_suggestion,
-            "photo_analysis": ai_analysis
-        }
-        db.commit()
+async def _none():
+    return None
+
+def _digest(*inputs) -> str:
+    return hashlib.sha256(compact_json(inputs).encode()).hexdigest()
+
+async def _single_flight(request_key: str, input_digest: str, idempotency_key: Optional[str],
+                         user_id: int, response: Response, compute):
+    """Run compute once for concurrent identical requests; replay stored results for repeated Idempotency-Keys"""
+    if idempotency_key:
+        try:
+            found, result = await asyncio.to_thread(load_result, user_id, idempotency_key, request_key, input_digest)
+        except IdempotencyKeyReused:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        record_cache("idempotency", found)
+        if found:
+            response.headers["Idempotent-Replayed"] = "true"
+            return result
+    
+    result = await ai_flights.do(f"{request_key}:{input_digest}", compute)
+    if idempotency_key:
+        await asyncio.to_thread(store_result, user_id, idempotency_key, request_key, input_digest, result)
+    return result
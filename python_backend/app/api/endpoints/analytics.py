@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_read_db
+from app.core.metrics import record_cache
+from app.schemas.schemas import ScoreAnalytics
+from app.api.endpoints.auth import get_current_user
+
+router = APIRouter()
+
+analytics_cache = TTLCache(settings.ANALYTICS_CACHE_SECONDS, maxsize=256)
+
+@router.get("/scores", response_model=ScoreAnalytics)
+async def score_analytics(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    region: Optional[str] = None,
+    min_audits: int = Query(5, ge=2),
+    limit: int = Query(20, ge=1, le=200),
+    include_items: bool = True,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """Score percentiles, auditor bias, score changes and outlier audits across the portfolio"""
+    if current_user.role not in ["admin", "corporate"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    key = (date_from, date_to, region, min_audits, limit, include_items)
+    result = analytics_cache.get(key)
+    record_cache("score_analytics", result is not None)
+    if result is not None:
+        return result
+    
+    # Imported here so NumPy stays out of application startup
+    from app.services.score_analytics import analyze_scores
+    
+    result = await asyncio.to_thread(analyze_scores, db, date_from, date_to, region, min_audits, limit, include_items)
+    analytics_cache.set(key, result)
+    return result
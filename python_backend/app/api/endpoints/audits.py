@@ -1,14 +1,34 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session, joinedload
-from app.core.database import get_db
+from sqlalchemy.orm.exc import StaleDataError
+from app.core.database import get_db, get_read_db
 from app.models.models import Audit, AuditItem, Property, User
 from app.schemas.schemas import (
     AuditResponse, AuditCreate, AuditUpdate,
-    AuditItemResponse, AuditItemCreate, AuditItemUpdate
+    AuditItemResponse, AuditItemCreate, AuditItemUpdate,
+    SyncItem, SyncRequest, SyncResponse, PhotoDerivatives
 )
+from app.services.photo_derivatives import (
+    DIGEST_PATTERN, PHOTO_FORMATS, PHOTO_SIZES, PhotoError, cached_derivative, generate_item_derivatives, get_derivative, item_photos
+)
+from app.services.report_renderer import REPORT_FORMATS, ReportRenderError, get_rendered_report
+from app.services.sync import apply_sync
 from app.api.endpoints.auth import get_current_user
 
+def schedule_finding_index(background_tasks: BackgroundTasks, item_ids=(), audit_ids=()):
+    # Imported here so NumPy stays out of application startup
+    from app.services.similarity import index_findings
+    background_tasks.add_task(index_findings, item_ids=item_ids, audit_ids=audit_ids)
+
+def schedule_photo_derivatives(background_tasks: BackgroundTasks, item: AuditItem):
+    if item.photos:
+        background_tasks.add_task(generate_item_derivatives, item.id)
+
+# Derivative URLs contain the hash of the original, so their content never changes
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
 router = APIRouter()
 
 @router.get("/", response_model=List[AuditResponse])
@@ -17,7 +37,7 @@ async def get_audits(
     reviewer_id: Optional[int] = Query(None),
     property_id: Optional[int] = Query(None),
     status: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     query = db.query(Audit).options(
@@ -39,8 +59,27 @@ async def get_audits(
     audits = query.all()
     return audits
 
+@router.post("/sync", response_model=SyncResponse)
+async def sync_audit_items(
+    sync: SyncRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Apply a batch of offline item edits and return everything changed since the client's cursor"""
+    try:
+        result = apply_sync(db, current_user, sync)
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Items changed during sync, retry")
+    applied = set(result["applied"])
+    commented = {change.item_id for change in sync.changes if "comments" in change.model_fields_set} & applied
+    if commented:
+        schedule_finding_index(background_tasks, item_ids=sorted(commented))
+    return result
+
 @router.get("/{audit_id}", response_model=AuditResponse)
-async def get_audit(audit_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def get_audit(audit_id: int, db: Session = Depends(get_read_db), current_user = Depends(get_current_user)):
     audit = db.query(Audit).options(
         joinedload(Audit.property),
         joinedload(Audit.auditor),
@@ -53,7 +92,7 @@ async def get_audit(audit_id: int, db: Session = Depends(get_db), current_user =
     return audit
 
 @router.post("/", response_model=AuditResponse)
-async def create_audit(audit: AuditCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def create_audit(audit: AuditCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     if current_user.role not in ["admin"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
@@ -61,10 +100,12 @@ async def create_audit(audit: AuditCreate, db: Session = Depends(get_db), curren
     db.add(db_audit)
     db.commit()
     db.refresh(db_audit)
+    if db_audit.findings:
+        schedule_finding_index(background_tasks, audit_ids=[db_audit.id])
     return db_audit
 
 @router.patch("/{audit_id}", response_model=AuditResponse)
-async def update_audit(audit_id: int, audit_update: AuditUpdate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def update_audit(audit_id: int, audit_update: AuditUpdate, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     audit = db.query(Audit).filter(Audit.id == audit_id).first()
     if not audit:
         raise HTTPException(status_code=404, detail="Audit not found")
@@ -79,15 +120,49 @@ async def update_audit(audit_id: int, audit_update: AuditUpdate, db: Session = D
     
     db.commit()
     db.refresh(audit)
+    if "findings" in update_data:
+        schedule_finding_index(background_tasks, audit_ids=[audit.id])
     return audit
 
+@router.get("/{audit_id}/report")
+async def download_audit_report(
+    audit_id: int,
+    format: str = Query("html"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """Download the rendered audit report, served from the report cache when up to date"""
+    if format not in REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported report format: {format}")
+    
+    audit = db.query(Audit).options(
+        joinedload(Audit.property),
+        joinedload(Audit.auditor),
+        joinedload(Audit.reviewer),
+        joinedload(Audit.audit_items)
+    ).filter(Audit.id == audit_id).first()
+    
+    if not audit:
+        raise HTTPException(status_code=404, detail="Audit not found")
+    
+    try:
+        path = await get_rendered_report(audit, format)
+    except ReportRenderError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    return FileResponse(
+        path,
+        media_type=REPORT_FORMATS[format],
+        filename=f"audit-{audit_id}-report.{format}"
+    )
+
 @router.get("/{audit_id}/items", response_model=List[AuditItemResponse])
-async def get_audit_items(audit_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def get_audit_items(audit_id: int, db: Session = Depends(get_read_db), current_user = Depends(get_current_user)):
     items = db.query(AuditItem).filter(AuditItem.audit_id == audit_id).all()
     return items
 
 @router.post("/{audit_id}/items", response_model=AuditItemResponse)
-async def create_audit_item(audit_id: int, item: AuditItemCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def create_audit_item(audit_id: int, item: AuditItemCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     # Verify audit exists
     audit = db.query(Audit).filter(Audit.id == audit_id).first()
     if not audit:
@@ -99,10 +174,13 @@ async def create_audit_item(audit_id: int, item: AuditItemCreate, db: Session =
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
+    if db_item.comments:
+        schedule_finding_index(background_tasks, item_ids=[db_item.id])
+    schedule_photo_derivatives(background_tasks, db_item)
     return db_item
 
 @router.patch("/items/{item_id}", response_model=AuditItemResponse)
-async def update_audit_item(item_id: int, item_update: AuditItemUpdate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def update_audit_item(item_id: int, item_update: AuditItemUpdate, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     item = db.query(AuditItem).filter(AuditItem.id == item_id).first()
     if not item:
         raise HTTPException(status_code=404, detail="Audit item not found")
@@ -110,7 +188,89 @@ async def update_audit_item(item_id: int, item_update: AuditItemUpdate, db: Sess
     update_data = item_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(item, field, value)
+    if update_data:
+        item.version = item.version + 1
     
-    db.commit()
+    try:
+        db.commit()
+    except StaleDataError:
+        # Another user's edit or an offline sync saved the item since it was loaded
+        db.rollback()
+        current = db.query(AuditItem).filter(AuditItem.id == item_id).first()
+        if current is None:
+            raise HTTPException(status_code=404, detail="Audit item not found")
+        raise HTTPException(status_code=409, detail={
+            "message": "Audit item was modified concurrently",
+            "item": SyncItem.model_validate(current).model_dump(mode="json"),
+        })
     db.refresh(item)
+    if update_data.keys() & {"comments", "category", "item"}:
+        schedule_finding_index(background_tasks, item_ids=[item.id])
+    if "photos" in update_data:
+        schedule_photo_derivatives(background_tasks, item)
     return item
+
+@router.get("/items/{item_id}/photos", response_model=List[PhotoDerivatives])
+async def get_audit_item_photos(
+    item_id: int,
+    format: str = Query("webp"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """Thumbnail and medium URLs for each image on an audit item"""
+    if format not in PHOTO_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported photo format: {format}")
+    
+    # Digests are stored when photos are written, so the originals are not loaded here
+    item = db.query(AuditItem.photo_digests).filter(AuditItem.id == item_id).first()
+    if not item:
+        raise HTTPException(status_code=404, detail="Audit item not found")
+    
+    return [
+        {
+            "index": photo["index"],
+            "digest": photo["digest"],
+            "urls": {
+                size: f"/api/audits/items/{item_id}/photos/{photo['digest']}/{size}.{format}"
+                for size in PHOTO_SIZES
+            },
+        }
+        for photo in item.photo_digests or []
+    ]
+
+@router.get("/items/{item_id}/photos/{digest}/{size}.{format}")
+async def get_audit_item_photo(
+    item_id: int,
+    digest: str,
+    size: str,
+    format: str,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """Serve a photo derivative, rendering it in the worker pool if it is not cached yet"""
+    if size not in PHOTO_SIZES or format not in PHOTO_FORMATS or not DIGEST_PATTERN.match(digest):
+        raise HTTPException(status_code=404, detail="Photo not found")
+    
+    # Check the digest belongs to this item even on a cache hit, so cached photos
+    # cannot be fetched through an arbitrary item. Only the stored digests are
+    # read; the originals are loaded on a cache miss.
+    item = db.query(AuditItem.photo_digests).filter(AuditItem.id == item_id).first()
+    if item is None or not any(photo["digest"] == digest for photo in item.photo_digests or []):
+        raise HTTPException(status_code=404, detail="Photo not found")
+    
+    path = cached_derivative(digest, size, format)
+    if path is None:
+        item = db.query(AuditItem.photos).filter(AuditItem.id == item_id).first()
+        photo = next((photo for photo in item_photos(item.photos if item else None) if photo["digest"] == digest), None)
+        if photo is None:
+            raise HTTPException(status_code=404, detail="Photo not found")
+        try:
+            path = await get_derivative(photo["content"], size, format, digest=digest)
+        except PhotoError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    
+    return FileResponse(
+        path,
+        media_type=PHOTO_FORMATS[format],
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    )
@@ -0,0 +1,22 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.core.database import get_read_db
+from app.schemas.schemas import DashboardSummary
+from app.services.dashboard import get_summary, managed_property_ids
+from app.api.endpoints.auth import get_current_user
+
+router = APIRouter()
+
+@router.get("/summary", response_model=DashboardSummary)
+async def dashboard_summary(
+    property_id: Optional[int] = None,
+    limit: int = Query(5, ge=1, le=20),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """Counts and top-N lists for the current user's role landing page"""
+    if (current_user.role == "hotelgm" and property_id is not None
+            and property_id not in managed_property_ids(db, current_user)):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return get_summary(db, current_user, property_id=property_id, limit=limit)
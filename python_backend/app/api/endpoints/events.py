@@ -0,0 +1,75 @@
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from app.core.database import SessionLocal
+from app.core.events import get_event_bus
+from app.core.security import verify_token
+from app.models.models import Audit, Property, User
+from app.services.dashboard import managed_property_ids
+
+router = APIRouter()
+
+def _can_view_property(db, user: User, property_id: int) -> bool:
+    # GMs are scoped to their properties as on the dashboard; auditors follow only their own audits
+    if user.role == "hotelgm":
+        return property_id in managed_property_ids(db, user)
+    return user.role != "auditor"
+
+def _authorize(token: str, audit_id: int = None, property_id: int = None) -> bool:
+    """Validate the token passed as ?token= (browsers cannot set headers on WebSockets)
+    and check the user may see the audit or property; blocking, run it in a thread"""
+    username = verify_token(token) if token else None
+    if username is None:
+        return False
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            return False
+        if audit_id is not None:
+            audit = db.query(Audit.auditor_id, Audit.property_id).filter(Audit.id == audit_id).first()
+            if audit is None:
+                return False
+            # Same rule as the AI report endpoints: auditors see the audits assigned to them
+            if user.role == "auditor":
+                return audit.auditor_id == user.id
+            return _can_view_property(db, user, audit.property_id)
+        if db.query(Property.id).filter(Property.id == property_id).first() is None:
+            return False
+        return _can_view_property(db, user, property_id)
+    finally:
+        db.close()
+
+async def _stream(websocket: WebSocket, topic: str):
+    """Forward events on topic until the client disconnects"""
+    async with get_event_bus().subscribe(topic) as events:
+        await websocket.accept()
+        
+        async def forward():
+            async for event in events:
+                await websocket.send_json(event)
+        
+        forwarder = asyncio.create_task(forward())
+        try:
+            # Clients only listen; receiving surfaces the disconnect
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            forwarder.cancel()
+
+@router.websocket("/audits/{audit_id}")
+async def audit_events(websocket: WebSocket, audit_id: int, token: str = ""):
+    """Push changes to an audit and its items"""
+    if not await asyncio.to_thread(_authorize, token, audit_id=audit_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await _stream(websocket, f"audit:{audit_id}")
+
+@router.websocket("/properties/{property_id}")
+async def property_events(websocket: WebSocket, property_id: int, token: str = ""):
+    """Push changes to every audit of a property"""
+    if not await asyncio.to_thread(_authorize, token, property_id=property_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await _stream(websocket, f"property:{property_id}")
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.health import probe_dependencies, readiness
+from app.services.gemini_service import gemini_service
+
+router = APIRouter()
+
+@router.get("/live")
+async def liveness():
+    """The worker's event loop is responsive"""
+    return {"status": "alive", "uptime_seconds": readiness.report()["uptime_seconds"]}
+
+@router.get("/ready")
+async def readiness_check():
+    """The worker is warm, not draining, and can reach its databases
+    
+    LLM model health is reported for information only; routing works around slow or failing models.
+    """
+    dependencies = await probe_dependencies()
+    ready = readiness.ready and all(probe["ok"] for probe in dependencies.values())
+    body = {"status": "ready" if ready else "not_ready", "dependencies": dependencies, **readiness.report(),
+            "llm_models": gemini_service.router.snapshot()}
+    return JSONResponse(body, status_code=200 if ready else 503)
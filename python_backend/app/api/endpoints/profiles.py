@@ -0,0 +1,32 @@
+import json
+import os
+import re
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from app.core.profiling import profile_path
+from app.api.endpoints.auth import get_current_user
+
+router = APIRouter()
+
+def _existing_profile(profile_id: str, ext: str) -> str:
+    if not re.fullmatch(r"[0-9a-f]{32}", profile_id):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    path = profile_path(profile_id, ext)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return path
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str, current_user = Depends(get_current_user)):
+    """Flamegraph-style HTML profile of a profiled request"""
+    if current_user.role not in ["admin"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return FileResponse(_existing_profile(profile_id, "html"), media_type="text/html")
+
+@router.get("/{profile_id}/breakdown")
+async def get_profile_breakdown(profile_id: str, current_user = Depends(get_current_user)):
+    """SQL statements and Gemini spans captured during a profiled request"""
+    if current_user.role not in ["admin"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    with open(_existing_profile(profile_id, "json")) as f:
+        return json.load(f)
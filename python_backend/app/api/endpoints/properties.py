@@ -1,7 +1,7 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.models.models import Property
 from app.schemas.schemas import PropertyResponse, PropertyCreate
 from app.api.endpoints.auth import get_current_user
@@ -9,12 +9,12 @@ from app.api.endpoints.auth import get_current_user
 router = APIRouter()
 
 @router.get("/", response_model=List[PropertyResponse])
-async def get_properties(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def get_properties(db: Session = Depends(get_read_db), current_user = Depends(get_current_user)):
     properties = db.query(Property).all()
     return properties
 
 @router.get("/{property_id}", response_model=PropertyResponse)
-async def get_property(property_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+async def get_property(property_id: int, db: Session = Depends(get_read_db), current_user = Depends(get_current_user)):
     property = db.query(Property).filter(Property.id == property_id).first()
     if not property:
         raise HTTPException(status_code=404, detail="Property not found")
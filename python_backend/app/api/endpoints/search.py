@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.core.database import get_read_db
+from app.schemas.schemas import SearchResult
+from app.services.search import SearchUnavailable, search_documents
+from app.api.endpoints.auth import get_current_user
+
+router = APIRouter()
+
+SEARCH_SOURCES = {"item_comment", "findings", "ai_report", "ai_insights"}
+
+@router.get("/", response_model=List[SearchResult])
+async def search(
+    q: str = Query(..., min_length=2),
+    property_id: Optional[int] = None,
+    region: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    source: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    if source is not None and source not in SEARCH_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Unknown source: {source}")
+    try:
+        return search_documents(db, q, property_id=property_id, region=region, date_from=date_from,
+                                date_to=date_to, source=source, limit=limit, offset=offset)
+    except SearchUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.endpoints import auth, properties, audits, ai
+from app.api.endpoints import auth, properties, audits, ai, profiles, search, events, dashboard, analytics
 
 api_router = APIRouter()
 
@@ -7,3 +7,8 @@ api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(properties.router, prefix="/properties", tags=["properties"])
 api_router.include_router(audits.router, prefix="/audits", tags=["audits"])
 api_router.include_router(ai.router, prefix="/ai", tags=["ai"])
+api_router.include_router(profiles.router, prefix="/profiles", tags=["profiling"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
@@ -1,17 +1,134 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine, observe_pool_checkout
+from app.core import profiling, query_budget
 from app.models.models import Base
+# Imported for their Session hooks, so scripts that never load the API (the
+# precompute scheduler, migrations) still publish live events and index text
+from app.core import events as _events  # noqa: F401
+from app.services import search as _search  # noqa: F401
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+PRIMARY_COOKIE = "db_primary_until"
+
+_engine = None
+_replica_engines = None
+_replica_lock = threading.Lock()
+
+def _build_engine(url: str):
+    engine = create_engine(url)
+    instrument_engine(engine)
+    if settings.PROFILING_ENABLED:
+        profiling.instrument_engine(engine)
+    if query_budget.budget_mode() != "off":
+        query_budget.instrument_engine(engine)
+    return engine
+
+def get_engine():
+    """Create the database engine on first use so importing the app stays cheap"""
+    global _engine
+    if _engine is None:
+        _engine = _build_engine(settings.DATABASE_URL)
+    return _engine
+
+def get_replica_engines() -> List:
+    """Engines for DATABASE_REPLICA_URLS, created on first use"""
+    global _replica_engines
+    if _replica_engines is None:
+        with _replica_lock:
+            if _replica_engines is None:
+                _replica_engines = [_build_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+    return _replica_engines
+
+class ReplicaSelector:
+    """Pick a replica engine by round-robin or by fewest checked-out connections"""
+
+    def __init__(self, strategy: str):
+        if strategy not in ("round_robin", "least_connections"):
+            raise ValueError(f"Unknown replica selection strategy: {strategy}")
+        self.strategy = strategy
+        self._counter = itertools.count()
+
+    def select(self, engines: List):
+        if self.strategy == "least_connections":
+            return min(engines, key=lambda engine: engine.pool.checkedout())
+        return engines[next(self._counter) % len(engines)]
+
+replica_selector = ReplicaSelector(settings.REPLICA_SELECTION)
+
+class LazySession(Session):
+    """Session that binds to the application engine when it first needs a connection"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        return self.bind if self.bind is not None else get_engine()
+
+SessionLocal = sessionmaker(class_=LazySession, autocommit=False, autoflush=False)
 
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
 
-def get_db():
-    db = SessionLocal()
+# Set per request by ReadYourWritesMiddleware; flipped when the primary session writes
+_request_wrote: ContextVar[Optional[list]] = ContextVar("request_wrote", default=None)
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_write(session, flush_context):
+    wrote = _request_wrote.get()
+    if wrote is not None and session.bind is None:
+        wrote[0] = True
+
+def _session(bind=None):
+    db = SessionLocal(bind=bind)
     try:
+        # Check out the connection up front so pool wait time is measured on its own
+        start = time.perf_counter()
+        db.connection()
+        observe_pool_checkout(time.perf_counter() - start)
         yield db
     finally:
         db.close()
+
+def get_db():
+    yield from _session()
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints: a replica, unless this client wrote recently"""
+    replicas = get_replica_engines()
+    primary_until = request.cookies.get(PRIMARY_COOKIE)
+    sticky = primary_until is not None and primary_until.isdigit() and int(primary_until) > time.time()
+    if not replicas or sticky:
+        yield from _session()
+    else:
+        yield from _session(replica_selector.select(replicas))
+
+class ReadYourWritesMiddleware:
+    """Pin a client to the primary for READ_YOUR_WRITES_SECONDS after a request that wrote"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        wrote = [False]
+        token = _request_wrote.set(wrote)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and wrote[0]:
+                until = int(time.time()) + settings.READ_YOUR_WRITES_SECONDS
+                cookie = (f"{PRIMARY_COOKIE}={until}; Max-Age={settings.READ_YOUR_WRITES_SECONDS}; "
+                          "Path=/; HttpOnly; SameSite=Lax")
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_wrote.reset(token)
@@ -0,0 +1,174 @@
+"""
+Change events for live dashboards
+
+Writes to audits and audit items are collected when the session flushes (bulk
+UPDATEs, which bypass the flush, report theirs with record_updates) and
+published once the transaction commits, on the topics "audit:<id>" and
+"property:<id>". Subscribers (the WebSocket endpoints) receive JSON events:
+
+    {"type": "item.updated", "audit_id": 1, "item_id": 7, "property_id": 3,
+     "fields": ["score", "ai_analysis"], "changes": {"score": 4}, "at": "..."}
+
+"changes" carries the new value of scalar columns only; JSON columns such as
+photos or ai_report are listed in "fields" and clients refetch them.
+
+The bus is in-process: subscribers only see events committed by the same
+worker. EventBus is the seam for swapping in a broker (Redis pub/sub,
+Postgres LISTEN/NOTIFY) with set_event_bus.
+"""
+
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from app.models.models import Audit, AuditItem
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+PENDING_EVENTS_KEY = "pending_change_events"
+
+class EventBus(ABC):
+    """Publish/subscribe interface for change events"""
+
+    @abstractmethod
+    def publish(self, topics: List[str], payload: Dict[str, Any]):
+        """Deliver payload to every subscriber of any of topics; may be called from any thread"""
+
+    @abstractmethod
+    def subscribe(self, topic: str):
+        """Async context manager yielding an async iterator of events"""
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, payload: Dict[str, Any]):
+        # Slow consumers lose the oldest events rather than blocking publishers
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(payload)
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+class InProcessEventBus(EventBus):
+    """Fan events out to subscribers in this process; safe to publish from any thread"""
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, topics: List[str], payload: Dict[str, Any]):
+        with self._lock:
+            subscriptions = {sub for topic in topics for sub in self._subscriptions.get(topic, ())}
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, payload)
+
+    @asynccontextmanager
+    async def subscribe(self, topic: str):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.setdefault(topic, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscribers = self._subscriptions.get(topic, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self._subscriptions.pop(topic, None)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        with self._lock:
+            if topic is not None:
+                return len(self._subscriptions.get(topic, ()))
+            return sum(len(subscribers) for subscribers in self._subscriptions.values())
+
+_event_bus: EventBus = InProcessEventBus()
+
+def get_event_bus() -> EventBus:
+    return _event_bus
+
+def set_event_bus(bus: EventBus):
+    global _event_bus
+    _event_bus = bus
+
+def _changed_fields(obj, created: bool) -> List[str]:
+    state = inspect(obj)
+    return [attr.key for attr in state.mapper.column_attrs
+            if created or state.attrs[attr.key].history.has_changes()]
+
+def _scalar(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _queue_events(session, changes: List[tuple]):
+    """Queue (obj, action, fields) changes for publishing when the session commits"""
+    # Items only know their audit; look up the property for all of them at once
+    audit_ids = {obj.audit_id for obj, _, _ in changes if isinstance(obj, AuditItem)}
+    properties = dict(session.connection().execute(
+        select(Audit.id, Audit.property_id).where(Audit.id.in_(audit_ids))
+    ).all()) if audit_ids else {}
+
+    pending = session.info.setdefault(PENDING_EVENTS_KEY, [])
+    for obj, action, fields in changes:
+        is_audit = isinstance(obj, Audit)
+        audit_id = obj.id if is_audit else obj.audit_id
+        pending.append({
+            "type": f"{'audit' if is_audit else 'item'}.{action}",
+            "audit_id": audit_id,
+            "item_id": None if is_audit else obj.id,
+            "property_id": obj.property_id if is_audit else properties.get(audit_id),
+            "fields": fields,
+            "changes": {
+                field: _scalar(getattr(obj, field)) for field in fields
+                if not isinstance(getattr(obj, field), (dict, list))
+            },
+            "at": datetime.utcnow().isoformat(),
+        })
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    changes = [(obj, "created", _changed_fields(obj, True)) for obj in session.new
+               if isinstance(obj, (Audit, AuditItem))]
+    changes += [(obj, "updated", _changed_fields(obj, False)) for obj in session.dirty
+                if isinstance(obj, (Audit, AuditItem))]
+    changes = [change for change in changes if change[1] == "created" or change[2]]
+    changes += [(obj, "deleted", []) for obj in session.deleted if isinstance(obj, (Audit, AuditItem))]
+    if changes:
+        _queue_events(session, changes)
+
+def record_updates(session, updates: List[tuple]):
+    """Queue update events for (obj, fields) written with a bulk UPDATE, which skips the flush hooks"""
+    if updates:
+        _queue_events(session, [(obj, "updated", fields) for obj, fields in updates])
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session):
+    pending = session.info.pop(PENDING_EVENTS_KEY, None)
+    if not pending:
+        return
+    bus = get_event_bus()
+    for payload in pending:
+        topics = [f"audit:{payload['audit_id']}"]
+        if payload["property_id"] is not None:
+            topics.append(f"property:{payload['property_id']}")
+        try:
+            bus.publish(topics, payload)
+        except Exception:
+            logger.exception("Failed to publish %s event", payload["type"])
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(PENDING_EVENTS_KEY, None)
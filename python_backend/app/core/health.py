@@ -0,0 +1,167 @@
+"""
+Startup warmup and health probes
+
+The lifespan hook starts warm_up() in the background. It pays the first-request
+costs up front:
+- opens WARMUP_DB_CONNECTIONS pooled connections to the primary and each replica
+- runs the hot user and property queries so their statements are compiled and cached
+- loads the bcrypt backend
+- builds the OpenAPI schema
+- starts the render process pool
+- builds the LLM provider, and pings the model when WARMUP_LLM_PING is set
+- loads the similar-findings index in a worker thread
+
+/health/live answers as long as the event loop does. /health/ready answers 503
+until warmup has finished and while the worker is shutting down. It also probes
+the primary and each replica, so load balancers only route to warm workers with
+working databases.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import SessionLocal, get_engine, get_replica_engines
+
+logger = logging.getLogger(__name__)
+
+# Warmup steps whose failure keeps the worker out of rotation
+REQUIRED_STEPS = ("database",)
+
+class Readiness:
+    def __init__(self):
+        self.started_at = time.time()
+        self.warm = False
+        self.draining = False
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.warm and not self.draining and all(
+            self.steps.get(step, {}).get("ok", True) for step in REQUIRED_STEPS
+        )
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "warm": self.warm,
+            "draining": self.draining,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "warmup": self.steps,
+        }
+
+readiness = Readiness()
+
+async def _step(name: str, func: Callable[[], Awaitable[Any]]):
+    start = time.perf_counter()
+    try:
+        detail = await func()
+        readiness.steps[name] = {"ok": True, "ms": round((time.perf_counter() - start) * 1000, 1)}
+        if detail is not None:
+            readiness.steps[name]["detail"] = detail
+    except Exception as e:
+        logger.warning("Warmup step %s failed: %s", name, e)
+        readiness.steps[name] = {"ok": False, "ms": round((time.perf_counter() - start) * 1000, 1), "error": str(e)}
+
+def _open_connections(engine, count: int):
+    """Check out count connections at once so the pool keeps them open"""
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+async def _warm_database():
+    engines = [get_engine(), *get_replica_engines()]
+    await asyncio.gather(*(
+        asyncio.to_thread(_open_connections, engine, settings.WARMUP_DB_CONNECTIONS) for engine in engines
+    ))
+    return {"engines": len(engines), "connections": settings.WARMUP_DB_CONNECTIONS}
+
+def _run_hot_queries():
+    from app.models.models import Property, User
+    db = SessionLocal()
+    try:
+        db.query(User).order_by(User.id).limit(100).all()
+        db.query(Property).order_by(Property.id).limit(100).all()
+    finally:
+        db.close()
+
+def _load_password_hashing():
+    from app.core.security import pwd_context
+    pwd_context.dummy_verify()
+
+def _build_openapi(app):
+    return {"paths": len(app.openapi()["paths"])}
+
+async def _warm_process_pool():
+    from app.core.workers import run_in_process
+    pids = await asyncio.gather(*(run_in_process(os.getpid) for _ in range(max(1, settings.RENDER_WORKERS))))
+    return {"workers": len(set(pids))}
+
+async def _warm_llm():
+    from app.services.gemini_service import gemini_service
+    provider = gemini_service.provider
+    if settings.WARMUP_LLM_PING:
+        await gemini_service.ping()
+    return {"provider": provider.name, "pinged": settings.WARMUP_LLM_PING}
+
+async def _warm_similarity_index():
+    # Imported here so NumPy stays out of application startup
+    from app.services.similarity import finding_index
+    return await finding_index.load()
+
+async def warm_up(app):
+    try:
+        await _step("database", _warm_database)
+        await _step("queries", lambda: asyncio.to_thread(_run_hot_queries))
+        await _step("password_hashing", lambda: asyncio.to_thread(_load_password_hashing))
+        await _step("openapi", lambda: asyncio.to_thread(_build_openapi, app))
+        await asyncio.gather(_step("process_pool", _warm_process_pool), _step("llm", _warm_llm),
+                             _step("similarity_index", _warm_similarity_index))
+    finally:
+        readiness.warm = True
+        logger.info("Warmup finished in %.2fs", time.time() - readiness.started_at)
+
+async def start_warmup(app) -> Optional[asyncio.Task]:
+    if not settings.WARMUP_ENABLED:
+        readiness.warm = True
+        return None
+
+    async def run():
+        try:
+            await asyncio.wait_for(warm_up(app), settings.WARMUP_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Warmup did not finish within %ss", settings.WARMUP_TIMEOUT_SECONDS)
+            readiness.warm = True
+
+    return asyncio.create_task(run())
+
+def _probe_engine(engine) -> float:
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return (time.perf_counter() - start) * 1000
+
+async def probe_dependencies() -> Dict[str, Dict[str, Any]]:
+    """Round-trip latency to the primary and each replica, bounded by HEALTH_PROBE_TIMEOUT_SECONDS"""
+    engines = {"database": get_engine()}
+    engines.update({f"replica_{i}": engine for i, engine in enumerate(get_replica_engines())})
+
+    async def probe(engine) -> Dict[str, Any]:
+        try:
+            ms = await asyncio.wait_for(asyncio.to_thread(_probe_engine, engine), settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+            return {"ok": True, "ms": round(ms, 1)}
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": "timeout"}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    results = await asyncio.gather(*(probe(engine) for engine in engines.values()))
+    return dict(zip(engines, results))
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class InFlightRequests:
+    """Counts requests in progress so shutdown can wait for them to finish"""
+
+    def __init__(self):
+        self.count = 0
+        self._idle = None
+
+    def _event(self) -> asyncio.Event:
+        if self._idle is None:
+            self._idle = asyncio.Event()
+            self._idle.set()
+        return self._idle
+
+    def started(self):
+        self.count += 1
+        self._event().clear()
+
+    def finished(self):
+        self.count -= 1
+        if self.count == 0:
+            self._event().set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for in-flight requests; returns False if some were cut off"""
+        if self.count == 0:
+            return True
+        logger.info("Waiting up to %.0fs for %d in-flight AI requests", timeout, self.count)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._event().wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Shutting down with %d AI requests still in flight", self.count)
+            return False
+        logger.info("Drained in-flight AI requests in %.1fs", time.perf_counter() - start)
+        return True
+
+ai_requests = InFlightRequests()
+
+class InFlightMiddleware:
+    """Track requests under a path prefix, including their background tasks"""
+
+    def __init__(self, app, prefix: str, tracker: InFlightRequests):
+        self.app = app
+        self.prefix = prefix
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        self.tracker.started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.tracker.finished()
@@ -0,0 +1,174 @@
+"""
+Prometheus metrics for the API, database and Gemini hot paths
+
+Labels are kept to bounded sets: route templates instead of raw paths, task
+names instead of prompts.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+from sqlalchemy import event
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+)
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the database pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of individual SQL statements",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Number of SQL statements executed per request",
+    ["route"],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+GEMINI_LATENCY = Histogram(
+    "gemini_request_duration_seconds",
+    "Latency of Gemini API calls",
+    ["task", "model"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+GEMINI_TOKENS = Counter(
+    "gemini_tokens_total",
+    "Tokens consumed by Gemini calls",
+    ["task", "kind"],
+)
+GEMINI_FALLBACKS = Counter(
+    "gemini_fallbacks_total",
+    "Gemini calls answered with placeholder data instead of a parsed model response",
+    ["task", "reason"],
+)
+GEMINI_PARSE_OUTCOMES = Counter(
+    "gemini_parse_outcomes_total",
+    "Structured Gemini responses by how they were parsed: valid, extracted, repaired, model_repaired or invalid",
+    ["task", "outcome"],
+)
+LLM_ROUTE_FALLBACKS = Counter(
+    "llm_route_fallbacks_total",
+    "LLM calls moved on to an alternate model because the routed model failed or timed out",
+    ["task", "model", "reason"],
+)
+# Each worker routes on its own observations, so these are reported per live process
+LLM_MODEL_LATENCY = Gauge(
+    "llm_model_latency_seconds",
+    "Moving average of call latency per model, as used for routing",
+    ["model"],
+    multiprocess_mode="liveall",
+)
+LLM_MODEL_ERROR_RATE = Gauge(
+    "llm_model_error_rate",
+    "Moving average of the call error rate per model, as used for routing",
+    ["model"],
+    multiprocess_mode="liveall",
+)
+AI_WRITEBACK_FLUSH_SIZE = Histogram(
+    "ai_writeback_flush_size",
+    "AI result jobs applied per write-behind flush",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 200, 500, 1000),
+)
+AI_WRITEBACK_FLUSH_LATENCY = Histogram(
+    "ai_writeback_flush_seconds",
+    "Duration of write-behind flushes of AI results",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ["cache", "result"],
+)
+
+# Per-request SQL statement counter, set by MetricsMiddleware
+_request_queries: ContextVar[Optional[list]] = ContextVar("request_queries", default=None)
+
+def route_template(scope) -> str:
+    """Route path template for the matched route, e.g. /api/audits/{audit_id}"""
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    # FastAPI releases that include routers lazily leave the unprefixed route in
+    # scope["route"] and the full template on the effective route context
+    context = scope.get("fastapi")
+    effective = context.get("effective_route_context") if isinstance(context, dict) else None
+    return getattr(effective, "path_format", None) or getattr(route, "path_format", None) or "unmatched"
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+def observe_writeback_flush(size: int, seconds: float):
+    AI_WRITEBACK_FLUSH_SIZE.observe(size)
+    AI_WRITEBACK_FLUSH_LATENCY.observe(seconds)
+
+def observe_pool_checkout(seconds: float):
+    DB_POOL_CHECKOUT_WAIT.observe(seconds)
+
+def instrument_engine(engine):
+    """Count and time every SQL statement executed through the engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        DB_QUERY_DURATION.observe(time.perf_counter() - conn.info["query_start_time"].pop())
+        counter = _request_queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and query counts per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+        counter = [0]
+        token = _request_queries.set(counter)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_queries.reset(token)
+            route = route_template(scope)
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method=method, route=route).observe(elapsed)
+            REQUEST_COUNT.labels(method=method, route=route, status=str(status["code"])).inc()
+            DB_QUERIES_PER_REQUEST.labels(route=route).observe(counter[0])
+
+def render_metrics():
+    """Return the exposition payload and content type for the /metrics endpoint"""
+    # With multiple worker processes every worker writes to PROMETHEUS_MULTIPROC_DIR
+    # and the scrape aggregates all of them
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
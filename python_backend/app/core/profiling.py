@@ -0,0 +1,126 @@
+"""
+Opt-in per-request profiling
+
+Admins can send `X-Profile: 1` (or `?profile=1`) to run a request under the
+pyinstrument sampling profiler. The HTML profile and a JSON breakdown of SQL
+statements and Gemini spans are written to PROFILE_DIR and referenced by the
+X-Profile-Id response header. The middleware is only installed when
+PROFILING_ENABLED is set, so normal deployments pay nothing for it.
+
+Admin rights are read from the role claim of the bearer token rather than
+the database, so the check never blocks the event loop. Tokens issued before
+the claim was added cannot start a profile until the user logs in again.
+"""
+
+import json
+import os
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import parse_qs
+from sqlalchemy import event
+from app.core.config import settings
+
+PROFILE_HEADER = b"x-profile"
+
+class RequestProfile:
+    def __init__(self, profile_id: str, method: str, path: str):
+        self.profile_id = profile_id
+        self.method = method
+        self.path = path
+        self.sql = []
+        self.spans = []
+
+    def breakdown(self, duration: float) -> dict:
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "duration": round(duration, 6),
+            "sql": {
+                "count": len(self.sql),
+                "total_duration": round(sum(d for _, d in self.sql), 6),
+                "statements": [{"statement": s, "duration": round(d, 6)} for s, d in self.sql],
+            },
+            "spans": [{"name": n, "duration": round(d, 6)} for n, d in self.spans],
+        }
+
+_active_profile: ContextVar[Optional[RequestProfile]] = ContextVar("active_profile", default=None)
+
+def record_span(name: str, seconds: float):
+    """Record a timed span (e.g. a Gemini call) on the profile of the current request"""
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.spans.append((name, seconds))
+
+def instrument_engine(engine):
+    """Capture SQL statements and durations for profiled requests"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _active_profile.get() is not None:
+            conn.info["profile_start_time"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _active_profile.get()
+        if profile is not None and "profile_start_time" in conn.info:
+            profile.sql.append((statement, time.perf_counter() - conn.info.pop("profile_start_time")))
+
+def profile_path(profile_id: str, ext: str) -> str:
+    return os.path.join(settings.PROFILE_DIR, f"{profile_id}.{ext}")
+
+def _profiling_requested(scope) -> bool:
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if "1" in query.get("profile", []):
+        return True
+    return any(name == PROFILE_HEADER and value == b"1" for name, value in scope["headers"])
+
+def _is_admin(scope) -> bool:
+    from app.core.security import token_claims
+
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    if not authorization.lower().startswith("bearer "):
+        return False
+    claims = token_claims(authorization[7:])
+    return claims is not None and claims.get("sub") is not None and claims.get("role") == "admin"
+
+class ProfilingMiddleware:
+    """Run flagged admin requests under a sampling profiler"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profiling_requested(scope) or not _is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+
+        profile = RequestProfile(uuid.uuid4().hex, scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.profile_id.encode())
+                ]
+            await send(message)
+
+        token = _active_profile.set(profile)
+        profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="enabled")
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            duration = time.perf_counter() - start
+            _active_profile.reset(token)
+
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+            with open(profile_path(profile.profile_id, "html"), "w") as f:
+                f.write(profiler.output_html())
+            with open(profile_path(profile.profile_id, "json"), "w") as f:
+                json.dump(profile.breakdown(duration), f, indent=2)
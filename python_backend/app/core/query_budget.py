@@ -0,0 +1,145 @@
+"""
+Per-request SQL query budgets and N+1 detection
+
+Every statement executed while handling a request is normalised into a shape
+(literals and IN lists collapsed). When the response starts, the total so far
+is checked against the route's budget and repeated shapes are flagged as
+likely N+1 lazy loads; statements run after that, e.g. by background tasks,
+are not counted. In "raise" mode (the default when ENVIRONMENT=test) a
+violation replaces the response with a 500 naming it; in "log" mode it is
+logged and the response carries an X-Query-Budget-Violation header.
+"""
+
+import json
+import logging
+import re
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from prometheus_client import Counter as PrometheusCounter
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_VIOLATIONS = PrometheusCounter(
+    "db_query_budget_violations_total",
+    "Requests that exceeded their query budget or repeated a statement shape",
+    ["route", "kind"],
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]*)\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+def statement_shape(statement: str) -> str:
+    """Normalise a SQL statement so repeated executions with different values compare equal"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+class RequestQueryLog:
+    def __init__(self):
+        self.total = 0
+        self.shapes = Counter()
+
+    def record(self, statement: str):
+        self.total += 1
+        self.shapes[statement_shape(statement)] += 1
+
+_query_log: ContextVar[Optional[RequestQueryLog]] = ContextVar("query_log", default=None)
+
+def budget_mode() -> str:
+    if settings.QUERY_BUDGET_MODE:
+        return settings.QUERY_BUDGET_MODE
+    return "raise" if settings.ENVIRONMENT == "test" else "log"
+
+def budget_for(method: str, route: str) -> int:
+    """Budget for a route, configured as "METHOD /path/{param}" or just "/path/{param}" keys"""
+    budgets = settings.QUERY_BUDGETS
+    return budgets.get(f"{method} {route}", budgets.get(route, settings.QUERY_BUDGET_DEFAULT))
+
+def check_budget(method: str, route: str, log: RequestQueryLog) -> Optional[str]:
+    """Describe any violation; raises QueryBudgetExceeded instead in raise mode"""
+    problems = []
+
+    budget = budget_for(method, route)
+    if log.total > budget:
+        QUERY_BUDGET_VIOLATIONS.labels(route=route, kind="budget").inc()
+        problems.append(f"{log.total} statements exceeds budget of {budget}")
+
+    for shape, count in log.shapes.most_common():
+        if count < settings.N_PLUS_ONE_THRESHOLD:
+            break
+        QUERY_BUDGET_VIOLATIONS.labels(route=route, kind="n_plus_one").inc()
+        problems.append(f"possible N+1: {count}x {shape[:200]}")
+
+    if not problems:
+        return None
+
+    message = f"Query budget violation on {method} {route}: " + "; ".join(problems)
+    if budget_mode() == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+    return message
+
+def instrument_engine(engine):
+    """Record statements executed during a tracked request"""
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        log = _query_log.get()
+        if log is not None:
+            log.record(statement)
+
+class QueryBudgetMiddleware:
+    """Track statements per request and enforce per-route budgets"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = RequestQueryLog()
+        token = _query_log.set(log)
+        replaced = False
+
+        async def send_checked(message):
+            # Check before the status goes out, so a violation can still change it
+            nonlocal replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start" and scope.get("route") is not None:
+                try:
+                    violation = check_budget(scope["method"], route_template(scope), log)
+                except QueryBudgetExceeded as e:
+                    replaced = True
+                    await _send_error(send, str(e))
+                    return
+                if violation:
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"x-query-budget-violation", violation[:200].encode("latin-1", "replace"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_checked)
+        finally:
+            _query_log.reset(token)
+
+async def _send_error(send, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 500,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,24 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from app.core.config import settings
+
+_process_pool = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.RENDER_WORKERS or None)
+    return _process_pool
+
+async def run_in_process(func, *args, **kwargs):
+    """Run a CPU-bound, picklable function in the process pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), partial(func, *args, **kwargs))
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True)
+        _process_pool = None
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, JSON, LargeBinary, DDL, Index, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 
 Base = declarative_base()
@@ -19,6 +19,7 @@ class User(Base):
     # Relationships
     audits_assigned = relationship("Audit", foreign_keys="[Audit.auditor_id]", back_populates="auditor")
     audits_reviewed = relationship("Audit", foreign_keys="[Audit.reviewer_id]", back_populates="reviewer")
+    managed_properties = relationship("Property", secondary="property_managers")
 
 class Property(Base):
     __tablename__ = "properties"
@@ -36,6 +37,13 @@ class Property(Base):
     # Relationships
     audits = relationship("Audit", back_populates="property")
 
+class PropertyManager(Base):
+    """Properties a hotel GM may see"""
+    __tablename__ = "property_managers"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True, index=True)
+
 class Audit(Base):
     __tablename__ = "audits"
     
@@ -56,6 +64,7 @@ class Audit(Base):
     submitted_at = Column(DateTime)
     reviewed_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     property = relationship("Property", back_populates="audits")
@@ -73,10 +82,105 @@ class AuditItem(Base):
     score = Column(Integer)
     comments = Column(Text)
     photos = Column(JSON)
+    photo_digests = Column(JSON)  # [{"index", "digest"}] per image in photos, kept in step by _index_photos
     ai_analysis = Column(JSON)  # AI analysis of photos/content
     ai_suggested_score = Column(Integer)  # AI suggested score
     status = Column(String, default="pending")  # pending, completed
+    version = Column(Integer, nullable=False, default=1)  # bumped on user edits (PATCH and sync), for offline sync
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     audit = relationship("Audit", back_populates="audit_items")
+    
+    # Every UPDATE checks the loaded version, but only user edits bump it; AI results and index hooks leave it alone
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+    
+    @validates("photos")
+    def _index_photos(self, key, photos):
+        # Hash the originals once on write, so serving a derivative never reads them
+        from app.services.photo_derivatives import photo_index
+        self.photo_digests = photo_index(photos)
+        return photos
+
+class SearchDocument(Base):
+    """Denormalized full-text index rows for audit findings, item comments and AI output"""
+    __tablename__ = "search_documents"
+    
+    id = Column(Integer, primary_key=True)
+    # No foreign keys: rows are removed by the flush hook after their audit or item is deleted
+    audit_id = Column(Integer, nullable=False, index=True)
+    item_id = Column(Integer)
+    source = Column(String, nullable=False)  # item_comment, findings, ai_report, ai_insights
+    property_id = Column(Integer, index=True)
+    region = Column(String)
+    audit_date = Column(DateTime)
+    body = Column(Text, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_search_documents_source_key", "source", "audit_id", "item_id", unique=True),
+    )
+
+# Postgres searches an expression GIN index; SQLite keeps an external-content FTS5 table in sync via triggers
+event.listen(SearchDocument.__table__, "after_create", DDL(
+    "CREATE INDEX ix_search_documents_tsv ON search_documents "
+    "USING GIN (to_tsvector('english', body))"
+).execute_if(dialect="postgresql"))
+
+for _statement in (
+    "CREATE VIRTUAL TABLE search_documents_fts USING fts5("
+    "body, content='search_documents', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(rowid, body) VALUES (new.id, new.body); END",
+    "CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, body) VALUES ('delete', old.id, old.body); END",
+    "CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, body) VALUES ('delete', old.id, old.body); "
+    "INSERT INTO search_documents_fts(rowid, body) VALUES (new.id, new.body); END",
+):
+    event.listen(SearchDocument.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+
+class FindingEmbedding(Base):
+    """Embedding of an item comment or audit findings, stored as packed float32"""
+    __tablename__ = "finding_embeddings"
+    
+    id = Column(Integer, primary_key=True)
+    audit_id = Column(Integer, nullable=False, index=True)
+    item_id = Column(Integer)
+    source = Column(String, nullable=False)  # item_comment, findings
+    text = Column(Text, nullable=False)
+    model = Column(String, nullable=False)
+    vector = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_finding_embeddings_source_key", "source", "audit_id", "item_id", unique=True),
+    )
+
+class AIResultJob(Base):
+    """AI output waiting to be written to its audit or item by the write-behind flusher"""
+    __tablename__ = "ai_result_jobs"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # audit, item
+    target_id = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)  # flushes that hit a concurrent edit
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class IdempotencyResult(Base):
+    """AI endpoint response stored for replay to a repeated Idempotency-Key"""
+    __tablename__ = "idempotency_results"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    key = Column(String, nullable=False)
+    input_digest = Column(String, nullable=False)
+    request_key = Column(String, nullable=False)  # endpoint and target the key was first used for
+    result = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    __table_args__ = (
+        Index("ix_idempotency_results_key", "user_id", "key", "input_digest", unique=True),
+    )
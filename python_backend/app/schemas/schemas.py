@@ -158,3 +158,144 @@ class ScoreSuggestionResponse(BaseModel):
     confidence: float
     reasoning: str
     compliance_zone: ComplianceZone
+
+# Shapes of model output that is stored rather than returned directly
+class ReportSectionAnalysis(BaseModel):
+    summary: str
+    key_findings: List[str]
+    recommendations: List[str]
+    compliance: str
+
+class ActionPlanItem(BaseModel):
+    issue: Optional[str] = None
+    action: str
+    priority: str
+    owner: str
+    timeline: Optional[str] = None
+
+class ActionPlan(BaseModel):
+    actions: List[ActionPlanItem]
+
+class ComplianceInsights(BaseModel):
+    insights: List[str]
+    risk_level: str
+    focus_areas: List[str] = []
+
+class SearchResult(BaseModel):
+    audit_id: int
+    item_id: Optional[int] = None
+    source: str
+    property_id: Optional[int] = None
+    region: Optional[str] = None
+    audit_date: Optional[datetime] = None
+    rank: float
+    highlight: str
+
+class SimilarFindingsRequest(BaseModel):
+    text: Optional[str] = None
+    audit_item_id: Optional[int] = None
+    limit: int = 10
+
+class SimilarFinding(BaseModel):
+    audit_id: int
+    item_id: Optional[int] = None
+    source: str
+    text: str
+    similarity: float
+    action_plan: Optional[Dict[str, Any]] = None
+
+class SyncItemChange(BaseModel):
+    item_id: int
+    version: int  # server version the client edited
+    client_updated_at: datetime
+    score: Optional[int] = None
+    comments: Optional[str] = None
+    photos: Optional[List[str]] = None
+    status: Optional[str] = None
+
+class SyncRequest(BaseModel):
+    cursor: Optional[datetime] = None
+    audit_ids: Optional[List[int]] = None
+    changes: List[SyncItemChange] = []
+
+class SyncItem(BaseModel):
+    id: int
+    audit_id: int
+    category: str
+    item: str
+    score: Optional[int] = None
+    comments: Optional[str] = None
+    photos: Optional[List[str]] = None
+    ai_analysis: Optional[Dict[str, Any]] = None
+    ai_suggested_score: Optional[float] = None
+    status: Optional[str] = None
+    version: int
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class SyncAudit(BaseModel):
+    id: int
+    property_id: int
+    status: Optional[str] = None
+    overall_score: Optional[float] = None
+    compliance_zone: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class SyncConflict(BaseModel):
+    item_id: int
+    reason: str  # version, not_found, forbidden
+    client_version: int
+    server: Optional[SyncItem] = None
+
+class SyncResponse(BaseModel):
+    cursor: datetime
+    applied: List[int]
+    conflicts: List[SyncConflict]
+    items: List[SyncItem]
+    audits: List[SyncAudit]
+
+class DashboardSummary(BaseModel):
+    role: str
+    generated_at: datetime
+    counts: Dict[str, Dict[str, int]]
+    lists: Dict[str, List[Dict[str, Any]]]
+
+class PhotoDerivatives(BaseModel):
+    index: int
+    digest: str
+    urls: Dict[str, str]
+
+class AuditorBias(BaseModel):
+    auditor_id: int
+    audits: int
+    bias: float
+    t_statistic: Optional[float] = None
+    flagged: bool
+    item_z_mean: Optional[float] = None
+
+class ScoreChange(BaseModel):
+    property_id: int
+    score: str
+    previous_mean: float
+    recent_mean: float
+    change: float
+
+class OutlierAudit(BaseModel):
+    audit_id: int
+    property_id: int
+    overall_score: float
+    z_score: float
+
+class ScoreAnalytics(BaseModel):
+    audits: int
+    items: int
+    percentiles: Dict[str, Dict[str, float]]
+    category_percentiles: Dict[str, Dict[str, float]]
+    auditor_bias: List[AuditorBias]
+    score_changes: List[ScoreChange]
+    outlier_audits: List[OutlierAudit]
@@ -0,0 +1,245 @@
+"""
+Write-behind persistence for AI results
+
+AI endpoints hand their results over as rows in ai_result_jobs, one small
+insert each, committed before the response is sent so a crash cannot lose
+them. submit() blocks on that commit, so async callers run it with
+asyncio.to_thread(). A flusher task applies queued jobs in batches: one
+transaction loads the targeted audits and items with a single query each,
+writes the newest result per target with one executemany UPDATE per kind and
+deletes the jobs it applied. Flushes
+run every AI_WRITEBACK_INTERVAL_SECONDS, or as soon as AI_WRITEBACK_BATCH_SIZE
+jobs are queued. Jobs left over from a previous process are picked up by the
+first flush.
+
+Item UPDATEs only match the version that was loaded. Items an auditor saved
+in the meantime are reloaded and written one at a time, each in a savepoint;
+if that conflicts too, only the target's jobs stay queued. They are retried by
+later flushes and dropped after AI_WRITEBACK_MAX_ATTEMPTS.
+
+The bulk UPDATEs skip the ORM flush, so live change events and search
+documents for them are recorded explicitly. AI results do not bump item
+versions, so they never conflict with a client's edit. Readers may see AI fields up to one interval
+after the endpoint has returned.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.events import record_updates
+from app.core.metrics import observe_writeback_flush
+from app.models.models import AIResultJob, Audit, AuditItem
+from app.services.search import index_changes
+
+logger = logging.getLogger(__name__)
+
+def audit_result_values(audit: Audit, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ai_report": payload["ai_report"],
+        # A report without a plan keeps the stored one
+        "action_plan": payload.get("action_plan") or audit.action_plan,
+        "ai_insights": payload["ai_insights"],
+    }
+
+def item_result_values(item: AuditItem, payload: Dict[str, Any]) -> Dict[str, Any]:
+    score_suggestion = payload["score_suggestion"]
+    return {
+        "ai_suggested_score": score_suggestion.get("suggested_score"),
+        "ai_analysis": {
+            "score_suggestion": score_suggestion,
+            "photo_analysis": payload["photo_analysis"]
+        },
+    }
+
+# Model and column values for each kind of result
+TARGETS = {
+    "audit": (Audit, audit_result_values),
+    "item": (AuditItem, item_result_values),
+}
+
+def _version(target) -> Any:
+    """Loaded optimistic-lock version; None for models without one"""
+    version_col = target.__mapper__.version_id_col
+    return None if version_col is None else getattr(target, version_col.key)
+
+class AIResultWriter:
+    """Queue AI results in the job table and apply them in batches"""
+
+    def __init__(self, batch_size: int, interval: float, max_attempts: int = 5):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self._queued = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, kind: str, target_id: int, payload: Dict[str, Any]):
+        """Durably queue a result; returns once the job row is committed"""
+        if kind not in TARGETS:
+            raise ValueError(f"Unknown AI result kind: {kind}")
+        db = SessionLocal()
+        try:
+            db.add(AIResultJob(kind=kind, target_id=target_id, payload=payload))
+            db.commit()
+        finally:
+            db.close()
+        self._queued += 1
+        if self._queued >= self.batch_size and self._wake is not None:
+            # submit() usually runs in a worker thread
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def submit_audit(self, audit_id: int, ai_report: dict, action_plan: Optional[dict], ai_insights: dict):
+        self.submit("audit", audit_id, {"ai_report": ai_report, "action_plan": action_plan, "ai_insights": ai_insights})
+
+    def submit_item(self, item_id: int, score_suggestion: dict, photo_analysis: dict):
+        self.submit("item", item_id, {"score_suggestion": score_suggestion, "photo_analysis": photo_analysis})
+
+    def flush(self) -> int:
+        """Apply up to batch_size queued jobs in one transaction; returns the number of jobs removed"""
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            # Workers sharing the table claim disjoint batches (SKIP LOCKED is a no-op on SQLite)
+            jobs = (db.query(AIResultJob)
+                    .order_by(AIResultJob.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                    .all())
+            if not jobs:
+                return 0
+
+            # Later results for the same target supersede earlier ones
+            by_target: Dict[Tuple[str, int], List[AIResultJob]] = {}
+            for job in jobs:
+                by_target.setdefault((job.kind, job.target_id), []).append(job)
+            conflicts = self._apply(db, by_target)
+
+            done = [job.id for key, target_jobs in by_target.items() if key not in conflicts for job in target_jobs]
+            for key in conflicts:
+                latest = by_target[key][-1]
+                if latest.attempts + 1 >= self.max_attempts:
+                    logger.warning("Dropping AI result for %s %s after %d conflicting flushes",
+                                   key[0], key[1], latest.attempts + 1)
+                    done.extend(job.id for job in by_target[key])
+                else:
+                    # Only the newest result is worth retrying
+                    latest.attempts += 1
+                    done.extend(job.id for job in by_target[key][:-1])
+            if done:
+                db.query(AIResultJob).filter(AIResultJob.id.in_(done)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+        self._queued = max(0, self._queued - len(done))
+        observe_writeback_flush(len(done), time.perf_counter() - start)
+        return len(done)
+
+    def _apply(self, db: Session, by_target: Dict[Tuple[str, int], List[AIResultJob]]) -> set:
+        """Write the newest payload per target, one UPDATE per kind; returns the targets that conflicted"""
+        conflicts = set()
+        written = []
+        for kind, (model, result_values) in TARGETS.items():
+            ids = [target_id for job_kind, target_id in by_target if job_kind == kind]
+            if not ids:
+                continue
+            # Targets deleted since the job was queued are skipped
+            targets = db.query(model).filter(model.id.in_(ids)).all()
+            values = {target.id: result_values(target, by_target[(kind, target.id)][-1].payload)
+                      for target in targets}
+            current = self._bulk_update(db, model, targets, values)
+
+            for target in targets:
+                if target.id not in current:
+                    continue
+                if current[target.id] == _version(target):
+                    # Already in the database; record it on the instance without dirtying it
+                    for field, value in values[target.id].items():
+                        set_committed_value(target, field, value)
+                    written.append((target, list(values[target.id])))
+                    continue
+                # An auditor saved this target after it was loaded; the rest of the batch went ahead
+                key = (kind, target.id)
+                try:
+                    with db.begin_nested():
+                        db.refresh(target)
+                        for field, value in result_values(target, by_target[key][-1].payload).items():
+                            setattr(target, field, value)
+                        db.flush()
+                except StaleDataError:
+                    logger.info("AI result for %s %s hit a concurrent update, retrying next round", kind, target.id)
+                    conflicts.add(key)
+
+        record_updates(db, written)
+        index_changes(db.connection(), [target for target, _ in written if isinstance(target, Audit)], [])
+        return conflicts
+
+    def _bulk_update(self, db: Session, model, targets: list, values: Dict[int, Dict[str, Any]]) -> Dict[int, Any]:
+        """Write values with one executemany, guarded by the loaded version; returns each row's version afterwards"""
+        if not targets:
+            return {}
+        version_col = model.__mapper__.version_id_col
+        fields = list(values[targets[0].id])
+        guard = [model.id == bindparam("target_id")]
+        if version_col is not None:
+            guard.append(version_col == bindparam("loaded_version"))
+        statement = (update(model.__table__)
+                     .where(*guard)
+                     .values({field: bindparam(field) for field in fields}))
+        params = [{"target_id": target.id, "loaded_version": _version(target), **values[target.id]}
+                  for target in targets]
+        result = db.execute(statement, params)
+
+        if result.rowcount == len(params) and db.connection().dialect.supports_sane_multi_rowcount:
+            return {target.id: _version(target) for target in targets}
+        # Some rows were deleted or saved since they were loaded, or the driver cannot tell
+        if version_col is None:
+            return {target_id: None for target_id in db.scalars(select(model.id).where(model.id.in_(list(values))))}
+        return dict(db.execute(select(model.id, version_col).where(model.id.in_(list(values)))).all())
+
+    async def flush_all(self):
+        while await asyncio.to_thread(self.flush) == self.batch_size:
+            pass
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush_all()
+            except Exception:
+                logger.exception("AI result flush failed")
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush_all()
+        except Exception:
+            logger.exception("Final AI result flush failed; queued jobs are applied on next start")
+
+ai_results = AIResultWriter(settings.AI_WRITEBACK_BATCH_SIZE, settings.AI_WRITEBACK_INTERVAL_SECONDS,
+                            settings.AI_WRITEBACK_MAX_ATTEMPTS)
@@ -0,0 +1,116 @@
+"""
+Role dashboard summaries
+
+Each landing page gets its counts and top-N lists from a few aggregate
+queries instead of several list calls aggregated client-side. Summaries are
+cached per user for DASHBOARD_CACHE_SECONDS, so landing-page latency does
+not grow with the number of audits.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.models.models import Audit, Property, PropertyManager, User
+
+OPEN_STATUSES = ("scheduled", "in_progress")
+
+summary_cache = TTLCache(settings.DASHBOARD_CACHE_SECONDS, maxsize=10000)
+
+def _audit_counts(db: Session, *filters) -> Dict[str, Dict[str, int]]:
+    """Audits by status and by compliance zone, from one GROUP BY"""
+    rows = (db.query(Audit.status, Audit.compliance_zone, func.count(Audit.id))
+            .filter(*filters)
+            .group_by(Audit.status, Audit.compliance_zone)
+            .all())
+    by_status: Dict[str, int] = {}
+    by_zone: Dict[str, int] = {}
+    for status, zone, count in rows:
+        by_status[status or "unknown"] = by_status.get(status or "unknown", 0) + count
+        by_zone[zone or "unscored"] = by_zone.get(zone or "unscored", 0) + count
+    return {"audits_by_status": by_status, "audits_by_zone": by_zone}
+
+def _property_counts(db: Session, *filters) -> Dict[str, int]:
+    rows = db.query(Property.status, func.count(Property.id)).filter(*filters).group_by(Property.status).all()
+    return {status or "unknown": count for status, count in rows}
+
+def _audit_list(db: Session, order_by, limit: int, *filters) -> List[Dict[str, Any]]:
+    rows = (db.query(Audit.id, Audit.property_id, Property.name, Audit.status, Audit.overall_score,
+                     Audit.compliance_zone, Audit.created_at, Audit.submitted_at)
+            .join(Property, Property.id == Audit.property_id)
+            .filter(*filters)
+            .order_by(order_by)
+            .limit(limit)
+            .all())
+    return [
+        {
+            "id": row.id,
+            "property_id": row.property_id,
+            "property_name": row.name,
+            "status": row.status,
+            "overall_score": row.overall_score,
+            "compliance_zone": row.compliance_zone,
+            "created_at": row.created_at,
+            "submitted_at": row.submitted_at,
+        }
+        for row in rows
+    ]
+
+def _property_list(db: Session, order_by, limit: int, *filters) -> List[Dict[str, Any]]:
+    rows = (db.query(Property.id, Property.name, Property.region, Property.status,
+                     Property.last_audit_score, Property.next_audit_date)
+            .filter(*filters)
+            .order_by(order_by)
+            .limit(limit)
+            .all())
+    return [dict(row._mapping) for row in rows]
+
+def managed_property_ids(db: Session, user: User) -> List[int]:
+    return [row.property_id for row in db.query(PropertyManager.property_id).filter(PropertyManager.user_id == user.id)]
+
+def build_summary(db: Session, user: User, property_id: Optional[int] = None, limit: int = 5) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    counts: Dict[str, Any] = {}
+    lists: Dict[str, Any] = {}
+    upcoming_filters = [Property.next_audit_date >= now]
+
+    if user.role == "auditor":
+        counts.update(_audit_counts(db, Audit.auditor_id == user.id))
+        lists["assigned_audits"] = _audit_list(
+            db, Audit.created_at, limit, Audit.auditor_id == user.id, Audit.status.in_(OPEN_STATUSES))
+    elif user.role == "reviewer":
+        pending = [Audit.status == "submitted", (Audit.reviewer_id == user.id) | (Audit.reviewer_id.is_(None))]
+        counts.update(_audit_counts(db))
+        lists["pending_reviews"] = _audit_list(db, Audit.submitted_at, limit, *pending)
+        lists["recently_reviewed"] = _audit_list(
+            db, Audit.reviewed_at.desc(), limit, Audit.reviewer_id == user.id, Audit.reviewed_at.isnot(None))
+    elif user.role == "hotelgm":
+        # One of the GM's properties, or all of them; the endpoint checks property_id is theirs
+        property_ids = [property_id] if property_id is not None else managed_property_ids(db, user)
+        counts.update(_audit_counts(db, Audit.property_id.in_(property_ids)))
+        lists["recent_audits"] = _audit_list(
+            db, Audit.created_at.desc(), limit, Audit.property_id.in_(property_ids))
+        upcoming_filters.append(Property.id.in_(property_ids))
+    else:
+        # admin and corporate look across the portfolio
+        counts.update(_audit_counts(db))
+        counts["properties_by_status"] = _property_counts(db)
+        lists["recent_audits"] = _audit_list(db, Audit.created_at.desc(), limit)
+        lists["lowest_scoring_properties"] = _property_list(
+            db, Property.last_audit_score, limit, Property.last_audit_score.isnot(None))
+
+    lists["upcoming_audits"] = _property_list(db, Property.next_audit_date, limit, *upcoming_filters)
+
+    return {"role": user.role, "generated_at": now, "counts": counts, "lists": lists}
+
+def get_summary(db: Session, user: User, property_id: Optional[int] = None, limit: int = 5) -> Dict[str, Any]:
+    key = (user.id, property_id, limit)
+    summary = summary_cache.get(key)
+    record_cache("dashboard_summary", summary is not None)
+    if summary is None:
+        summary = build_summary(db, user, property_id, limit)
+        summary_cache.set(key, summary)
+    return summary
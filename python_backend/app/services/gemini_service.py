@@ -1,33 +1,166 @@
-import google.generativeai as genai
 from typing import List, Dict, Any, Optional
-import json
+import asyncio
 import base64
-from PIL import Image
-import io
+import logging
+import time
 from app.core.config import settings
+from app.core.metrics import (
+    GEMINI_LATENCY, GEMINI_TOKENS, GEMINI_FALLBACKS, GEMINI_PARSE_OUTCOMES, LLM_ROUTE_FALLBACKS, record_cache
+)
+from app.core.profiling import record_span
+from app.schemas.schemas import (
+    ActionPlan, ComplianceInsights, PhotoAnalysisResponse, ReportGenerationResponse, ReportSectionAnalysis,
+    ScoreSuggestionResponse
+)
+from app.services.llm_output import LLMOutputError, parse_output, repair_prompt, response_schema
+from app.services.llm_providers import LLMProvider, LLMResponse, get_llm_provider
+from app.services.model_router import ModelRouter
+from app.services.report_prompts import (
+    ITEM_ROW_FORMAT, SECTIONS_KEY, audit_header, category_digest, chunk_items, compact_json,
+    fit_items, group_by_category, report_digest
+)
+
+logger = logging.getLogger(__name__)
 
 class GeminiService:
-    def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-pro')
+    def __init__(self, provider: Optional[LLMProvider] = None, router: Optional[ModelRouter] = None):
+        self._provider = provider
+        self.router = router or ModelRouter.from_settings()
+    
+    @property
+    def provider(self) -> LLMProvider:
+        """Provider built on first use, so importing the service does not load the SDK"""
+        if self._provider is None:
+            self._provider = get_llm_provider()
+        return self._provider
+    
+    @provider.setter
+    def provider(self, provider: LLMProvider):
+        self._provider = provider
+    
+    async def _generate(self, task: str, prompt: str, images: Optional[List[bytes]] = None,
+                        json_output: bool = False, schema: Optional[dict] = None) -> LLMResponse:
+        """Call the task's routed models in turn until one answers, recording latency and token usage"""
+        candidates = self.router.candidates(task)[:max(1, settings.LLM_ROUTE_MAX_ATTEMPTS)]
+        timeout = self.router.timeout(task)
+        for attempt, model in enumerate(candidates, start=1):
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    self.provider.generate(task, prompt, images, json_output, schema, model), timeout
+                )
+            except Exception as e:
+                elapsed = time.perf_counter() - start
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                GEMINI_LATENCY.labels(task=task, model=model).observe(elapsed)
+                record_span(f"gemini.{task}", elapsed)
+                # A timeout says the model is slow; other errors say nothing about its latency
+                self.router.record(model, elapsed if timed_out else None, ok=False)
+                if attempt == len(candidates):
+                    logger.exception("LLM %s call on %s failed after %.2fs", task, model, elapsed)
+                    raise
+                reason = "timeout" if timed_out else "error"
+                LLM_ROUTE_FALLBACKS.labels(task=task, model=model, reason=reason).inc()
+                logger.warning("LLM %s call on %s failed (%s) after %.2fs, trying %s",
+                               task, model, reason, elapsed, candidates[attempt])
+                continue
+            
+            elapsed = time.perf_counter() - start
+            GEMINI_LATENCY.labels(task=task, model=response.model).observe(elapsed)
+            record_span(f"gemini.{task}", elapsed)
+            self.router.record(model, elapsed, ok=True)
+            GEMINI_TOKENS.labels(task=task, kind="prompt").inc(response.prompt_tokens)
+            GEMINI_TOKENS.labels(task=task, kind="completion").inc(response.completion_tokens)
+            logger.info("LLM %s call on %s took %.2fs", task, response.model, elapsed)
+            return response
+    
+    async def _generate_json(self, task: str, prompt: str, model, images: Optional[List[bytes]] = None) -> Dict[str, Any]:
+        """Generate output matching the pydantic model, with at most LLM_REPAIR_ATTEMPTS repair calls
+        
+        Raises LLMOutputError when no valid output was obtained.
+        """
+        schema = response_schema(model)
+        response = await self._generate(task, prompt, images, json_output=True, schema=schema)
+        try:
+            result, outcome = parse_output(response.text, model)
+        except LLMOutputError as e:
+            error = e
+            for _ in range(settings.LLM_REPAIR_ATTEMPTS):
+                response = await self._generate(f"{task}_repair", repair_prompt(error.text, model, error.errors),
+                                                json_output=True, schema=schema)
+                try:
+                    result, _ = parse_output(response.text, model)
+                    outcome = "model_repaired"
+                    break
+                except LLMOutputError as e:
+                    error = e
+            else:
+                GEMINI_PARSE_OUTCOMES.labels(task=task, outcome="invalid").inc()
+                logger.warning("LLM %s output is invalid: %s", task, "; ".join(error.errors[:3]))
+                raise error
+        GEMINI_PARSE_OUTCOMES.labels(task=task, outcome=outcome).inc()
+        return result
+    
+    async def ping(self) -> float:
+        """Minimal generation call that establishes the client connection; returns its latency"""
+        start = time.perf_counter()
+        await self._generate("ping", "Reply with OK.")
+        return time.perf_counter() - start
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embedding vectors for texts, timed like the generation calls"""
+        start = time.perf_counter()
         try:
-            self.vision_model = genai.GenerativeModel('gemini-pro-vision')
-        except:
-            self.vision_model = None
+            return await self.provider.embed(texts)
+        finally:
+            elapsed = time.perf_counter() - start
+            GEMINI_LATENCY.labels(task="embedding", model=self.provider.name).observe(elapsed)
+            record_span("gemini.embedding", elapsed)
+    
+    def _fallback(self, task: str, reason: str):
+        GEMINI_FALLBACKS.labels(task=task, reason=reason).inc()
+        logger.warning("LLM %s returned placeholder data (%s)", task, reason)
+    
+    def _report_fallback(self, task: str, reason: str, detail: str) -> Dict[str, Any]:
+        self._fallback(task, reason)
+        if reason == "parse_error":
+            return {
+                "summary": "AI-generated audit report based on collected data.",
+                "key_findings": ["Analysis completed using Gemini AI"],
+                "recommendations": ["Implement suggested improvements"],
+                "compliance_overview": {"overall": "Analysis pending"},
+                "ai_insights": {"status": "Generated by Gemini AI", "raw_response": detail}
+            }
+        return {
+            "summary": f"Error generating report: {detail}",
+            "key_findings": ["Unable to generate AI analysis"],
+            "recommendations": ["Manual review recommended"],
+            "compliance_overview": {"error": True},
+            "ai_insights": {"error": detail}
+        }
     
     async def generate_audit_report(self, audit_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate comprehensive audit report using Gemini AI"""
+        """Generate comprehensive audit report using Gemini AI
+        
+        Audits that fit REPORT_PROMPT_TOKEN_BUDGET are analyzed in one call. Larger
+        ones are analyzed per category concurrently and reduced into one report of
+        the same shape.
+        """
+        items = audit_data.get('audit_items', [])
+        header = audit_header(audit_data)
+        encoded, fits = fit_items(items, settings.REPORT_PROMPT_TOKEN_BUDGET)
+        
+        if not fits:
+            sections = await self.analyze_report_sections(header, items)
+            return await self.reduce_report_sections(header, sections)
         
         prompt = f"""
         You are an expert hotel audit analyst. Generate a comprehensive audit report based on the following data:
         
-        Property: {audit_data.get('property_name', 'Unknown')}
-        Location: {audit_data.get('location', 'Unknown')}
-        Audit Date: {audit_data.get('audit_date', 'Unknown')}
-        Audit Type: {audit_data.get('audit_type', 'Standard')}
+        Audit: {header}
         
-        Audit Items Data:
-        {json.dumps(audit_data.get('audit_items', []), indent=2)}
+        Audit items grouped by category, each row {ITEM_ROW_FORMAT}:
+        {encoded}
         
         Please provide:
         1. Executive Summary (2-3 sentences)
@@ -45,33 +178,153 @@ class GeminiService:
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            
-            # Try to parse as JSON, fallback to structured text
-            try:
-                return json.loads(response.text)
-            except json.JSONDecodeError:
-                return {
-                    "summary": "AI-generated audit report based on collected data.",
-                    "key_findings": ["Analysis completed using Gemini AI"],
-                    "recommendations": ["Implement suggested improvements"],
-                    "compliance_overview": {"overall": "Analysis pending"},
-                    "ai_insights": {"status": "Generated by Gemini AI", "raw_response": response.text}
-                }
-                
+            return await self._generate_json("audit_report", prompt, ReportGenerationResponse)
+        except LLMOutputError as e:
+            return self._report_fallback("audit_report", "parse_error", e.text)
+        except Exception as e:
+            return self._report_fallback("audit_report", "error", str(e))
+    
+    async def analyze_report_sections(self, header: str, items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Map step: analyze every category concurrently, at most REPORT_MAP_CONCURRENCY calls at a time"""
+        semaphore = asyncio.Semaphore(settings.REPORT_MAP_CONCURRENCY)
+        groups = group_by_category(items)
+        sections = await asyncio.gather(*(
+            self.analyze_category(header, category, group, semaphore)
+            for category, group in groups.items()
+        ))
+        return dict(zip(groups.keys(), sections))
+    
+    async def analyze_category(self, header: str, category: str, items: List[Dict[str, Any]],
+                               semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+        """Analyze one category, splitting it further when it exceeds the prompt budget"""
+        semaphore = semaphore or asyncio.Semaphore(settings.REPORT_MAP_CONCURRENCY)
+        parts = [part for _, part in chunk_items(items, settings.REPORT_PROMPT_TOKEN_BUDGET)]
+        results = await asyncio.gather(*(
+            self._analyze_section(header, category, part, semaphore) for part in parts
+        ))
+        if len(results) == 1:
+            return results[0]
+        return {
+            "summary": " ".join(result["summary"] for result in results if result.get("summary")),
+            "key_findings": [finding for result in results for finding in result.get("key_findings", [])],
+            "recommendations": [rec for result in results for rec in result.get("recommendations", [])],
+            "compliance": results[0].get("compliance", "unknown"),
+            "failed": any(result.get("failed") for result in results),
+        }
+    
+    async def _analyze_section(self, header: str, category: str, items: List[Dict[str, Any]],
+                               semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        encoded, _ = fit_items(items, settings.REPORT_PROMPT_TOKEN_BUDGET)
+        prompt = f"""
+        You are an expert hotel audit analyst. Analyze the "{category}" section of this audit.
+        
+        Audit: {header}
+        
+        Items, each row {ITEM_ROW_FORMAT}:
+        {encoded}
+        
+        Respond in JSON format with keys: summary (1-2 sentences), key_findings (array),
+        recommendations (array), compliance (compliant/partial/non-compliant)
+        """
+        
+        try:
+            async with semaphore:
+                return await self._generate_json("report_section", prompt, ReportSectionAnalysis)
+        except Exception as e:
+            self._fallback("report_section", "parse_error" if isinstance(e, LLMOutputError) else "error")
+            return {
+                "summary": f"{category}: {len(items)} items reviewed; AI analysis unavailable.",
+                "key_findings": [],
+                "recommendations": [],
+                "compliance": "unknown",
+                "failed": True
+            }
+    
+    async def regenerate_audit_report(self, audit_data: Dict[str, Any],
+                                      previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Generate a report, re-analyzing only categories whose items changed since previous
+        
+        previous is the stored Audit.ai_report. The returned report keeps each category's
+        analysis and input digest under "sections" so the next regeneration can reuse them.
+        """
+        stored = (previous or {}).get(SECTIONS_KEY) or {}
+        header = audit_header(audit_data)
+        groups = group_by_category(audit_data.get('audit_items', []))
+        digests = {category: category_digest(items) for category, items in groups.items()}
+        digest = report_digest(header, digests)
+        
+        if previous and previous.get("report_digest") == digest:
+            record_cache("audit_report", True)
+            return previous
+        
+        stale = [category for category in groups if stored.get(category, {}).get("digest") != digests[category]]
+        for category in groups:
+            record_cache("report_section", category not in stale)
+        
+        semaphore = asyncio.Semaphore(settings.REPORT_MAP_CONCURRENCY)
+        fresh = await asyncio.gather(*(
+            self.analyze_category(header, category, groups[category], semaphore) for category in stale
+        ))
+        analyses = {category: stored[category]["analysis"] for category in groups if category not in stale}
+        analyses.update(zip(stale, fresh))
+        analyses = {category: analyses[category] for category in groups}
+        logger.info("Report regeneration re-analyzed %d of %d categories", len(stale), len(groups))
+        
+        report = await self.reduce_report_sections(header, analyses)
+        # Failed sections keep no digest so the next regeneration retries them
+        report[SECTIONS_KEY] = {
+            category: {"digest": None if analysis.get("failed") else digests[category], "analysis": analysis}
+            for category, analysis in analyses.items()
+        }
+        degraded = any(a.get("failed") for a in analyses.values()) or \
+            (report.get("ai_insights") or {}).get("combined_without_model")
+        report["report_digest"] = None if degraded else digest
+        return report
+    
+    async def reduce_report_sections(self, header: str, sections: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Reduce step: combine per-category analyses into one audit report"""
+        prompt = f"""
+        You are an expert hotel audit analyst. Combine these per-section analyses into one audit report.
+        
+        Audit: {header}
+        
+        Section analyses by category:
+        {compact_json(sections)}
+        
+        Please provide:
+        1. Executive Summary (2-3 sentences)
+        2. Key Findings (the most important issues across all sections)
+        3. Recommendations (prioritized, actionable steps)
+        4. Compliance Overview (compliance status by section)
+        5. AI Insights (patterns and trends across sections)
+        
+        Format your response as JSON with these exact keys:
+        - summary
+        - key_findings (array)
+        - recommendations (array)
+        - compliance_overview (object)
+        - ai_insights (object)
+        """
+        
+        try:
+            return await self._generate_json("report_reduce", prompt, ReportGenerationResponse)
         except Exception as e:
+            # The sections are still useful; stitch them together without the model
+            self._fallback("report_reduce", "parse_error" if isinstance(e, LLMOutputError) else "error")
             return {
-                "summary": f"Error generating report: {str(e)}",
-                "key_findings": ["Unable to generate AI analysis"],
-                "recommendations": ["Manual review recommended"],
-                "compliance_overview": {"error": True},
-                "ai_insights": {"error": str(e)}
+                "summary": " ".join(section.get("summary", "") for section in sections.values()).strip(),
+                "key_findings": [f for section in sections.values() for f in section.get("key_findings", [])],
+                "recommendations": [r for section in sections.values() for r in section.get("recommendations", [])],
+                "compliance_overview": {category: section.get("compliance", "unknown")
+                                        for category, section in sections.items()},
+                "ai_insights": {"sections": len(sections), "combined_without_model": True}
             }
     
     async def analyze_audit_photo(self, image_data: str, context: str) -> Dict[str, Any]:
         """Analyze audit photo using Gemini Vision"""
         
-        if not self.vision_model:
+        if not self.provider.supports_vision:
+            self._fallback("photo_analysis", "unavailable")
             return {
                 "compliance_status": "unknown",
                 "confidence_score": 0.0,
@@ -83,7 +336,6 @@ class GeminiService:
         try:
             # Decode base64 image
             image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
             
             prompt = f"""
             Analyze this hotel audit photo in the context of: {context}
@@ -98,20 +350,19 @@ class GeminiService:
             Respond in JSON format with keys: compliance_status, confidence_score, observations, suggestions, ai_score
             """
             
-            response = self.vision_model.generate_content([prompt, image])
-            
-            try:
-                return json.loads(response.text)
-            except json.JSONDecodeError:
-                return {
-                    "compliance_status": "unknown",
-                    "confidence_score": 0.8,
-                    "observations": [response.text[:200] + "..."],
-                    "suggestions": ["Review AI analysis"],
-                    "ai_score": 75.0
-                }
-                
+            return await self._generate_json("photo_analysis", prompt, PhotoAnalysisResponse, [image_bytes])
+        
+        except LLMOutputError as e:
+            self._fallback("photo_analysis", "parse_error")
+            return {
+                "compliance_status": "unknown",
+                "confidence_score": 0.0,
+                "observations": [e.text[:200] + "..."],
+                "suggestions": ["Review AI analysis"],
+                "ai_score": None
+            }
         except Exception as e:
+            self._fallback("photo_analysis", "error")
             return {
                 "compliance_status": "error",
                 "confidence_score": 0.0,
@@ -120,7 +371,7 @@ class GeminiService:
                 "ai_score": None
             }
     
-    async def suggest_audit_score(self, item_description: str, observations: str) -> Dict[str, Any]:
+    async def suggest_audit_score(self, item_description: str, photos: Optional[List[str]], observations: str) -> Dict[str, Any]:
         """Suggest audit score based on observations"""
         
         prompt = f"""
@@ -128,6 +379,7 @@ class GeminiService:
         
         Item: {item_description}
         Observations: {observations}
+        Photos attached: {len(photos) if photos else 0}
         
         Provide:
         1. Suggested score (0-100)
@@ -139,25 +391,83 @@ class GeminiService:
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            
-            try:
-                result = json.loads(response.text)
-                return result
-            except json.JSONDecodeError:
-                return {
-                    "suggested_score": 75.0,
-                    "confidence": 0.7,
-                    "reasoning": response.text[:200] + "...",
-                    "compliance_zone": "amber"
-                }
-                
+            return await self._generate_json("score_suggestion", prompt, ScoreSuggestionResponse)
+        
+        except LLMOutputError as e:
+            # No score rather than a made-up one, so nothing is stored as an AI suggestion
+            self._fallback("score_suggestion", "parse_error")
+            return {
+                "suggested_score": None,
+                "confidence": 0.0,
+                "reasoning": e.text[:200] + "...",
+                "compliance_zone": None
+            }
         except Exception as e:
+            self._fallback("score_suggestion", "error")
             return {
-                "suggested_score": 50.0,
+                "suggested_score": None,
                 "confidence": 0.0,
                 "reasoning": f"Error: {str(e)}",
-                "compliance_zone": "red"
+                "compliance_zone": None
+            }
+    
+    async def generate_action_plan(self, findings: List[Dict[str, Any]], property_type: str) -> Dict[str, Any]:
+        """Generate a corrective action plan for low-scoring findings"""
+        
+        prompt = f"""
+        You are a hotel operations consultant for a {property_type}. Create a corrective action plan for these audit findings:
+        
+        {compact_json(findings)}
+        
+        For each finding provide the corrective action, priority (high/medium/low), owner and target timeline.
+        
+        Respond in JSON format with key: actions (array of objects with keys: issue, action, priority, owner, timeline)
+        """
+        
+        try:
+            return await self._generate_json("action_plan", prompt, ActionPlan)
+        
+        except LLMOutputError as e:
+            self._fallback("action_plan", "parse_error")
+            return {
+                "actions": [],
+                "raw_response": e.text
+            }
+        except Exception as e:
+            self._fallback("action_plan", "error")
+            return {
+                "actions": [],
+                "error": str(e)
+            }
+    
+    async def generate_compliance_insights(self, audit_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate compliance insights and risk assessment for an audit"""
+        
+        prompt = f"""
+        As a hotel brand compliance analyst, review this audit data and describe compliance patterns, risks and trends:
+        
+        {compact_json(audit_data)}
+        
+        Respond in JSON format with keys: insights (array), risk_level (low/medium/high), focus_areas (array)
+        """
+        
+        try:
+            return await self._generate_json("compliance_insights", prompt, ComplianceInsights)
+        
+        except LLMOutputError as e:
+            self._fallback("compliance_insights", "parse_error")
+            return {
+                "insights": [e.text[:200] + "..."],
+                "risk_level": "unknown",
+                "focus_areas": []
+            }
+        except Exception as e:
+            self._fallback("compliance_insights", "error")
+            return {
+                "insights": [],
+                "risk_level": "unknown",
+                "focus_areas": [],
+                "error": str(e)
             }
 
 # Create global instance
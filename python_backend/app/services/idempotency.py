@@ -0,0 +1,59 @@
+"""
+Stored AI responses for Idempotency-Key replay
+
+Results live in the idempotency_results table, so a client retrying with the
+same key is answered from the first result whichever worker or host serves
+the retry. Rows are keyed by user, key and a digest of the request inputs: a
+retry after the audit or item has changed is computed afresh, and a key reused
+for a different endpoint or target is rejected. Rows expire after
+IDEMPOTENCY_TTL_SECONDS and are deleted as new ones are stored.
+
+All functions block on the database; async callers run them with
+asyncio.to_thread().
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import IdempotencyResult
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a different request"""
+
+def load_result(user_id: int, key: str, request_key: str, input_digest: str) -> Tuple[bool, Any]:
+    """Return (found, result) for a stored response; raises IdempotencyKeyReused"""
+    db = SessionLocal()
+    try:
+        rows = (db.query(IdempotencyResult)
+                .filter(IdempotencyResult.user_id == user_id,
+                        IdempotencyResult.key == key,
+                        IdempotencyResult.expires_at > datetime.utcnow())
+                .all())
+    finally:
+        db.close()
+    for row in rows:
+        if row.request_key != request_key:
+            raise IdempotencyKeyReused(key)
+    for row in rows:
+        if row.input_digest == input_digest:
+            return True, row.result
+    return False, None
+
+def store_result(user_id: int, key: str, request_key: str, input_digest: str, result: Any,
+                 ttl: Optional[float] = None):
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.query(IdempotencyResult).filter(IdempotencyResult.expires_at <= now).delete(synchronize_session=False)
+        db.add(IdempotencyResult(
+            user_id=user_id, key=key, input_digest=input_digest, request_key=request_key, result=result,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS if ttl is None else ttl),
+        ))
+        db.commit()
+    except IntegrityError:
+        # Another worker stored the same request first; its result is equivalent
+        db.rollback()
+    finally:
+        db.close()
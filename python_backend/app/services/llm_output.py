@@ -0,0 +1,184 @@
+"""
+Structured LLM output
+
+Every JSON-producing Gemini call names the pydantic model its answer must
+match. The model is used three ways:
+
+- response_schema() turns it into the OpenAPI subset Gemini accepts as
+  response_schema, so the API constrains decoding to that shape. Models with
+  free-form objects (Dict[str, Any]) cannot be expressed; those calls still
+  request application/json output, just without a schema.
+- JSONExtractor pulls the first complete JSON value out of model text,
+  tolerating markdown fences, prose around the JSON, trailing commas and
+  output cut off mid-object. It is fed incrementally, so it can also stop a
+  streamed response as soon as the value is complete.
+- parse_output() validates the extracted value against the model once, and
+  reports which path produced it for the parse outcome metrics.
+
+When parse_output() fails, GeminiService makes at most LLM_REPAIR_ATTEMPTS
+repair calls before falling back to placeholder data.
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*")
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+
+class LLMOutputError(ValueError):
+    """Model output that could not be turned into a valid response"""
+
+    def __init__(self, message: str, text: str, errors: Optional[List[str]] = None):
+        super().__init__(message)
+        self.text = text
+        self.errors = errors or [message]
+
+@lru_cache(maxsize=None)
+def response_schema(model: Type[BaseModel]) -> Optional[Dict[str, Any]]:
+    """Gemini response_schema for model, or None when the model has free-form objects; do not mutate"""
+    schema = model.model_json_schema()
+    try:
+        return _convert(schema, schema.get("$defs", {}))
+    except ValueError:
+        return None
+
+def _convert(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    if "$ref" in node:
+        return _convert(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+
+    variants = node.get("anyOf")
+    if variants:
+        present = [variant for variant in variants if variant.get("type") != "null"]
+        if len(present) != 1:
+            raise ValueError("Union types are not supported")
+        converted = _convert(present[0], defs)
+        if len(present) < len(variants):
+            converted["nullable"] = True
+        return converted
+
+    kind = node.get("type")
+    if "enum" in node:
+        return {"type": "string", "enum": [str(value) for value in node["enum"]]}
+    if kind == "object":
+        properties = node.get("properties")
+        if not properties:
+            raise ValueError("Free-form objects are not supported")
+        converted = {
+            "type": "object",
+            "properties": {name: _convert(value, defs) for name, value in properties.items()},
+        }
+        if node.get("required"):
+            converted["required"] = list(node["required"])
+        return converted
+    if kind == "array":
+        return {"type": "array", "items": _convert(node.get("items", {}), defs)}
+    if kind in ("string", "number", "integer", "boolean"):
+        return {"type": kind}
+    raise ValueError(f"Unsupported schema node: {node}")
+
+class JSONExtractor:
+    """Incremental scanner for the first top-level JSON object or array in a text stream"""
+
+    def __init__(self):
+        self.buffer: List[str] = []
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.complete = False
+
+    def feed(self, chunk: str) -> bool:
+        """Consume chunk; returns True once a complete value has been read"""
+        for char in chunk:
+            if self.complete:
+                break
+            if not self.started:
+                if char in _CLOSERS:
+                    self.started = True
+                    self.stack.append(_CLOSERS[char])
+                    self.buffer.append(char)
+                continue
+
+            self.buffer.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in _CLOSERS:
+                self.stack.append(_CLOSERS[char])
+            elif char in "}]":
+                if not self.stack or self.stack[-1] != char:
+                    # Mismatched closer; drop it and keep scanning
+                    self.buffer.pop()
+                    continue
+                self.stack.pop()
+                if not self.stack:
+                    self.complete = True
+        return self.complete
+
+    def value(self) -> Optional[str]:
+        """The extracted JSON text, closing any structures left open by a truncated stream"""
+        if not self.started:
+            return None
+        text = "".join(self.buffer)
+        if self.complete:
+            return text
+        if self.in_string:
+            text += '"'
+        text = text.rstrip().rstrip(",:")
+        return text + "".join(reversed(self.stack))
+
+def extract_json(text: str) -> Tuple[Any, str]:
+    """Decode JSON from model text; returns the value and the outcome that produced it"""
+    try:
+        return json.loads(text), "valid"
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    extractor = JSONExtractor()
+    extractor.feed(_FENCE.sub("", text or ""))
+    candidate = extractor.value()
+    if candidate is None:
+        raise LLMOutputError("No JSON object in model output", text)
+    try:
+        return json.loads(candidate), "extracted" if extractor.complete else "repaired"
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(_TRAILING_COMMA.sub(r"\1", candidate)), "repaired"
+    except json.JSONDecodeError as e:
+        raise LLMOutputError(f"Malformed JSON in model output: {e}", text)
+
+def parse_output(text: str, model: Type[BaseModel]) -> Tuple[Dict[str, Any], str]:
+    """Extract and validate model output in one pass; raises LLMOutputError"""
+    value, outcome = extract_json(text)
+    try:
+        parsed = model.model_validate(value)
+    except ValidationError as e:
+        errors = [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()]
+        raise LLMOutputError("Model output does not match the response schema", text, errors)
+    # Keep keys outside the model, e.g. extra detail the model volunteered
+    result = dict(value)
+    result.update(parsed.model_dump(mode="json"))
+    return result, outcome
+
+def repair_prompt(text: str, model: Type[BaseModel], errors: List[str]) -> str:
+    return f"""
+        Your previous answer could not be used. Problems:
+        {chr(10).join(f"- {error}" for error in errors[:10])}
+
+        Previous answer:
+        {text[:4000]}
+
+        Return only the corrected JSON, no markdown, matching this JSON schema:
+        {json.dumps(model.model_json_schema(), separators=(",", ":"))}
+        """
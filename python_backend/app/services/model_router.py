@@ -0,0 +1,154 @@
+"""
+Latency-aware model routing for LLM tasks
+
+Each task runs on a tier (fast, standard, deep, vision), and each tier lists
+its models in order of preference. Short, structured answers such as score
+suggestions go to the fast tier, while full reports stay on the deep tier.
+Tasks without an entry, and repair calls ("<task>_repair") without one of
+their own, use their task's tier or "standard".
+
+The router keeps an exponentially weighted average of latency and error rate
+per model. A model is moved behind its tier's alternates when:
+- its average latency exceeds the tier's latency target, or
+- its error rate has reached LLM_ROUTE_ERROR_THRESHOLD, which takes it out
+  of the lead for LLM_ROUTE_COOLDOWN_SECONDS.
+Observations older than the cooldown are ignored, so a demoted model gets
+traffic again later and can show it has recovered.
+
+GeminiService tries the candidates in order, at most LLM_ROUTE_MAX_ATTEMPTS of
+them. Each attempt is cut off after LLM_ROUTE_TIMEOUT_FACTOR times the tier
+target.
+
+LLM_MODEL_TIERS, LLM_TASK_TIERS and LLM_TIER_LATENCY_TARGETS override the
+defaults below key by key.
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import LLM_MODEL_ERROR_RATE, LLM_MODEL_LATENCY
+
+DEFAULT_MODEL_TIERS: Dict[str, List[str]] = {
+    "fast": ["gemini-1.5-flash-8b", "gemini-1.5-flash"],
+    "standard": ["gemini-1.5-flash", "gemini-1.5-pro"],
+    "deep": ["gemini-1.5-pro", "gemini-1.5-flash"],
+    "vision": ["gemini-1.5-flash", "gemini-1.5-pro"],
+}
+DEFAULT_TASK_TIERS: Dict[str, str] = {
+    "ping": "fast",
+    "score_suggestion": "fast",
+    "compliance_insights": "fast",
+    "action_plan": "standard",
+    "report_section": "standard",
+    "photo_analysis": "vision",
+    "audit_report": "deep",
+    "report_reduce": "deep",
+}
+DEFAULT_LATENCY_TARGETS: Dict[str, float] = {"fast": 2.0, "standard": 8.0, "deep": 20.0, "vision": 8.0}
+DEFAULT_TIER = "standard"
+
+# USD per million prompt and completion tokens, for cost estimates
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+# Weight of the newest observation in the moving averages
+SMOOTHING = 0.2
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+class ModelStats:
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.cooldown_until = 0.0
+        self.updated_at = 0.0
+
+    def observe(self, seconds: Optional[float], ok: bool):
+        self.calls += 1
+        self.updated_at = time.monotonic()
+        if seconds is not None:
+            self.latency = seconds if self.latency is None else (1 - SMOOTHING) * self.latency + SMOOTHING * seconds
+        self.error_rate = (1 - SMOOTHING) * self.error_rate + SMOOTHING * (0.0 if ok else 1.0)
+
+class ModelRouter:
+    def __init__(self, tiers: Dict[str, List[str]], task_tiers: Dict[str, str],
+                 latency_targets: Dict[str, float], timeout_factor: float = 4.0,
+                 error_threshold: float = 0.5, cooldown: float = 30.0):
+        for tier, models in tiers.items():
+            if not models:
+                raise ValueError(f"Model tier {tier!r} lists no models")
+        for task, tier in task_tiers.items():
+            if tier not in tiers:
+                raise ValueError(f"Task {task!r} is routed to unknown tier {tier!r}")
+        self.tiers = tiers
+        self.task_tiers = task_tiers
+        self.latency_targets = latency_targets
+        self.timeout_factor = timeout_factor
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.stats: Dict[str, ModelStats] = {}
+
+    @classmethod
+    def from_settings(cls) -> "ModelRouter":
+        return cls(
+            {**DEFAULT_MODEL_TIERS, **settings.LLM_MODEL_TIERS},
+            {**DEFAULT_TASK_TIERS, **settings.LLM_TASK_TIERS},
+            {**DEFAULT_LATENCY_TARGETS, **settings.LLM_TIER_LATENCY_TARGETS},
+            settings.LLM_ROUTE_TIMEOUT_FACTOR,
+            settings.LLM_ROUTE_ERROR_THRESHOLD,
+            settings.LLM_ROUTE_COOLDOWN_SECONDS,
+        )
+
+    def tier(self, task: str) -> str:
+        tier = self.task_tiers.get(task) or self.task_tiers.get(task.removesuffix("_repair"), DEFAULT_TIER)
+        return tier if tier in self.tiers else next(iter(self.tiers))
+
+    def timeout(self, task: str) -> Optional[float]:
+        target = self.latency_targets.get(self.tier(task))
+        return target * self.timeout_factor if target else None
+
+    def candidates(self, task: str) -> List[str]:
+        """The task's tier models, healthy and within the latency target first, otherwise in configured order"""
+        tier = self.tier(task)
+        target = self.latency_targets.get(tier)
+        now = time.monotonic()
+
+        def rank(indexed: Tuple[int, str]):
+            index, model = indexed
+            stats = self.stats.get(model)
+            if stats is None or now - stats.updated_at > self.cooldown:
+                return (False, False, index)
+            slow = target is not None and stats.latency is not None and stats.latency > target
+            return (stats.cooldown_until > now, slow, index)
+
+        return [model for _, model in sorted(enumerate(self.tiers[tier]), key=rank)]
+
+    def record(self, model: str, seconds: Optional[float], ok: bool):
+        """Fold one call into the model's averages; seconds is None when the call says nothing about latency"""
+        stats = self.stats.setdefault(model, ModelStats())
+        stats.observe(seconds, ok)
+        if not ok and stats.error_rate >= self.error_threshold:
+            stats.cooldown_until = time.monotonic() + self.cooldown
+        if stats.latency is not None:
+            LLM_MODEL_LATENCY.labels(model=model).set(stats.latency)
+        LLM_MODEL_ERROR_RATE.labels(model=model).set(stats.error_rate)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic()
+        return {
+            model: {
+                "calls": stats.calls,
+                "latency_seconds": round(stats.latency or 0.0, 3),
+                "error_rate": round(stats.error_rate, 3),
+                "cooling_down": stats.cooldown_until > now,
+            }
+            for model, stats in self.stats.items()
+        }
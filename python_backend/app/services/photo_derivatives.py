@@ -0,0 +1,191 @@
+"""
+Audit photo derivatives
+
+Photos are stored on audit items as base64 blobs (plain strings or data URLs,
+or {"type": "photo", "content": ...} media entries from the auditor app).
+Thumbnail and medium renditions are resized in the shared process pool and
+cached on disk keyed by a hash of the original, so a derivative URL always
+refers to the same bytes and can be cached by browsers indefinitely.
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+from app.core.cache import SingleFlight
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import record_cache
+from app.core.workers import run_in_process
+from app.models.models import AuditItem
+
+# Longest edge in pixels for each derivative size
+PHOTO_SIZES = {
+    "thumb": 160,
+    "medium": 800,
+}
+
+PHOTO_FORMATS = {
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+DERIVATIVE_QUALITY = 80
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+BASE64_PREFIX = re.compile(r"^[A-Za-z0-9+/]{16}")
+
+# Leading bytes of the image formats Pillow is expected to read
+IMAGE_SIGNATURES = (b"\xff\xd8\xff", b"\x89PNG", b"GIF8", b"RIFF", b"II*\x00", b"MM\x00*", b"BM")
+
+class PhotoError(Exception):
+    pass
+
+def photo_content(entry: Any) -> Optional[str]:
+    """The base64 payload of a photo entry, or None for other media and URLs"""
+    if isinstance(entry, dict):
+        if entry.get("type", "photo") != "photo":
+            return None
+        entry = entry.get("content")
+    if not isinstance(entry, str) or not entry:
+        return None
+    if entry.startswith("data:"):
+        header, _, entry = entry.partition(",")
+        if not header.startswith("data:image/") or ";base64" not in header:
+            return None
+    elif entry.startswith(("http://", "https://")):
+        return None
+    elif entry.startswith("/") and not _is_base64_image(entry):
+        # A path on this server; raw base64 JPEG data also starts with "/9j/"
+        return None
+    return entry
+
+def _is_base64_image(entry: str) -> bool:
+    if not BASE64_PREFIX.match(entry):
+        return False
+    head = base64.b64decode(entry[:16])
+    return head.startswith(IMAGE_SIGNATURES)
+
+def decode_photo(content: str) -> bytes:
+    try:
+        return base64.b64decode(content, validate=False)
+    except (binascii.Error, ValueError):
+        raise PhotoError("Photo is not valid base64")
+
+def photo_digest(content: str) -> str:
+    """Content hash of a photo's base64 payload; the cache key for its derivatives"""
+    return hashlib.sha256(content.encode("ascii", "ignore")).hexdigest()[:32]
+
+def item_photos(photos: Optional[List[Any]]) -> List[Dict[str, Any]]:
+    """Index and digest of every image among an item's photos"""
+    if isinstance(photos, str):
+        # The web client stores the media list as a JSON string
+        try:
+            photos = json.loads(photos)
+        except ValueError:
+            photos = [photos]
+    if not isinstance(photos, list):
+        return []
+    result = []
+    for index, entry in enumerate(photos or []):
+        content = photo_content(entry)
+        if content is not None:
+            result.append({"index": index, "digest": photo_digest(content), "content": content})
+    return result
+
+def photo_index(photos: Optional[List[Any]]) -> List[Dict[str, Any]]:
+    """Index and digest of each image, as stored in AuditItem.photo_digests"""
+    return [{"index": photo["index"], "digest": photo["digest"]} for photo in item_photos(photos)]
+
+def render_derivative(data: bytes, max_edge: int, fmt: str) -> bytes:
+    """Resize an image to fit max_edge; runs inside a worker process"""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.draft("RGB", (max_edge, max_edge))
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError) as e:
+        raise PhotoError(f"Unreadable image: {e}")
+
+    # JPEG has no alpha channel; WebP keeps transparency when the original has it
+    mode = "RGBA" if fmt == "webp" and "A" in image.getbands() else "RGB"
+    if image.mode != mode:
+        image = image.convert(mode)
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    output = io.BytesIO()
+    image.save(output, format=fmt.upper(), quality=DERIVATIVE_QUALITY, optimize=fmt == "jpeg")
+    return output.getvalue()
+
+class DerivativeCache:
+    """On-disk derivative store, sharded by the first two characters of the digest"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path_for(self, digest: str, size: str, fmt: str) -> str:
+        return os.path.join(self.directory, digest[:2], f"{digest}-{size}.{fmt}")
+
+    def get(self, digest: str, size: str, fmt: str) -> Optional[str]:
+        path = self.path_for(digest, size, fmt)
+        return path if os.path.exists(path) else None
+
+    def put(self, digest: str, size: str, fmt: str, content: bytes) -> str:
+        path = self.path_for(digest, size, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return path
+
+derivative_cache = DerivativeCache(settings.PHOTO_CACHE_DIR)
+_renders = SingleFlight("photo_render")
+
+def cached_derivative(digest: str, size: str, fmt: str) -> Optional[str]:
+    if not DIGEST_PATTERN.match(digest):
+        return None
+    path = derivative_cache.get(digest, size, fmt)
+    record_cache("photo_derivative", path is not None)
+    return path
+
+async def get_derivative(content: str, size: str, fmt: str, digest: Optional[str] = None) -> str:
+    """Return the path of a photo derivative, rendering it in the worker pool on a cache miss"""
+    if digest is not None and not DIGEST_PATTERN.match(digest):
+        raise PhotoError(f"Invalid photo digest: {digest}")
+    if size not in PHOTO_SIZES:
+        raise PhotoError(f"Unsupported photo size: {size}")
+    if fmt not in PHOTO_FORMATS:
+        raise PhotoError(f"Unsupported photo format: {fmt}")
+
+    digest = digest or photo_digest(content)
+    cached = derivative_cache.get(digest, size, fmt)
+    if cached:
+        return cached
+
+    async def render() -> str:
+        data = await run_in_process(render_derivative, decode_photo(content), PHOTO_SIZES[size], fmt)
+        return derivative_cache.put(digest, size, fmt, data)
+
+    return await _renders.do(derivative_cache.path_for(digest, size, fmt), render)
+
+async def generate_item_derivatives(item_id: int):
+    """Pre-render every size and format for an item's photos; run as a background task"""
+    db = SessionLocal()
+    try:
+        item = db.query(AuditItem).filter(AuditItem.id == item_id).first()
+        photos = item_photos(item.photos) if item else []
+    finally:
+        db.close()
+
+    for photo in photos:
+        try:
+            for size in PHOTO_SIZES:
+                for fmt in PHOTO_FORMATS:
+                    await get_derivative(photo["content"], size, fmt, digest=photo["digest"])
+        except PhotoError:
+            continue
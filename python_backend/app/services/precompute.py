@@ -0,0 +1,204 @@
+"""
+Off-peak precomputation of AI reports and insights
+
+Audits that reach "submitted" or "reviewed" without stored AI output are
+picked up during PRECOMPUTE_WINDOW. The scheduler generates their report,
+action plan and insights just as POST /api/ai/generate-report does, and queues
+the results through the write-behind writer. Reviewers opening the audit then
+read stored ai_insights instead of waiting for Gemini.
+
+Work is ordered by due date. Submitted audits awaiting review come first,
+oldest submission first, then reviewed audits by review date. At most
+PRECOMPUTE_CONCURRENCY audits are generated at once, and at most
+PRECOMPUTE_MAX_AUDITS per window. Audits whose generation fails are not
+retried until the next window.
+
+Run one scheduler per deployment, separately from the API workers:
+
+    python -m app.services.precompute            # loop, working inside the window
+    python -m app.services.precompute --now      # one pass, ignoring the window
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import List, Optional, Set, Tuple
+from sqlalchemy import Text, case, cast, func
+from sqlalchemy.orm import joinedload
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import Audit
+from app.services.ai_writeback import ai_results
+from app.services.gemini_service import gemini_service
+from app.services.report_prompts import report_audit_data, report_findings
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTE_STATUSES = ("submitted", "reviewed")
+
+def parse_window(window: str) -> Optional[Tuple[dt_time, dt_time]]:
+    """Parse "HH:MM-HH:MM"; None (an empty setting) means no restriction"""
+    if not window.strip():
+        return None
+    try:
+        start, end = (datetime.strptime(part.strip(), "%H:%M").time() for part in window.split("-"))
+    except ValueError:
+        raise ValueError(f"Invalid precompute window {window!r}, expected HH:MM-HH:MM")
+    return start, end
+
+def window_start(now: datetime, window: Optional[Tuple[dt_time, dt_time]]) -> Optional[date]:
+    """Date the current window opened on, or None when now is outside it; windows may wrap midnight"""
+    if window is None:
+        return now.date()
+    start, end = window
+    current = now.time()
+    if start <= end:
+        return now.date() if start <= current < end else None
+    if current >= start:
+        return now.date()
+    if current < end:
+        return now.date() - timedelta(days=1)
+    return None
+
+def _json_missing(db, column):
+    """SQL NULL, or the JSON null the ORM stores when a JSON attribute is set to None"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stored_null = func.json_typeof(column) == "null"
+    elif dialect == "sqlite":
+        stored_null = func.json_type(column) == "null"
+    else:
+        stored_null = cast(column, Text) == "null"
+    return column.is_(None) | stored_null
+
+def due_audit_ids(db, limit: int, exclude: Set[int]) -> List[int]:
+    """Audits missing AI output, most urgent first"""
+    query = (db.query(Audit.id)
+             .filter(Audit.status.in_(PRECOMPUTE_STATUSES),
+                     _json_missing(db, Audit.ai_insights) | _json_missing(db, Audit.ai_report))
+             .order_by(case((Audit.status == "submitted", 0), else_=1),
+                       func.coalesce(Audit.submitted_at, Audit.reviewed_at, Audit.created_at),
+                       Audit.id))
+    if exclude:
+        query = query.filter(Audit.id.notin_(exclude))
+    return [row.id for row in query.limit(limit)]
+
+async def precompute_audit(audit_id: int):
+    db = SessionLocal()
+    try:
+        audit = db.query(Audit).options(
+            joinedload(Audit.property),
+            joinedload(Audit.auditor),
+            joinedload(Audit.audit_items)
+        ).filter(Audit.id == audit_id).first()
+        if audit is None:
+            return
+        audit_data = report_audit_data(audit)
+        findings = report_findings(audit)
+        previous_report = audit.ai_report
+    finally:
+        db.close()
+
+    ai_report, ai_action_plan, ai_insights = await asyncio.gather(
+        gemini_service.regenerate_audit_report(audit_data, previous_report),
+        gemini_service.generate_action_plan(findings, "luxury hotel") if findings else asyncio.sleep(0),
+        gemini_service.generate_compliance_insights(audit_data),
+    )
+    await asyncio.to_thread(ai_results.submit_audit, audit_id, ai_report, ai_action_plan, ai_insights)
+
+class PrecomputeScheduler:
+    def __init__(self, window: str, concurrency: int, max_audits: int, poll_seconds: float):
+        self.window = parse_window(window)
+        self.concurrency = max(1, concurrency)
+        self.max_audits = max_audits
+        self.poll_seconds = poll_seconds
+        self._window_key: Optional[date] = None
+        self._used = 0
+        self._failed: Set[int] = set()
+
+    def remaining(self, now: datetime) -> int:
+        """Audits left in this window's quota, resetting it when a new window opens"""
+        key = window_start(now, self.window)
+        if key is None:
+            return 0
+        if key != self._window_key:
+            self._window_key, self._used, self._failed = key, 0, set()
+        return max(0, self.max_audits - self._used)
+
+    async def _worker(self, queue: asyncio.Queue, ignore_window: bool):
+        while True:
+            audit_id = await queue.get()
+            try:
+                if not ignore_window and window_start(datetime.now(), self.window) is None:
+                    continue
+                self._used += 1
+                await precompute_audit(audit_id)
+            except Exception:
+                logger.exception("Precomputing AI output for audit %s failed", audit_id)
+                self._failed.add(audit_id)
+            finally:
+                queue.task_done()
+
+    async def run_pass(self, ignore_window: bool = False) -> int:
+        """Precompute one batch of due audits; returns the number attempted"""
+        used = self._used
+        limit = self.max_audits if ignore_window else self.remaining(datetime.now())
+        if limit <= 0:
+            return 0
+
+        db = SessionLocal()
+        try:
+            audit_ids = due_audit_ids(db, limit, self._failed)
+        finally:
+            db.close()
+        if not audit_ids:
+            return 0
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for audit_id in audit_ids:
+            queue.put_nowait(audit_id)
+        workers = [asyncio.create_task(self._worker(queue, ignore_window)) for _ in range(self.concurrency)]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+        attempted = self._used - used
+        logger.info("Precomputed AI output for %d audits", attempted)
+        return attempted
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.run_pass()
+                await ai_results.flush_all()
+            except Exception:
+                logger.exception("Precompute pass failed")
+            await asyncio.sleep(self.poll_seconds)
+
+def scheduler_from_settings() -> PrecomputeScheduler:
+    return PrecomputeScheduler(settings.PRECOMPUTE_WINDOW, settings.PRECOMPUTE_CONCURRENCY,
+                               settings.PRECOMPUTE_MAX_AUDITS, settings.PRECOMPUTE_POLL_SECONDS)
+
+async def _run(now: bool):
+    scheduler = scheduler_from_settings()
+    ai_results.start()
+    try:
+        if now:
+            count = await scheduler.run_pass(ignore_window=True)
+            print(f"Precomputed AI output for {count} audits")
+        else:
+            await scheduler.run_forever()
+    finally:
+        await ai_results.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute AI reports and insights for audits awaiting review")
+    parser.add_argument("--now", action="store_true", help="Run a single pass immediately, ignoring the window")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run(args.now))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Token-budgeted prompt building for audit reports
+
+Audit items are encoded compactly: grouped by category, one row per item
+([item, score, comments, photos]), no indentation and empty fields dropped.
+When the whole audit does not fit REPORT_PROMPT_TOKEN_BUDGET it is split into
+per-category chunks for map-reduce generation; oversized categories are split
+again and long comments are trimmed to fit.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+from app.core.config import settings
+
+# Rough chars-per-token ratio for English prose and compact JSON
+CHARS_PER_TOKEN = 4
+ITEM_ROW_FORMAT = "[item, score, comments, photos]"
+
+# Key under Audit.ai_report holding per-category analyses for incremental regeneration
+SECTIONS_KEY = "sections"
+# Bump when the section prompt changes so cached analyses are not reused
+SECTION_PROMPT_VERSION = 1
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _item_row(item: Dict[str, Any], comment_chars: int) -> list:
+    comments = (item.get("comments") or "").strip()
+    if len(comments) > comment_chars:
+        comments = comments[:comment_chars].rstrip() + "…"
+    row = [item.get("item"), item.get("score"), comments, item.get("photos_count") or 0]
+    # Trailing photo count and comments carry no information when empty
+    if not row[3]:
+        row.pop()
+        if not comments:
+            row.pop()
+    return row
+
+def group_by_category(items: List[Dict[str, Any]]) -> "OrderedDict[str, List[Dict[str, Any]]]":
+    groups: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    for item in items:
+        groups.setdefault(item.get("category") or "Uncategorized", []).append(item)
+    return groups
+
+def encode_items(items: List[Dict[str, Any]], comment_chars: int = None) -> str:
+    """Items as {category: [[item, score, comments, photos], ...]}"""
+    comment_chars = comment_chars or settings.REPORT_COMMENT_CHARS
+    return compact_json({
+        category: [_item_row(item, comment_chars) for item in group]
+        for category, group in group_by_category(items).items()
+    })
+
+def fit_items(items: List[Dict[str, Any]], budget: int) -> Tuple[str, bool]:
+    """Encode items within a token budget, trimming comments before giving up; returns (text, fits)"""
+    comment_chars = settings.REPORT_COMMENT_CHARS
+    while True:
+        encoded = encode_items(items, comment_chars)
+        if estimate_tokens(encoded) <= budget or comment_chars <= 40:
+            return encoded, estimate_tokens(encoded) <= budget
+        comment_chars //= 2
+
+def chunk_items(items: List[Dict[str, Any]], budget: int) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """Split items into (category, items) chunks that each encode within budget"""
+    chunks = []
+    for category, group in group_by_category(items).items():
+        pending = [group]
+        while pending:
+            part = pending.pop(0)
+            if len(part) > 1 and not fit_items(part, budget)[1]:
+                middle = len(part) // 2
+                pending[:0] = [part[:middle], part[middle:]]
+            else:
+                chunks.append((category, part))
+    return chunks
+
+def category_digest(items: List[Dict[str, Any]]) -> str:
+    """Digest of everything the section prompt sees for a category"""
+    rows = [[item.get("item"), item.get("score"), item.get("comments") or "", item.get("photos_count") or 0]
+            for item in items]
+    return hashlib.sha256(compact_json([SECTION_PROMPT_VERSION, rows]).encode()).hexdigest()
+
+def report_digest(header: str, digests: Dict[str, str]) -> str:
+    return hashlib.sha256(compact_json([header, sorted(digests.items())]).encode()).hexdigest()
+
+def audit_header(audit_data: Dict[str, Any]) -> str:
+    fields = {
+        "property": audit_data.get("property_name"),
+        "location": audit_data.get("location"),
+        "date": audit_data.get("audit_date"),
+        "type": audit_data.get("audit_type", "Standard"),
+        "scores": {
+            key: audit_data.get(f"{key}_score")
+            for key in ("overall", "cleanliness", "branding", "operational")
+            if audit_data.get(f"{key}_score") is not None
+        },
+    }
+    return compact_json({key: value for key, value in fields.items() if value})
+
+def report_audit_data(audit) -> Dict[str, Any]:
+    """Report input for an audit loaded with its property, auditor and items"""
+    return {
+        "property_name": audit.property.name if audit.property else "Unknown",
+        "location": audit.property.location if audit.property else "Unknown",
+        "audit_date": audit.created_at.isoformat() if audit.created_at else None,
+        "auditor_name": audit.auditor.name if audit.auditor else "Unknown",
+        "overall_score": audit.overall_score,
+        "cleanliness_score": audit.cleanliness_score,
+        "branding_score": audit.branding_score,
+        "operational_score": audit.operational_score,
+        "audit_items": [
+            {
+                "category": item.category,
+                "item": item.item,
+                "score": item.score,
+                "comments": item.comments,
+                "photos_count": len(item.photos) if item.photos else 0
+            }
+            for item in audit.audit_items
+        ]
+    }
+
+def report_findings(audit) -> List[Dict[str, Any]]:
+    """Low-scoring items, the input for the action plan"""
+    return [
+        {
+            "category": item.category,
+            "issue": item.item,
+            "score": item.score,
+            "comments": item.comments
+        }
+        for item in audit.audit_items if item.score and item.score < 4
+    ]
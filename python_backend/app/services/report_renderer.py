@@ -0,0 +1,224 @@
+"""
+Audit report rendering
+
+Reports are rendered from a plain snapshot of the audit in the shared process
+pool and cached on disk keyed by the audit version, so repeated downloads are
+served straight from the file system. Writes never touch the cache: an edit
+changes the version, and renders of older versions are pruned when the next
+one is stored.
+"""
+
+import hashlib
+import html
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.core.cache import SingleFlight
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.core.workers import run_in_process
+from app.models.models import Audit
+
+REPORT_FORMATS = {
+    "html": "text/html",
+    "pdf": "application/pdf",
+}
+
+class ReportRenderError(Exception):
+    pass
+
+def audit_version(audit: Audit) -> str:
+    """Stable digest of an audit and its items; changes whenever either is modified"""
+    digest = hashlib.sha1()
+    digest.update(f"{audit.id}:{audit.updated_at or audit.created_at}".encode())
+    for item in sorted(audit.audit_items, key=lambda i: i.id):
+        digest.update(f"|{item.id}:{item.updated_at or item.created_at}".encode())
+    return digest.hexdigest()[:16]
+
+def build_report_context(audit: Audit) -> Dict[str, Any]:
+    """Snapshot the audit into plain data that can be sent to a worker process"""
+    categories = OrderedDict()
+    for item in sorted(audit.audit_items, key=lambda i: (i.category, i.id)):
+        categories.setdefault(item.category, []).append({
+            "item": item.item,
+            "score": item.score,
+            "ai_suggested_score": item.ai_suggested_score,
+            "comments": item.comments,
+            "status": item.status,
+            "photos_count": len(item.photos) if item.photos else 0,
+        })
+
+    return {
+        "audit_id": audit.id,
+        "property_name": audit.property.name if audit.property else "Unknown",
+        "location": audit.property.location if audit.property else "Unknown",
+        "auditor_name": audit.auditor.name if audit.auditor else "Unknown",
+        "reviewer_name": audit.reviewer.name if audit.reviewer else None,
+        "status": audit.status,
+        "audit_date": audit.created_at.strftime("%d %b %Y") if audit.created_at else None,
+        "compliance_zone": audit.compliance_zone,
+        "scores": OrderedDict([
+            ("Overall", audit.overall_score),
+            ("Cleanliness", audit.cleanliness_score),
+            ("Branding", audit.branding_score),
+            ("Operational", audit.operational_score),
+        ]),
+        "ai_report": audit.ai_report or {},
+        "action_plan": audit.action_plan,
+        "ai_insights": audit.ai_insights,
+        "categories": categories,
+    }
+
+def _render_value(value: Any) -> str:
+    """Render arbitrary JSON data from the AI columns as nested HTML"""
+    if value is None or value == "" or value == [] or value == {}:
+        return "<p class=\"muted\">Not available</p>"
+    if isinstance(value, dict):
+        rows = "".join(
+            f"<dt>{html.escape(str(key).replace('_', ' ').title())}</dt><dd>{_render_value(val)}</dd>"
+            for key, val in value.items()
+        )
+        return f"<dl>{rows}</dl>"
+    if isinstance(value, list):
+        return "<ul>" + "".join(f"<li>{_render_value(val)}</li>" for val in value) + "</ul>"
+    return html.escape(str(value))
+
+def render_html(context: Dict[str, Any]) -> str:
+    report = context["ai_report"]
+    scores = "".join(
+        f"<tr><th>{name}</th><td>{'-' if score is None else score}</td></tr>"
+        for name, score in context["scores"].items()
+    )
+
+    sections = []
+    for category, items in context["categories"].items():
+        rows = "".join(
+            "<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>".format(
+                html.escape(item["item"]),
+                "-" if item["score"] is None else item["score"],
+                "-" if item["ai_suggested_score"] is None else item["ai_suggested_score"],
+                html.escape(item["comments"] or ""),
+            )
+            for item in items
+        )
+        sections.append(
+            f"<h3>{html.escape(category)}</h3>"
+            "<table><tr><th>Item</th><th>Score</th><th>AI Score</th><th>Comments</th></tr>"
+            f"{rows}</table>"
+        )
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Audit Report - {html.escape(context["property_name"])}</title>
+<style>
+body {{ font-family: Helvetica, Arial, sans-serif; margin: 2em; color: #222; }}
+table {{ border-collapse: collapse; width: 100%; margin-bottom: 1em; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: left; vertical-align: top; }}
+dt {{ font-weight: bold; }}
+.muted {{ color: #888; }}
+.zone-green {{ color: #2e7d32; }} .zone-amber {{ color: #f9a825; }} .zone-red {{ color: #c62828; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(context["property_name"])}</h1>
+<p>{html.escape(context["location"])} &middot; Audit #{context["audit_id"]} &middot; {html.escape(context["audit_date"] or "")}</p>
+<p>Auditor: {html.escape(context["auditor_name"])}{" &middot; Reviewer: " + html.escape(context["reviewer_name"]) if context["reviewer_name"] else ""}</p>
+<p>Status: {html.escape(context["status"] or "")} &middot; Compliance zone: <span class="zone-{html.escape(context["compliance_zone"] or "")}">{html.escape(context["compliance_zone"] or "n/a")}</span></p>
+<h2>Scores</h2>
+<table>{scores}</table>
+<h2>Executive Summary</h2>
+<p>{html.escape(str(report.get("summary") or "Not available"))}</p>
+<h2>Key Findings</h2>
+{_render_value(report.get("key_findings"))}
+<h2>Recommendations</h2>
+{_render_value(report.get("recommendations"))}
+<h2>Compliance Overview</h2>
+{_render_value(report.get("compliance_overview"))}
+<h2>Action Plan</h2>
+{_render_value(context["action_plan"])}
+<h2>AI Insights</h2>
+{_render_value(context["ai_insights"])}
+<h2>Audit Items</h2>
+{"".join(sections) or '<p class="muted">No audit items recorded</p>'}
+</body>
+</html>
+"""
+
+def render_report(context: Dict[str, Any], fmt: str) -> bytes:
+    """Render a report snapshot; runs inside a worker process"""
+    document = render_html(context)
+    if fmt == "html":
+        return document.encode("utf-8")
+
+    # PDF output needs the optional weasyprint package
+    from weasyprint import HTML
+    return HTML(string=document).write_pdf()
+
+class ReportCache:
+    """On-disk cache of rendered reports, one file per audit version and format"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path_for(self, audit_id: int, version: str, fmt: str) -> str:
+        return os.path.join(self.directory, f"audit-{audit_id}-{version}.{fmt}")
+
+    def get(self, audit_id: int, version: str, fmt: str) -> Optional[str]:
+        path = self.path_for(audit_id, version, fmt)
+        return path if os.path.exists(path) else None
+
+    def put(self, audit_id: int, version: str, fmt: str, content: bytes) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(audit_id, version, fmt)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return path
+
+    def invalidate(self, audit_id: int, keep_version: Optional[str] = None):
+        """Remove cached renders of an audit, optionally keeping the current version"""
+        if not os.path.isdir(self.directory):
+            return
+        prefix = f"audit-{audit_id}-"
+        for name in os.listdir(self.directory):
+            if not name.startswith(prefix) or name.endswith(".tmp"):
+                continue
+            if keep_version and name.startswith(f"{prefix}{keep_version}."):
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+report_cache = ReportCache(settings.REPORT_CACHE_DIR)
+_renders = SingleFlight("report_render")
+
+async def get_rendered_report(audit: Audit, fmt: str = "html") -> str:
+    """Return the path of the rendered report, rendering it in the worker pool on a cache miss"""
+    if fmt not in REPORT_FORMATS:
+        raise ReportRenderError(f"Unsupported report format: {fmt}")
+
+    version = audit_version(audit)
+    cached = report_cache.get(audit.id, version, fmt)
+    record_cache("report", cached is not None)
+    if cached:
+        return cached
+
+    context = build_report_context(audit)
+
+    async def render() -> str:
+        try:
+            content = await run_in_process(render_report, context, fmt)
+        except ImportError:
+            raise ReportRenderError("PDF rendering requires the weasyprint package")
+        path = report_cache.put(audit.id, version, fmt, content)
+        # Older versions can no longer be requested; prune them here rather than on every write
+        report_cache.invalidate(audit.id, keep_version=version)
+        return path
+
+    # Concurrent downloads of the same version share a single render
+    return await _renders.do(report_cache.path_for(audit.id, version, fmt), render)
+
@@ -0,0 +1,242 @@
+"""
+Score statistics and anomaly detection across audits
+
+Audit and item scores are loaded once into columnar NumPy arrays and every
+statistic is computed over the whole dataset with grouped array operations
+(bincount, lexsort, cumulative sums) rather than per-property or per-auditor
+loops:
+
+- percentiles of the audit scores, and of item scores per checklist category
+- audit z-scores, with the most extreme audits listed as outliers
+- auditor bias: each audit's overall score minus its property's mean, averaged
+  per auditor, with a t statistic. An item-level bias is also computed from
+  category-standardized item scores.
+- change points: per property and score, the mean of the latest
+  CHANGE_WINDOW audits against the CHANGE_WINDOW before them
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.models import Audit, AuditItem, Property
+
+SCORE_FIELDS = ("overall_score", "cleanliness_score", "branding_score", "operational_score")
+PERCENTILES = (5, 25, 50, 75, 95)
+CHANGE_WINDOW = 3
+CHANGE_THRESHOLD = 10.0  # points on the 0-100 audit scale
+BIAS_T_THRESHOLD = 3.0
+OUTLIER_Z_THRESHOLD = 3.0
+
+def _column(rows: List[tuple], index: int, dtype) -> np.ndarray:
+    return np.fromiter((np.nan if row[index] is None else row[index] for row in rows), dtype=dtype, count=len(rows))
+
+def _audit_filters(date_from: Optional[datetime], date_to: Optional[datetime], region: Optional[str]) -> list:
+    filters = [Audit.overall_score.isnot(None)]
+    if region:
+        filters.append(Audit.property_id.in_(select(Property.id).where(Property.region == region)))
+    if date_from:
+        filters.append(Audit.created_at >= date_from)
+    if date_to:
+        filters.append(Audit.created_at <= date_to)
+    return filters
+
+def load_audit_scores(db: Session, filters: list) -> Dict[str, np.ndarray]:
+    rows = db.execute(
+        select(Audit.id, Audit.property_id, Audit.auditor_id, Audit.created_at,
+               *(getattr(Audit, field) for field in SCORE_FIELDS)).where(*filters)
+    ).all()
+
+    columns = {
+        "id": _column(rows, 0, np.int64),
+        "property_id": _column(rows, 1, np.int64),
+        "auditor_id": np.fromiter((row[2] or 0 for row in rows), dtype=np.int64, count=len(rows)),
+        "created_at": np.array([row[3] for row in rows], dtype="datetime64[s]"),
+    }
+    for offset, field in enumerate(SCORE_FIELDS, start=4):
+        columns[field] = _column(rows, offset, np.float64)
+    return columns
+
+def load_item_scores(db: Session, filters: list) -> Dict[str, Any]:
+    """Item scores of the matching audits; categories are returned as integer codes plus their names"""
+    rows = db.execute(
+        select(AuditItem.audit_id, AuditItem.category, AuditItem.score)
+        .join(Audit, Audit.id == AuditItem.audit_id)
+        .where(AuditItem.score.isnot(None), *filters)
+    ).all()
+    # Dictionary-encode categories; far cheaper than np.unique over a million strings
+    index: Dict[str, int] = {}
+    codes = np.fromiter((index.setdefault(row[1], len(index)) for row in rows), dtype=np.int64, count=len(rows))
+    return {
+        "audit_id": np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+        "category": codes,
+        "score": np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows)),
+        "categories": list(index),
+    }
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {}
+    return {f"p{q}": round(float(v), 2) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+def grouped_percentiles(groups: np.ndarray, values: np.ndarray, group_count: int) -> np.ndarray:
+    """Percentiles per group (rows) with linear interpolation, from one lexsort"""
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    counts = np.bincount(groups, minlength=group_count)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    positions = (counts[:, None] - 1) * (np.array(PERCENTILES) / 100.0)[None, :]
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(counts[:, None] - 1, 0))
+    fraction = positions - lower
+    result = (sorted_values[np.minimum(starts[:, None] + lower, len(values) - 1)] * (1 - fraction)
+              + sorted_values[np.minimum(starts[:, None] + upper, len(values) - 1)] * fraction)
+    result[counts == 0] = np.nan
+    return result
+
+def _group_mean(codes: np.ndarray, values: np.ndarray, count: int):
+    n = np.bincount(codes, minlength=count).astype(np.float64)
+    total = np.bincount(codes, weights=values, minlength=count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return total / n, n
+
+def auditor_bias(audits: Dict[str, np.ndarray], min_audits: int) -> List[Dict[str, Any]]:
+    """Mean deviation of each auditor's overall scores from the audited properties' means"""
+    valid = ~np.isnan(audits["overall_score"])
+    scores = audits["overall_score"][valid]
+    _, property_codes = np.unique(audits["property_id"][valid], return_inverse=True)
+    auditor_ids, auditor_codes = np.unique(audits["auditor_id"][valid], return_inverse=True)
+
+    property_mean, property_n = _group_mean(property_codes, scores, property_codes.max() + 1 if len(scores) else 0)
+    # Properties audited once carry no information about the auditor
+    informative = property_n[property_codes] > 1
+    residual = scores - property_mean[property_codes]
+
+    codes, residual = auditor_codes[informative], residual[informative]
+    bias, n = _group_mean(codes, residual, len(auditor_ids))
+    squares = np.bincount(codes, weights=residual ** 2, minlength=len(auditor_ids))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (squares - n * bias ** 2) / (n - 1)
+        t = bias / np.sqrt(variance / n)
+
+    result = []
+    for index in np.argsort(-np.abs(np.nan_to_num(t))):
+        if n[index] < min_audits or not auditor_ids[index]:
+            continue
+        result.append({
+            "auditor_id": int(auditor_ids[index]),
+            "audits": int(n[index]),
+            "bias": round(float(bias[index]), 2),
+            "t_statistic": round(float(t[index]), 2),
+            "flagged": bool(abs(t[index]) >= BIAS_T_THRESHOLD),
+        })
+    return result
+
+def item_auditor_bias(audits: Dict[str, np.ndarray], items: Dict[str, Any]) -> Dict[int, float]:
+    """Mean category-standardized item score per auditor"""
+    if not len(items["score"]):
+        return {}
+    category_count = len(items["categories"])
+    mean, _ = _group_mean(items["category"], items["score"], category_count)
+    squares = np.bincount(items["category"], weights=items["score"] ** 2, minlength=category_count)
+    n = np.bincount(items["category"], minlength=category_count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.sqrt(squares / n - mean ** 2)
+        z = (items["score"] - mean[items["category"]]) / std[items["category"]]
+    z = np.nan_to_num(z)
+
+    order = np.argsort(audits["id"])
+    positions = np.searchsorted(audits["id"], items["audit_id"], sorter=order)
+    auditors = audits["auditor_id"][order][positions]
+    auditor_ids, codes = np.unique(auditors, return_inverse=True)
+    bias, _ = _group_mean(codes, z, len(auditor_ids))
+    return {int(auditor): round(float(value), 3) for auditor, value in zip(auditor_ids, bias) if auditor}
+
+def score_changes(audits: Dict[str, np.ndarray], limit: int) -> List[Dict[str, Any]]:
+    """Latest shift per property and score between the last two windows of CHANGE_WINDOW audits"""
+    order = np.lexsort((audits["created_at"], audits["property_id"]))
+    properties = audits["property_id"][order]
+    # Index of the last audit of each property, and how many audits it has
+    last = np.flatnonzero(np.append(properties[1:] != properties[:-1], True))
+    counts = np.diff(np.concatenate(([-1], last)))
+    eligible = counts >= 2 * CHANGE_WINDOW
+    last, property_ids = last[eligible], properties[last[eligible]]
+
+    changes = []
+    for field in SCORE_FIELDS:
+        values = audits[field][order]
+        filled = np.nan_to_num(values)
+        cumulative = np.concatenate(([0.0], np.cumsum(filled)))
+        end = last + 1
+        recent = (cumulative[end] - cumulative[end - CHANGE_WINDOW]) / CHANGE_WINDOW
+        prior = (cumulative[end - CHANGE_WINDOW] - cumulative[end - 2 * CHANGE_WINDOW]) / CHANGE_WINDOW
+        delta = recent - prior
+        # Windows containing a missing score are skipped
+        missing = np.concatenate(([0], np.cumsum(np.isnan(values))))
+        complete = (missing[end] - missing[end - 2 * CHANGE_WINDOW]) == 0
+        flagged = complete & (np.abs(delta) >= CHANGE_THRESHOLD)
+        for index in np.flatnonzero(flagged):
+            changes.append({
+                "property_id": int(property_ids[index]),
+                "score": field,
+                "previous_mean": round(float(prior[index]), 2),
+                "recent_mean": round(float(recent[index]), 2),
+                "change": round(float(delta[index]), 2),
+            })
+    changes.sort(key=lambda change: change["change"])
+    return changes[:limit]
+
+def outlier_audits(audits: Dict[str, np.ndarray], limit: int) -> List[Dict[str, Any]]:
+    scores = audits["overall_score"]
+    with np.errstate(invalid="ignore"):
+        z = (scores - np.nanmean(scores)) / np.nanstd(scores)
+    z = np.nan_to_num(z)
+    candidates = np.flatnonzero(np.abs(z) >= OUTLIER_Z_THRESHOLD)
+    candidates = candidates[np.argsort(-np.abs(z[candidates]))][:limit]
+    return [
+        {
+            "audit_id": int(audits["id"][index]),
+            "property_id": int(audits["property_id"][index]),
+            "overall_score": float(scores[index]),
+            "z_score": round(float(z[index]), 2),
+        }
+        for index in candidates
+    ]
+
+def analyze_scores(db: Session, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                   region: Optional[str] = None, min_audits: int = 5, limit: int = 20,
+                   include_items: bool = True) -> Dict[str, Any]:
+    filters = _audit_filters(date_from, date_to, region)
+    audits = load_audit_scores(db, filters)
+    result: Dict[str, Any] = {
+        "audits": int(len(audits["id"])),
+        "items": 0,
+        "percentiles": {field: _percentiles(audits[field]) for field in SCORE_FIELDS},
+        "category_percentiles": {},
+        "auditor_bias": [],
+        "score_changes": [],
+        "outlier_audits": [],
+    }
+    if not len(audits["id"]):
+        return result
+
+    bias = auditor_bias(audits, min_audits)
+    if include_items:
+        items = load_item_scores(db, filters)
+        result["items"] = int(len(items["score"]))
+        if len(items["score"]):
+            table = grouped_percentiles(items["category"], items["score"], len(items["categories"]))
+            result["category_percentiles"] = {
+                str(name): {f"p{q}": round(float(v), 2) for q, v in zip(PERCENTILES, row)}
+                for name, row in sorted(zip(items["categories"], table), key=lambda pair: pair[0])
+            }
+            item_bias = item_auditor_bias(audits, items)
+            for entry in bias:
+                entry["item_z_mean"] = item_bias.get(entry["auditor_id"])
+
+    result["auditor_bias"] = bias[:limit]
+    result["score_changes"] = score_changes(audits, limit)
+    result["outlier_audits"] = outlier_audits(audits, limit)
+    return result
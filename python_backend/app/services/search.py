@@ -0,0 +1,227 @@
+"""
+Full-text search over audit findings, item comments and AI output
+
+Documents live in the search_documents table and are kept current by a
+session after_flush hook whenever an Audit or AuditItem is written. Postgres
+queries use a GIN-indexed tsvector with ts_rank_cd/ts_headline; SQLite uses
+the FTS5 mirror table with bm25/snippet. Highlights are HTML: the source text
+is escaped and only the <mark> tags around matches are markup.
+
+Rebuild the index for existing data with:
+    python -m app.services.search --reindex
+"""
+
+import argparse
+import html
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import delete, event, inspect, select, text, update
+from sqlalchemy.orm import Session
+from app.models.models import Audit, AuditItem, Property, SearchDocument
+from app.services.report_prompts import SECTIONS_KEY
+
+AUDIT_SOURCES = ("findings", "ai_report", "ai_insights")
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+# The database marks matches with these control characters; they are stripped from indexed text
+_MATCH_START = "\x02"
+_MATCH_STOP = "\x03"
+_SENTINELS = str.maketrans("", "", _MATCH_START + _MATCH_STOP)
+
+# Columns whose changes alter search documents
+AUDIT_INDEXED = AUDIT_SOURCES + ("property_id", "created_at")
+ITEM_INDEXED = ("audit_id", "category", "item", "comments")
+
+def flatten_text(value: Any) -> str:
+    """Collect the string content of nested JSON into one searchable block"""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return " ".join(filter(None, (flatten_text(v) for v in value.values())))
+    if isinstance(value, (list, tuple)):
+        return " ".join(filter(None, (flatten_text(v) for v in value)))
+    return str(value).translate(_SENTINELS)
+
+def item_text(item: AuditItem) -> str:
+    return " ".join(filter(None, [item.category, item.item, item.comments])).translate(_SENTINELS)
+
+def _audit_context(connection, audit_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    rows = connection.execute(
+        select(Audit.id, Audit.property_id, Property.region, Audit.created_at)
+        .join(Property, Property.id == Audit.property_id, isouter=True)
+        .where(Audit.id.in_(list(audit_ids)))
+    )
+    return {
+        row.id: {"property_id": row.property_id, "region": row.region, "audit_date": row.created_at}
+        for row in rows
+    }
+
+def _replace_documents(connection, keys: List[tuple], documents: List[Dict[str, Any]]):
+    table = SearchDocument.__table__
+    for source, audit_id, item_id in keys:
+        connection.execute(delete(table).where(
+            table.c.source == source,
+            table.c.audit_id == audit_id,
+            table.c.item_id.is_(None) if item_id is None else table.c.item_id == item_id,
+        ))
+    if documents:
+        connection.execute(table.insert(), documents)
+
+def index_changes(connection, audits: List[Audit], items: List[AuditItem],
+                  deleted_items: List[AuditItem] = (), deleted_audits: List[Audit] = ()):
+    """Bring search documents in line with written audits and items"""
+    if deleted_audits:
+        connection.execute(delete(SearchDocument.__table__).where(
+            SearchDocument.__table__.c.audit_id.in_([audit.id for audit in deleted_audits])))
+    audit_ids = {audit.id for audit in audits} | {item.audit_id for item in items}
+    if not audit_ids and not deleted_items:
+        return
+    context = _audit_context(connection, audit_ids) if audit_ids else {}
+
+    keys, documents = [], []
+    for audit in audits:
+        for source in AUDIT_SOURCES:
+            keys.append((source, audit.id, None))
+            value = getattr(audit, source)
+            if source == "ai_report" and isinstance(value, dict):
+                # Per-category analyses duplicate the report and carry digests
+                value = {key: val for key, val in value.items() if key not in (SECTIONS_KEY, "report_digest")}
+            body = flatten_text(value)
+            if body:
+                documents.append({"source": source, "audit_id": audit.id, "item_id": None,
+                                  "body": body, **context.get(audit.id, {})})
+        # Item documents carry the audit's property and date for filtering
+        if audit.id in context:
+            connection.execute(update(SearchDocument.__table__)
+                               .where(SearchDocument.__table__.c.audit_id == audit.id)
+                               .values(**context[audit.id]))
+
+    for item in items:
+        keys.append(("item_comment", item.audit_id, item.id))
+        if item.comments:
+            documents.append({"source": "item_comment", "audit_id": item.audit_id, "item_id": item.id,
+                              "body": item_text(item), **context.get(item.audit_id, {})})
+    for item in deleted_items:
+        keys.append(("item_comment", item.audit_id, item.id))
+
+    _replace_documents(connection, keys, documents)
+
+def _indexed_change(obj, columns) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[column].history.has_changes() for column in columns)
+
+@event.listens_for(Session, "after_flush")
+def _index_on_flush(session, flush_context):
+    # Writes that leave indexed text alone (AI scores, version bumps, status) keep their documents
+    audits = [obj for obj in session.new if isinstance(obj, Audit)] + \
+        [obj for obj in session.dirty if isinstance(obj, Audit) and _indexed_change(obj, AUDIT_INDEXED)]
+    items = [obj for obj in session.new if isinstance(obj, AuditItem)] + \
+        [obj for obj in session.dirty if isinstance(obj, AuditItem) and _indexed_change(obj, ITEM_INDEXED)]
+    deleted_items = [obj for obj in session.deleted if isinstance(obj, AuditItem)]
+    deleted_audits = [obj for obj in session.deleted if isinstance(obj, Audit)]
+    if audits or items or deleted_items or deleted_audits:
+        index_changes(session.connection(), audits, items, deleted_items, deleted_audits)
+
+class SearchUnavailable(Exception):
+    """The database has no full-text backend"""
+
+def _fts5_query(query: str) -> str:
+    """Quote user terms so FTS5 treats them as plain words (implicit AND), keeping quoted phrases"""
+    phrases = re.findall(r'"([^"]+)"', query)
+    words = re.findall(r"\w+", re.sub(r'"[^"]+"', " ", query))
+    terms = ['"{}"'.format(p.replace('"', "")) for p in phrases] + [f'"{w}"' for w in words]
+    return " ".join(terms)
+
+def search_documents(db: Session, query: str, property_id: Optional[int] = None,
+                     region: Optional[str] = None, date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None, source: Optional[str] = None,
+                     limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    """Ranked, highlighted matches for a free-text query
+    
+    Raises SearchUnavailable on databases without a full-text backend.
+    """
+    dialect = db.get_bind().dialect.name
+    params: Dict[str, Any] = {"limit": limit, "offset": offset, "start": _MATCH_START, "stop": _MATCH_STOP}
+    filters = []
+    for column, value in (("property_id", property_id), ("region", region), ("source", source)):
+        if value is not None:
+            filters.append(f"d.{column} = :{column}")
+            params[column] = value
+    if date_from is not None:
+        filters.append("d.audit_date >= :date_from")
+        params["date_from"] = date_from
+    if date_to is not None:
+        filters.append("d.audit_date <= :date_to")
+        params["date_to"] = date_to
+    where = "".join(f" AND {condition}" for condition in filters)
+    columns = "d.id, d.audit_id, d.item_id, d.source, d.property_id, d.region, d.audit_date"
+
+    if dialect == "postgresql":
+        params["query"] = query
+        params["options"] = f"StartSel={_MATCH_START}, StopSel={_MATCH_STOP}, MaxWords=35, MinWords=15"
+        sql = (
+            f"SELECT {columns}, ts_rank_cd(to_tsvector('english', d.body), q) AS rank, "
+            "ts_headline('english', d.body, q, :options) AS highlight "
+            "FROM search_documents d, websearch_to_tsquery('english', :query) q "
+            f"WHERE to_tsvector('english', d.body) @@ q{where} "
+            "ORDER BY rank DESC LIMIT :limit OFFSET :offset"
+        )
+    elif dialect == "sqlite":
+        params["query"] = _fts5_query(query)
+        if not params["query"]:
+            return []
+        sql = (
+            f"SELECT {columns}, -bm25(search_documents_fts) AS rank, "
+            "snippet(search_documents_fts, 0, :start, :stop, '...', 24) AS highlight "
+            "FROM search_documents_fts JOIN search_documents d ON d.id = search_documents_fts.rowid "
+            f"WHERE search_documents_fts MATCH :query{where} "
+            "ORDER BY rank DESC LIMIT :limit OFFSET :offset"
+        )
+    else:
+        raise SearchUnavailable(f"Full-text search is not supported on {dialect}")
+
+    results = [dict(row._mapping) for row in db.execute(text(sql), params)]
+    for result in results:
+        result["highlight"] = highlight_html(result["highlight"])
+    return results
+
+def highlight_html(snippet: Optional[str]) -> str:
+    """Escape the matched text as HTML, then turn the match sentinels into <mark> tags"""
+    escaped = html.escape(snippet or "")
+    return escaped.replace(_MATCH_START, HIGHLIGHT_START).replace(_MATCH_STOP, HIGHLIGHT_STOP)
+
+def rebuild_index(db: Session, batch_size: int = 1000):
+    """Re-create every search document from the audits and items tables"""
+    connection = db.connection()
+    connection.execute(delete(SearchDocument.__table__))
+    last_id = 0
+    while True:
+        audits = db.query(Audit).filter(Audit.id > last_id).order_by(Audit.id).limit(batch_size).all()
+        if not audits:
+            break
+        audit_ids = [audit.id for audit in audits]
+        items = db.query(AuditItem).filter(AuditItem.audit_id.in_(audit_ids)).all()
+        index_changes(connection, audits, items)
+        last_id = audit_ids[-1]
+        db.expunge_all()
+    db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the audit full-text search index")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the index from existing audits")
+    args = parser.parse_args()
+
+    if args.reindex:
+        from app.core.database import SessionLocal, create_tables
+
+        create_tables()
+        db = SessionLocal()
+        try:
+            rebuild_index(db)
+            print("✅ Search index rebuilt")
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Similar-findings index
+
+Item comments and audit findings are embedded through the LLM provider and
+stored as packed float32 rows in finding_embeddings. Each worker keeps the
+vectors in an in-memory, unit-normalized matrix: queries are one vectorized
+dot product plus argpartition. Past SIMILARITY_ANN_THRESHOLD vectors the
+index switches to a faiss HNSW graph when faiss is installed. faiss is an
+optional dependency, listed commented out in requirements.txt; without it
+searches stay exact.
+
+Loading the matrix and building the graph take a worker thread, never the
+event loop. Workers load the index during warmup; until the first load has
+finished, find_similar raises IndexNotReady and the endpoint answers 503.
+Later syncs run in the background every SIMILARITY_REFRESH_SECONDS.
+
+New and edited items, including those changed through offline sync, are
+indexed by a background task after the write; other workers pick the rows up
+on their next sync. Backfill existing data with:
+    python -m app.services.similarity --backfill
+"""
+
+import argparse
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import Audit, AuditItem, FindingEmbedding
+from app.services.gemini_service import gemini_service
+from app.services.search import flatten_text, item_text
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = 100
+MAX_EMBED_CHARS = 2000
+SYNC_BATCH_SIZE = 10000
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class VectorIndex:
+    """Cosine top-k over unit vectors, exact with NumPy or approximate with faiss HNSW"""
+
+    def __init__(self, ann_threshold: int):
+        self.ann_threshold = ann_threshold
+        self.size = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._positions: Dict[int, int] = {}
+        self._ann = None
+        self._ann_unavailable = False
+        self._lock = threading.Lock()
+
+    def _reserve(self, count: int, dim: int):
+        capacity = 0 if self._vectors is None else len(self._vectors)
+        if self.size + count <= capacity:
+            return
+        capacity = max(1024, capacity * 2, self.size + count)
+        vectors = np.zeros((capacity, dim), dtype=np.float32)
+        ids = np.full(capacity, -1, dtype=np.int64)
+        if self._vectors is not None:
+            vectors[:self.size] = self._vectors[:self.size]
+            ids[:self.size] = self._ids[:self.size]
+        self._vectors, self._ids = vectors, ids
+
+    def _build_ann(self):
+        try:
+            import faiss
+        except ImportError:
+            self._ann_unavailable = True
+            logger.warning("faiss is not installed; similar-findings search stays exact over %d vectors", self.size)
+            return
+        ann = faiss.IndexHNSWFlat(self._vectors.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        ann.hnsw.efSearch = 64
+        ann.add(self._vectors[:self.size])
+        self._ann = ann
+
+    def add(self, ids: List[int], vectors: np.ndarray):
+        with self._lock:
+            keep = [i for i, row_id in enumerate(ids) if row_id not in self._positions]
+            if not keep:
+                return
+            vectors = _normalize(np.asarray(vectors, dtype=np.float32)[keep])
+            self._reserve(len(keep), vectors.shape[1])
+            start = self.size
+            self._vectors[start:start + len(keep)] = vectors
+            for offset, i in enumerate(keep):
+                self._ids[start + offset] = ids[i]
+                self._positions[ids[i]] = start + offset
+            self.size += len(keep)
+
+            if self._ann is not None:
+                self._ann.add(vectors)
+            elif self.size >= self.ann_threshold and not self._ann_unavailable:
+                self._build_ann()
+
+    def remove(self, ids: Iterable[int]):
+        """Drop rows from results; their slots stay allocated until the worker restarts"""
+        with self._lock:
+            for row_id in ids:
+                position = self._positions.pop(row_id, None)
+                if position is not None:
+                    self._vectors[position] = 0.0
+                    self._ids[position] = -1
+
+    def search(self, vector, k: int) -> List[Tuple[int, float]]:
+        size, vectors, ids, ann = self.size, self._vectors, self._ids, self._ann
+        if size == 0:
+            return []
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+        k = min(k, size)
+
+        if ann is not None:
+            scores, positions = ann.search(query[None, :], k)
+            scores, positions = scores[0], positions[0]
+        else:
+            all_scores = vectors[:size] @ query
+            positions = np.argpartition(all_scores, -k)[-k:] if k < size else np.arange(size)
+            positions = positions[np.argsort(all_scores[positions])[::-1]]
+            scores = all_scores[positions]
+
+        return [(int(ids[p]), float(s)) for p, s in zip(positions, scores) if p >= 0 and ids[p] >= 0]
+
+def embedding_model() -> str:
+    provider = gemini_service.provider
+    return getattr(provider, "embedding_model", provider.name)
+
+class IndexNotReady(Exception):
+    """The worker is still loading its similarity index"""
+
+class FindingIndex:
+    """Per-worker view of finding_embeddings for the active embedding model"""
+
+    def __init__(self):
+        self.vectors = VectorIndex(settings.SIMILARITY_ANN_THRESHOLD)
+        self.ready = False
+        self._loaded_id = 0
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def sync(self):
+        """Load embeddings stored since the last sync, including those written by other workers; blocking"""
+        model = embedding_model()
+        db = SessionLocal()
+        try:
+            with self._lock:
+                while True:
+                    rows = db.execute(
+                        select(FindingEmbedding.id, FindingEmbedding.vector)
+                        .where(FindingEmbedding.id > self._loaded_id, FindingEmbedding.model == model)
+                        .order_by(FindingEmbedding.id)
+                        .limit(SYNC_BATCH_SIZE)
+                    ).all()
+                    if not rows:
+                        break
+                    self.vectors.add([row.id for row in rows],
+                                     np.stack([np.frombuffer(row.vector, dtype=np.float32) for row in rows]))
+                    self._loaded_id = rows[-1].id
+                self._synced_at = time.monotonic()
+                self.ready = True
+        finally:
+            db.close()
+
+    async def load(self) -> Dict[str, Any]:
+        """Sync in a worker thread, sharing a sync already in progress"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(asyncio.to_thread(self.sync))
+            self._task.add_done_callback(self._sync_done)
+        await asyncio.shield(self._task)
+        return {"vectors": self.vectors.size}
+
+    def _sync_done(self, task: asyncio.Task):
+        self._task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Similarity index sync failed", exc_info=task.exception())
+
+    def refresh(self):
+        """Start a background sync when the index is missing or older than SIMILARITY_REFRESH_SECONDS"""
+        due = not self.ready or time.monotonic() - self._synced_at >= settings.SIMILARITY_REFRESH_SECONDS
+        if due and self._task is None:
+            self._task = asyncio.ensure_future(asyncio.to_thread(self.sync))
+            self._task.add_done_callback(self._sync_done)
+
+finding_index = FindingIndex()
+
+def _documents(db: Session, item_ids: Iterable[int], audit_ids: Iterable[int]) -> Tuple[List[tuple], List[Dict[str, Any]]]:
+    keys, documents = [], []
+    item_ids, audit_ids = list(item_ids), list(audit_ids)
+    if item_ids:
+        for item in db.query(AuditItem).filter(AuditItem.id.in_(item_ids)):
+            keys.append(("item_comment", item.audit_id, item.id))
+            if item.comments:
+                documents.append({"source": "item_comment", "audit_id": item.audit_id,
+                                  "item_id": item.id, "text": item_text(item)})
+    if audit_ids:
+        for audit in db.query(Audit).filter(Audit.id.in_(audit_ids)):
+            keys.append(("findings", audit.id, None))
+            text = flatten_text(audit.findings)
+            if text:
+                documents.append({"source": "findings", "audit_id": audit.id, "item_id": None, "text": text})
+    return keys, documents
+
+def _key_filter(keys: List[tuple]):
+    """Match the rows for (source, audit_id, item_id) keys: item rows by item, audit rows by audit"""
+    item_ids = [item_id for _, _, item_id in keys if item_id is not None]
+    audit_ids = [audit_id for _, audit_id, item_id in keys if item_id is None]
+    return or_(
+        and_(FindingEmbedding.source == "item_comment", FindingEmbedding.item_id.in_(item_ids)),
+        and_(FindingEmbedding.source == "findings", FindingEmbedding.item_id.is_(None),
+             FindingEmbedding.audit_id.in_(audit_ids)),
+    )
+
+async def index_findings(item_ids: Iterable[int] = (), audit_ids: Iterable[int] = ()):
+    """Re-embed the given items and audit findings; scheduled as a background task after writes"""
+    db = SessionLocal()
+    try:
+        keys, documents = _documents(db, item_ids, audit_ids)
+        vectors = []
+        for start in range(0, len(documents), EMBED_BATCH_SIZE):
+            batch = documents[start:start + EMBED_BATCH_SIZE]
+            vectors.extend(await gemini_service.embed([doc["text"][:MAX_EMBED_CHARS] for doc in batch]))
+
+        stale = list(db.scalars(select(FindingEmbedding.id).where(_key_filter(keys)))) if keys else []
+        if stale:
+            db.execute(delete(FindingEmbedding).where(FindingEmbedding.id.in_(stale))
+                       .execution_options(synchronize_session=False))
+
+        model = embedding_model()
+        rows = [
+            FindingEmbedding(**doc, model=model, vector=np.asarray(vector, dtype=np.float32).tobytes())
+            for doc, vector in zip(documents, vectors)
+        ]
+        db.add_all(rows)
+        db.commit()
+
+        finding_index.vectors.remove(stale)
+        if rows:
+            # Crossing SIMILARITY_ANN_THRESHOLD builds the HNSW graph, so stay off the event loop
+            await asyncio.to_thread(finding_index.vectors.add, [row.id for row in rows],
+                                    np.asarray(vectors, dtype=np.float32))
+    except Exception:
+        db.rollback()
+        logger.exception("Failed to index findings (items=%s, audits=%s)", item_ids, audit_ids)
+    finally:
+        db.close()
+
+async def find_similar(db: Session, text: str, limit: int = 10,
+                       exclude_item_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Past findings closest to text, with the action plan of the audit they came from; raises IndexNotReady"""
+    finding_index.refresh()
+    if not finding_index.ready:
+        raise IndexNotReady()
+    vector = (await gemini_service.embed([text[:MAX_EMBED_CHARS]]))[0]
+    # Over-fetch: rows deleted by other workers may still be in this worker's index
+    matches = await asyncio.to_thread(finding_index.vectors.search, vector, limit * 2 + 1)
+    if not matches:
+        return []
+
+    rows = db.execute(
+        select(FindingEmbedding.id, FindingEmbedding.audit_id, FindingEmbedding.item_id,
+               FindingEmbedding.source, FindingEmbedding.text, Audit.action_plan)
+        .join(Audit, Audit.id == FindingEmbedding.audit_id)
+        .where(FindingEmbedding.id.in_([row_id for row_id, _ in matches]))
+    ).all()
+    by_id = {row.id: row for row in rows}
+
+    results = []
+    for row_id, similarity in matches:
+        row = by_id.get(row_id)
+        if row is None or (exclude_item_id is not None and row.item_id == exclude_item_id):
+            continue
+        results.append({
+            "audit_id": row.audit_id,
+            "item_id": row.item_id,
+            "source": row.source,
+            "text": row.text,
+            "similarity": similarity,
+            "action_plan": row.action_plan,
+        })
+        if len(results) == limit:
+            break
+    return results
+
+async def backfill(batch_size: int = 500):
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            audit_ids = [row.id for row in db.query(Audit.id).filter(Audit.id > last_id)
+                         .order_by(Audit.id).limit(batch_size)]
+            if not audit_ids:
+                break
+            item_ids = [row.id for row in db.query(AuditItem.id).filter(AuditItem.audit_id.in_(audit_ids))]
+            await index_findings(item_ids, audit_ids)
+            last_id = audit_ids[-1]
+            print(f"Indexed audits up to {last_id}")
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the similar-findings embedding index")
+    parser.add_argument("--backfill", action="store_true", help="Embed all existing items and findings")
+    args = parser.parse_args()
+
+    if args.backfill:
+        from app.core.database import create_tables
+
+        create_tables()
+        asyncio.run(backfill())
+        print("✅ Similar-findings index backfilled")
+
+if __name__ == "__main__":
+    main()
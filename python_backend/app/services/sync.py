@@ -0,0 +1,95 @@
+"""
+Delta sync for offline auditors
+
+A device sends every item edit made since its last sync together with the
+item version it edited, and its cursor (the server time returned by the
+previous sync). Changes are applied in one transaction. An edit whose base
+version is stale is reported as a conflict with the server's copy, unless it
+matches the server values already (a retry whose response was lost). The
+response carries every item and audit changed since the cursor, AI
+suggestions included, and the next cursor.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import Audit, AuditItem, User
+from app.schemas.schemas import SyncRequest, SyncItem, SyncAudit, SyncConflict
+
+SYNC_FIELDS = ("score", "comments", "photos", "status")
+
+def sync_scope(db: Session, user: User, audit_ids: Optional[List[int]]) -> Set[int]:
+    """Audits the user may sync: requested ones they can access, or their own open assignments"""
+    query = db.query(Audit.id)
+    if audit_ids:
+        query = query.filter(Audit.id.in_(audit_ids))
+    else:
+        query = query.filter(Audit.auditor_id == user.id, Audit.status != "completed")
+    if user.role not in ["admin", "reviewer"]:
+        query = query.filter(Audit.auditor_id == user.id)
+    return {row.id for row in query}
+
+def _merge_changes(request: SyncRequest) -> "OrderedDict[int, Dict[str, Any]]":
+    """Fold several edits of one item into one, in client time order"""
+    merged: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+    for change in sorted(request.changes, key=lambda change: change.client_updated_at):
+        entry = merged.setdefault(change.item_id, {"version": change.version, "fields": {}})
+        entry["version"] = min(entry["version"], change.version)
+        entry["fields"].update(change.dict(include=set(SYNC_FIELDS), exclude_unset=True))
+    return merged
+
+def apply_sync(db: Session, user: User, request: SyncRequest) -> Dict[str, Any]:
+    cursor = datetime.utcnow()
+    scope = sync_scope(db, user, request.audit_ids)
+    changes = _merge_changes(request)
+
+    items = {
+        item.id: item
+        for item in db.query(AuditItem).filter(AuditItem.id.in_(list(changes))).with_for_update()
+    } if changes else {}
+
+    applied, conflicts = [], []
+    for item_id, change in changes.items():
+        item = items.get(item_id)
+        if item is None:
+            conflicts.append(SyncConflict(item_id=item_id, reason="not_found", client_version=change["version"]))
+            continue
+        if item.audit_id not in scope:
+            conflicts.append(SyncConflict(item_id=item_id, reason="forbidden", client_version=change["version"]))
+            continue
+
+        fields = change["fields"]
+        # An empty change proves nothing about the server copy, so it only passes at the current version
+        already_applied = bool(fields) and all(getattr(item, field) == value for field, value in fields.items())
+        if item.version != change["version"] and not already_applied:
+            conflicts.append(SyncConflict(item_id=item_id, reason="version", client_version=change["version"],
+                                          server=SyncItem.model_validate(item)))
+            continue
+
+        for field, value in fields.items():
+            setattr(item, field, value)
+        if fields and not already_applied:
+            item.version = item.version + 1
+        applied.append(item_id)
+
+    db.flush()
+
+    changed_items = db.query(AuditItem).filter(AuditItem.audit_id.in_(scope))
+    changed_audits = db.query(Audit).filter(Audit.id.in_(scope))
+    if request.cursor is not None:
+        since = request.cursor - timedelta(seconds=settings.SYNC_CURSOR_OVERLAP_SECONDS)
+        changed_items = changed_items.filter(AuditItem.updated_at > since)
+        changed_audits = changed_audits.filter(Audit.updated_at > since)
+
+    # Serialize before commit expires the loaded rows
+    result = {
+        "cursor": cursor,
+        "applied": applied,
+        "conflicts": conflicts,
+        "items": [SyncItem.model_validate(item) for item in changed_items.order_by(AuditItem.updated_at)],
+        "audits": [SyncAudit.model_validate(audit) for audit in changed_audits],
+    }
+    db.commit()
+    return result
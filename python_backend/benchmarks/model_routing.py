@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Model routing benchmark: latency and cost per AI endpoint
+
+Drives each GeminiService call behind the AI endpoints through StubProvider
+with simulated per-model latencies, under three configurations:
+
+- single: every task on --single-model, as before routing
+- routed: the default task tiers
+- degraded: routed, with the fast tier's primary failing --degraded-error-rate
+  of its calls, to show fallback and demotion
+
+Latencies are simulated at --time-scale (0.05 runs a 2s call in 100ms) and
+reported unscaled. Cost is estimated from token counts and MODEL_PRICES.
+
+Usage:
+    python -m benchmarks.model_routing --requests 200 --concurrency 8
+    python -m benchmarks.model_routing --model-latency '{"gemini-1.5-pro": 3.5}'
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+from typing import Callable, Dict, List
+from app.services.gemini_service import GeminiService
+from app.services.llm_providers import StubProvider
+from app.services.model_router import (
+    DEFAULT_LATENCY_TARGETS, DEFAULT_MODEL_TIERS, DEFAULT_TASK_TIERS, ModelRouter, estimate_cost
+)
+
+# Rough mean latency in seconds for a short structured answer
+MODEL_LATENCY = {"gemini-1.5-flash-8b": 0.4, "gemini-1.5-flash": 0.7, "gemini-1.5-pro": 2.4}
+
+AUDIT = {
+    "property_name": "Bench Hotel",
+    "status": "submitted",
+    "overall_score": 72,
+    "audit_items": [
+        {"category": category, "item": f"{category} check {i}", "score": i % 5 + 1, "max_score": 5,
+         "comments": "Minor wear noted on inspection" if i % 3 else "Meets brand standard"}
+        for category in ("Lobby", "Guest Room", "Bathroom", "Restaurant", "Fitness")
+        for i in range(8)
+    ],
+}
+FINDINGS = [{"item": item["item"], "score": item["score"], "comments": item["comments"]}
+            for item in AUDIT["audit_items"] if item["score"] <= 2]
+PHOTO = base64.b64encode(b"bench photo").decode()
+
+ENDPOINTS: Dict[str, Callable] = {
+    "suggest-score": lambda service: service.suggest_audit_score("Lobby floor", None, "Scuffs near the entrance"),
+    "analyze-photo": lambda service: service.analyze_audit_photo(PHOTO, "Lobby: floor condition"),
+    "action-plan": lambda service: service.generate_action_plan(FINDINGS, "luxury hotel"),
+    "insights": lambda service: service.generate_compliance_insights(AUDIT),
+    "generate-report": lambda service: service.generate_audit_report(AUDIT),
+}
+
+class MeteredStub(StubProvider):
+    """StubProvider that tallies the cost of every answered call"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.cost = 0.0
+
+    async def generate(self, task, prompt, images=None, json_output=False, schema=None, model=None):
+        response = await super().generate(task, prompt, images, json_output, schema, model)
+        self.cost += estimate_cost(response.model, response.prompt_tokens, response.completion_tokens) or 0.0
+        return response
+
+def build_router(name: str, single_model: str, time_scale: float) -> ModelRouter:
+    targets = {tier: target * time_scale for tier, target in DEFAULT_LATENCY_TARGETS.items()}
+    if name == "single":
+        tiers = {tier: [single_model] for tier in DEFAULT_MODEL_TIERS}
+    else:
+        tiers = DEFAULT_MODEL_TIERS
+    return ModelRouter(tiers, DEFAULT_TASK_TIERS, targets, cooldown=30 * time_scale)
+
+async def run_endpoint(service: GeminiService, provider: MeteredStub, endpoint: str,
+                       total: int, concurrency: int, time_scale: float) -> Dict:
+    func = ENDPOINTS[endpoint]
+    latencies: List[float] = []
+    remaining = [total]
+    provider.cost = 0.0
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            await func(service)
+            latencies.append((time.perf_counter() - start) / time_scale)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    latencies.sort()
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+        "cost_per_1k_usd": round(provider.cost / total * 1000, 4),
+    }
+
+async def run(args) -> Dict[str, Dict[str, Dict]]:
+    latency = {**MODEL_LATENCY, **json.loads(args.model_latency)}
+    fast_primary = DEFAULT_MODEL_TIERS["fast"][0]
+    results: Dict[str, Dict[str, Dict]] = {}
+    for config in ("single", "routed", "degraded"):
+        provider = MeteredStub(
+            jitter=args.jitter * args.time_scale,
+            response_size=args.response_size,
+            model_latency={model: seconds * args.time_scale for model, seconds in latency.items()},
+            model_error_rate={fast_primary: args.degraded_error_rate} if config == "degraded" else None,
+        )
+        service = GeminiService(provider, build_router(config, args.single_model, args.time_scale))
+        results[config] = {}
+        for endpoint in ENDPOINTS:
+            results[config][endpoint] = await run_endpoint(service, provider, endpoint, args.requests,
+                                                           args.concurrency, args.time_scale)
+        results[config]["_models"] = service.router.snapshot()
+    return results
+
+def print_results(results: Dict[str, Dict[str, Dict]]):
+    print(f"{'endpoint':<16} {'config':<9} {'p50 ms':>9} {'p95 ms':>9} {'$ / 1k calls':>13}")
+    for endpoint in ENDPOINTS:
+        baseline = results["single"][endpoint]
+        for config in ("single", "routed", "degraded"):
+            result = results[config][endpoint]
+            change = ""
+            if config != "single" and baseline["p50_ms"]:
+                change = (f"  p50 {(result['p50_ms'] - baseline['p50_ms']) / baseline['p50_ms']:+.0%}, "
+                          f"cost {(result['cost_per_1k_usd'] - baseline['cost_per_1k_usd']) / baseline['cost_per_1k_usd']:+.0%}"
+                          if baseline["cost_per_1k_usd"] else "")
+            print(f"{endpoint:<16} {config:<9} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+                  f"{result['cost_per_1k_usd']:>13}{change}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-model and routed LLM latency and cost per endpoint")
+    parser.add_argument("--requests", type=int, default=100, help="Calls per endpoint and configuration")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--single-model", default="gemini-1.5-pro")
+    parser.add_argument("--model-latency", default="{}", help="JSON object overriding simulated model latencies")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency jitter in seconds")
+    parser.add_argument("--degraded-error-rate", type=float, default=0.3)
+    parser.add_argument("--response-size", type=int, default=5)
+    parser.add_argument("--time-scale", type=float, default=0.05)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Scripted load scenarios against the FastAPI app
+
+Runs in-process through httpx's ASGI transport by default, with the LLM
+provider replaced by StubProvider (simulated latency, errors and response
+size), or against a running server with --base-url (start it with
+LLM_PROVIDER=stub or replay to keep it offline). Each run reports throughput and p50/p95/p99 latency per scenario
+and is saved as JSON under --output-dir so runs can be compared.
+
+Usage:
+    python -m benchmarks.seed --audits 100000
+    python -m benchmarks.run --concurrency 32 --requests 2000
+    python -m benchmarks.run --compare benchmarks/results/<previous>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+import httpx
+from benchmarks.seed import BENCH_PASSWORD
+
+SCENARIOS: Dict[str, Callable] = {}
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+class BenchContext:
+    def __init__(self, client: httpx.AsyncClient, token: str, max_audit_id: int, max_item_id: int,
+                 auditors: int, seed: int):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.max_audit_id = max_audit_id
+        self.max_item_id = max_item_id
+        self.auditors = auditors
+        self.random = random.Random(seed)
+
+@scenario("login_storm")
+async def login_storm(ctx: BenchContext):
+    username = f"bench.auditor{ctx.random.randrange(ctx.auditors)}"
+    return await ctx.client.post("/api/auth/login", json={"username": username, "password": BENCH_PASSWORD})
+
+@scenario("dashboard_lists")
+async def dashboard_lists(ctx: BenchContext):
+    choice = ctx.random.random()
+    if choice < 0.4:
+        return await ctx.client.get("/api/audits/", headers=ctx.headers,
+                                    params={"auditor_id": ctx.random.randint(2, ctx.auditors + 1)})
+    if choice < 0.7:
+        return await ctx.client.get(f"/api/audits/{ctx.random.randint(1, ctx.max_audit_id)}/items",
+                                    headers=ctx.headers)
+    return await ctx.client.get("/api/properties/", headers=ctx.headers)
+
+@scenario("item_patch_burst")
+async def item_patch_burst(ctx: BenchContext):
+    return await ctx.client.patch(f"/api/audits/items/{ctx.random.randint(1, ctx.max_item_id)}",
+                                  headers=ctx.headers, json={"score": ctx.random.randint(1, 5)})
+
+@scenario("report_generation")
+async def report_generation(ctx: BenchContext):
+    return await ctx.client.post(f"/api/ai/generate-report/{ctx.random.randint(1, ctx.max_audit_id)}",
+                                 headers=ctx.headers)
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+async def run_scenario(name: str, ctx: BenchContext, total: int, concurrency: int) -> Dict:
+    func = SCENARIOS[name]
+    latencies = []
+    statuses: Dict[str, int] = {}
+    remaining = [total]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                response = await func(ctx)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "duration": round(elapsed, 3),
+        "throughput": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "error_rate": round(1 - ok / total, 4) if total else 0.0,
+        "statuses": statuses,
+    }
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+def _dataset_bounds():
+    from sqlalchemy import func, select
+    from app.core.database import get_engine
+    from app.models.models import Audit, AuditItem, User
+
+    with get_engine().connect() as conn:
+        max_audit_id = conn.execute(select(func.max(Audit.id))).scalar() or 1
+        max_item_id = conn.execute(select(func.max(AuditItem.id))).scalar() or 1
+        auditors = conn.execute(select(func.count()).where(User.role == "auditor")).scalar() or 1
+    return max_audit_id, max_item_id, auditors
+
+def _build_client(args) -> httpx.AsyncClient:
+    if args.base_url:
+        return httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+
+    from app.services.gemini_service import gemini_service
+    from app.services.llm_providers import StubProvider
+    from main import app
+
+    gemini_service.provider = StubProvider(
+        latency=args.gemini_latency,
+        jitter=args.gemini_jitter,
+        error_rate=args.gemini_error_rate,
+        response_size=args.gemini_response_size,
+        seed=args.seed,
+    )
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout)
+
+async def run(args) -> Dict:
+    max_audit_id, max_item_id, auditors = _dataset_bounds()
+    async with _build_client(args) as client:
+        response = await client.post("/api/auth/login",
+                                     json={"username": "bench.admin", "password": BENCH_PASSWORD})
+        response.raise_for_status()
+        ctx = BenchContext(client, response.json()["access_token"], max_audit_id, max_item_id,
+                           auditors, args.seed)
+
+        results = {}
+        for name in args.scenarios:
+            print(f"Running {name} ({args.requests} requests, concurrency {args.concurrency})...")
+            results[name] = await run_scenario(name, ctx, args.requests, args.concurrency)
+            print_result(name, results[name])
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "target": args.base_url or "in-process",
+        "gemini": None if args.base_url else {
+            "latency": args.gemini_latency,
+            "jitter": args.gemini_jitter,
+            "error_rate": args.gemini_error_rate,
+            "response_size": args.gemini_response_size,
+        },
+        "dataset": {"max_audit_id": max_audit_id, "max_item_id": max_item_id, "auditors": auditors},
+        "scenarios": results,
+    }
+
+def print_result(name: str, result: Dict):
+    print(f"  {name}: {result['throughput']} req/s, p50 {result['p50_ms']} ms, "
+          f"p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, errors {result['error_rate']:.2%}")
+
+def compare(current: Dict, previous: Dict):
+    print(f"\nComparison with run {previous.get('git_revision')} at {previous.get('timestamp')}:")
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        deltas = []
+        for key in ("throughput", "p50_ms", "p95_ms", "p99_ms"):
+            if before[key]:
+                deltas.append(f"{key} {(result[key] - before[key]) / before[key]:+.1%}")
+        print(f"  {name}: " + ", ".join(deltas))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run load-test scenarios against the API")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="Mean stand-in latency in seconds")
+    parser.add_argument("--gemini-jitter", type=float, default=0.2)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-response-size", type=int, default=5, help="Entries per list in responses")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output-dir", default=os.path.join(os.path.dirname(__file__), "results"))
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"{datetime.utcnow():%Y%m%d-%H%M%S}-{results['git_revision']}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
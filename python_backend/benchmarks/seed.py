@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Synthetic benchmark dataset
+
+Seeds properties, users, audits and audit items in bulk: COPY on PostgreSQL,
+SQLAlchemy Core executemany inserts elsewhere, generated and written one chunk
+at a time so memory stays flat at any volume. All benchmark users share the
+password "bench123", hashed once.
+
+Audit items follow the checklist in shared/auditChecklist.ts. Each property
+has a latent quality level and each auditor a small bias; an item's score is
+drawn around the property's quality on the item's maxScore scale, with less
+spread on items the checklist weights more heavily. Overall and sub-scores are
+the checklist-weighted averages of the item scores, so zones, scores and item
+findings stay consistent with each other.
+
+Usage:
+    python -m benchmarks.seed --properties 2000 --audits 100000 --items-per-audit 20
+    python -m benchmarks.seed --properties 20000 --audits 1000000 --chunk-size 50000
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import func, select
+from app.core.database import get_engine, create_tables
+from app.core.security import get_password_hash
+from app.models.models import Audit, AuditItem, Property, User
+
+BENCH_PASSWORD = "bench123"
+CHECKLIST_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "shared", "auditChecklist.ts")
+REGIONS = ["North India", "South India", "East India", "West India", "Middle East", "Europe"]
+STATUSES = ["scheduled", "in_progress", "submitted", "reviewed", "completed"]
+STATUS_WEIGHTS = [1, 1, 2, 2, 8]
+# Checklist categories feeding each audit sub-score
+SUB_SCORES = {
+    "cleanliness_score": ["room-experience"],
+    "branding_score": ["arrival-checkin", "staff-interaction"],
+    "operational_score": ["dining-experience", "checkout-experience"],
+}
+COMMENTS = {
+    "low": ["Mould in bathroom grout", "Signage faded near entrance", "Long wait at check-in",
+            "Room not ready at arrival", "Order delivered cold"],
+    "mid": ["Minor delay observed at valet", "Acceptable, some inconsistency", "Greeting was hurried"],
+    "high": ["Meets brand standard", "Staff greeting warm and prompt", "", ""],
+}
+
+# Fallback when the shared checklist is not available next to the backend
+DEFAULT_CHECKLIST = [
+    {"id": "arrival-checkin", "name": "Arrival & Check-In Experience", "weight": 0.25, "items": [
+        {"item": "Valet Greeting", "max_score": 10, "weight": 0.8},
+        {"item": "Check-in Time", "max_score": 15, "weight": 0.9}]},
+    {"id": "room-experience", "name": "Room Experience & Amenities", "weight": 0.3, "items": [
+        {"item": "Cleanliness", "max_score": 20, "weight": 1.0},
+        {"item": "Amenities", "max_score": 15, "weight": 0.8}]},
+    {"id": "dining-experience", "name": "Dining Experience", "weight": 0.25, "items": [
+        {"item": "Breakfast Quality", "max_score": 20, "weight": 1.0}]},
+    {"id": "staff-interaction", "name": "Staff Interaction & Service", "weight": 0.2, "items": [
+        {"item": "Personalised Service", "max_score": 20, "weight": 1.0}]},
+    {"id": "checkout-experience", "name": "Check-Out Experience", "weight": 0.1, "items": [
+        {"item": "Check-out Speed", "max_score": 15, "weight": 0.9}]},
+]
+
+_CHECKLIST_FIELD = re.compile(r"^\s*(id|name|item|maxScore|weight):\s*(?:'((?:[^'\\]|\\.)*)'|([\d.]+))", re.M)
+
+def load_checklist(path: str = CHECKLIST_PATH) -> List[Dict[str, Any]]:
+    """Categories and items with their weights, read from the web client's checklist definition"""
+    if not os.path.exists(path):
+        return DEFAULT_CHECKLIST
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+
+    categories: List[Dict[str, Any]] = []
+    last_id = None
+    current: Optional[Dict[str, Any]] = None
+    for key, text, number in _CHECKLIST_FIELD.findall(source):
+        value = text.replace("\\'", "'") if text else number
+        if key == "id":
+            last_id = value
+        elif key == "name":
+            categories.append({"id": last_id, "name": value, "weight": 1.0, "items": []})
+            current = categories[-1]
+        elif key == "item" and categories:
+            current = {"item": value, "max_score": 10, "weight": 1.0}
+            categories[-1]["items"].append(current)
+        elif current is not None and key == "maxScore":
+            current["max_score"] = int(float(value))
+        elif current is not None and key == "weight":
+            current["weight"] = float(value)
+    return [category for category in categories if category["items"]] or DEFAULT_CHECKLIST
+
+def _clamp(value: float, low: float = 0.0, high: float = 1.0) -> float:
+    return min(high, max(low, value))
+
+def _zone(score):
+    return "green" if score >= 80 else "amber" if score >= 60 else "red"
+
+def _copy(conn, table, rows: List[Dict[str, Any]]):
+    """Stream rows into PostgreSQL with COPY ... FROM STDIN (psycopg2)"""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["\\N" if row[column] is None else row[column] for column in columns])
+    buffer.seek(0)
+    cursor = conn.connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    finally:
+        cursor.close()
+
+def _insert(conn, table, rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        _copy(conn, table, rows)
+    else:
+        conn.execute(table.insert(), rows)
+
+class Generator:
+    """Deterministic row generator for a given seed"""
+
+    def __init__(self, checklist: List[Dict[str, Any]], properties: int, auditor_ids: List[int],
+                 reviewer_ids: List[int], items_per_audit: int, seed_value: int):
+        self.rng = random.Random(seed_value)
+        self.now = datetime.utcnow()
+        self.properties = properties
+        self.auditor_ids = auditor_ids
+        self.reviewer_ids = reviewer_ids
+        self.items_per_audit = items_per_audit
+        self.checklist = [
+            (category, item, category["weight"] * item["weight"])
+            for category in checklist for item in category["items"]
+        ]
+        self.quality = [self.rng.betavariate(8, 2.2) for _ in range(properties)]
+        self.auditor_bias = {auditor_id: self.rng.gauss(0, 0.03) for auditor_id in auditor_ids}
+
+    def property_rows(self) -> Iterable[Dict[str, Any]]:
+        for i, quality in enumerate(self.quality):
+            score = round(quality * 100)
+            yield {
+                "name": f"Bench Hotel {i}", "location": f"City {i % 200}", "region": self.rng.choice(REGIONS),
+                "last_audit_score": score,
+                "next_audit_date": self.now + timedelta(days=self.rng.randint(1, 180)),
+                "status": _zone(score), "created_at": self.now,
+            }
+
+    def _checklist_sample(self):
+        checklist = self.checklist
+        if self.items_per_audit <= len(checklist):
+            return self.rng.sample(checklist, self.items_per_audit)
+        # Checklists longer than the source pad with repeated items
+        extra = [checklist[n % len(checklist)] for n in range(self.items_per_audit - len(checklist))]
+        return checklist + extra
+
+    def audit(self, audit_id: int):
+        """One audit row and its item rows"""
+        rng = self.rng
+        property_index = rng.randrange(self.properties)
+        auditor_id = rng.choice(self.auditor_ids)
+        level = self.quality[property_index] + self.auditor_bias[auditor_id] + rng.gauss(0, 0.04)
+        status = rng.choices(STATUSES, weights=STATUS_WEIGHTS)[0]
+        created_at = self.now - timedelta(days=rng.randint(0, 730), minutes=rng.randint(0, 1439))
+
+        items, seen = [], {}
+        totals: Dict[str, List[float]] = {}
+        for category, item, weight in self._checklist_sample():
+            # Heavily weighted items are delivered more consistently
+            ratio = _clamp(rng.gauss(level, 0.12 * (1.3 - item["weight"])))
+            score = round(ratio * item["max_score"])
+            repeat = seen[item["item"]] = seen.get(item["item"], 0) + 1
+            band = "low" if ratio < 0.6 else "mid" if ratio < 0.8 else "high"
+            items.append({
+                "audit_id": audit_id, "category": category["name"],
+                "item": item["item"] if repeat == 1 else f"{item['item']} #{repeat}",
+                "score": score, "comments": rng.choice(COMMENTS[band]),
+                "status": "completed" if status != "scheduled" else "pending", "created_at": created_at,
+            })
+            for key in ("overall_score", *(name for name, ids in SUB_SCORES.items() if category["id"] in ids)):
+                total = totals.setdefault(key, [0.0, 0.0])
+                total[0] += weight * score / item["max_score"]
+                total[1] += weight
+
+        scores = {key: round(100 * value / weight) for key, (value, weight) in totals.items() if weight}
+        overall = scores.get("overall_score", round(100 * _clamp(level)))
+        audit = {
+            "property_id": property_index + 1,
+            "auditor_id": auditor_id,
+            "reviewer_id": rng.choice(self.reviewer_ids) if self.reviewer_ids else None,
+            "status": status,
+            "overall_score": overall,
+            "cleanliness_score": scores.get("cleanliness_score", overall),
+            "branding_score": scores.get("branding_score", overall),
+            "operational_score": scores.get("operational_score", overall),
+            "compliance_zone": _zone(overall),
+            "created_at": created_at,
+            "submitted_at": created_at + timedelta(hours=rng.randint(2, 72))
+            if status in ("submitted", "reviewed", "completed") else None,
+        }
+        return audit, items
+
+def seed(properties: int, auditors: int, reviewers: int, audits: int, items_per_audit: int,
+         chunk_size: int = 10000, seed_value: int = 42, checklist_path: str = CHECKLIST_PATH):
+    now = datetime.utcnow()
+    password = get_password_hash(BENCH_PASSWORD)
+    checklist = load_checklist(checklist_path)
+
+    create_tables()
+    with get_engine().begin() as conn:
+        if conn.execute(select(func.count()).select_from(User.__table__)).scalar():
+            print("Database already contains data, refusing to seed on top of it")
+            return
+
+        start = time.perf_counter()
+        users = [{"username": "bench.admin", "password": password, "role": "admin",
+                  "name": "Bench Admin", "email": "bench.admin@example.com", "created_at": now}]
+        for role, count in (("auditor", auditors), ("reviewer", reviewers)):
+            users += [
+                {"username": f"bench.{role}{i}", "password": password, "role": role,
+                 "name": f"Bench {role.title()} {i}", "email": f"bench.{role}{i}@example.com",
+                 "created_at": now}
+                for i in range(count)
+            ]
+        _insert(conn, User.__table__, users)
+        auditor_ids = list(range(2, 2 + auditors))
+        reviewer_ids = list(range(2 + auditors, 2 + auditors + reviewers))
+
+        generator = Generator(checklist, properties, auditor_ids, reviewer_ids, items_per_audit, seed_value)
+        rows = []
+        for row in generator.property_rows():
+            rows.append(row)
+            if len(rows) == chunk_size:
+                _insert(conn, Property.__table__, rows)
+                rows = []
+        _insert(conn, Property.__table__, rows)
+        print(f"Seeded {len(users)} users and {properties} properties "
+              f"({sum(len(category['items']) for category in checklist)} checklist items)")
+
+        item_count = 0
+        for batch_start in range(0, audits, chunk_size):
+            batch = min(chunk_size, audits - batch_start)
+            audit_rows, item_rows = [], []
+            for audit_id in range(batch_start + 1, batch_start + batch + 1):
+                audit, items = generator.audit(audit_id)
+                audit_rows.append(audit)
+                item_rows.extend(items)
+            _insert(conn, Audit.__table__, audit_rows)
+            _insert(conn, AuditItem.__table__, item_rows)
+            item_count += len(item_rows)
+            elapsed = time.perf_counter() - start
+            print(f"Seeded {batch_start + batch}/{audits} audits, {item_count} items "
+                  f"({(batch_start + batch + item_count) / elapsed:,.0f} rows/s)")
+
+        print(f"Seeding finished in {time.perf_counter() - start:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a synthetic benchmark dataset")
+    parser.add_argument("--properties", type=int, default=2000)
+    parser.add_argument("--auditors", type=int, default=200)
+    parser.add_argument("--reviewers", type=int, default=50)
+    parser.add_argument("--audits", type=int, default=100000)
+    parser.add_argument("--items-per-audit", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--checklist", default=CHECKLIST_PATH,
+                        help="Checklist definition to take categories, items and weights from")
+    args = parser.parse_args()
+
+    try:
+        seed(args.properties, args.auditors, args.reviewers, args.audits,
+             args.items_per_audit, args.chunk_size, args.seed, args.checklist)
+    except Exception as e:
+        print(f"Seeding failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Similar-findings query latency benchmark
+
+Fills a VectorIndex with random unit vectors and reports query percentiles.
+Exits non-zero when p95 exceeds --threshold milliseconds. The ANN path is
+used when --size reaches --ann-threshold and faiss is installed.
+
+Usage:
+    python -m benchmarks.similarity --size 1000000 --dim 768 --threshold 50
+"""
+
+import argparse
+import sys
+import time
+import numpy as np
+from app.services.similarity import VectorIndex
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark similar-findings nearest-neighbour queries")
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=21)
+    parser.add_argument("--ann-threshold", type=int, default=150_000)
+    parser.add_argument("--threshold", type=float, default=50.0, help="p95 budget in milliseconds")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    index = VectorIndex(args.ann_threshold)
+    start = time.perf_counter()
+    for offset in range(0, args.size, 100_000):
+        count = min(100_000, args.size - offset)
+        index.add(list(range(offset, offset + count)),
+                  rng.standard_normal((count, args.dim), dtype=np.float32))
+    print(f"Built {'ANN' if index._ann is not None else 'exact'} index of {args.size} x {args.dim} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, args.k)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    print(f"Query latency p50={p50:.1f}ms p95={p95:.1f}ms p99={p99:.1f}ms")
+    if p95 > args.threshold:
+        print(f"❌ p95 exceeds {args.threshold:.0f}ms")
+        sys.exit(1)
+    print("✅ Within budget")
+
+if __name__ == "__main__":
+    main()
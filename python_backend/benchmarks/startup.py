@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Application startup-time benchmark
+
+Imports main:app in fresh interpreters and reports the median import time
+(interpreter startup excluded), plus the slowest imports from -X importtime.
+Exits non-zero when the median exceeds --threshold seconds, so it can gate CI.
+
+Usage:
+    python -m benchmarks.startup --runs 5 --threshold 1.0
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_APP = "from main import app"
+TIMED_IMPORT = f"import time; start = time.perf_counter(); {IMPORT_APP}; print(time.perf_counter() - start)"
+
+def time_import(env) -> float:
+    result = subprocess.run([sys.executable, "-c", TIMED_IMPORT], cwd=BACKEND_DIR, env=env,
+                            check=True, capture_output=True, text=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(env, top: int):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_APP],
+        cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return sorted(entries, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the time to import main:app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=1.0, help="Maximum median import time in seconds")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    time_import(env)  # warm the bytecode cache
+    timings = [time_import(env) for _ in range(args.runs)]
+    median = statistics.median(timings)
+
+    print(f"import main:app: median {median * 1000:.0f} ms over {args.runs} runs "
+          f"(min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms)")
+    print("\nSlowest imports (cumulative ms / self ms):")
+    for cumulative, self_time, name in slowest_imports(env, args.top):
+        print(f"  {cumulative / 1000:8.1f} {self_time / 1000:8.1f}  {name}")
+
+    if median > args.threshold:
+        print(f"\nStartup exceeds threshold of {args.threshold:.2f}s")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
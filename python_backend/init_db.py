@@ -6,7 +6,7 @@ Creates tables and seeds initial data
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.models.models import Base, User, Property, Audit
+from app.models.models import Base, User, Property, PropertyManager, Audit
 from app.core.security import get_password_hash
 from app.core.config import settings
 from datetime import datetime, timedelta
@@ -131,6 +131,10 @@ def seed_initial_data(engine):
         db.commit()
         print("✅ Sample properties created")
         
+        # The hotel GM manages Taj Palace
+        db.add(PropertyManager(user_id=6, property_id=1))
+        db.commit()
+        
         # Create a sample audit
         audit = Audit(
             property_id=1,  # Taj Palace
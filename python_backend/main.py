@@ -1,12 +1,36 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.main import api_router
+from app.api.endpoints import health
 from app.core.config import settings
+from app.core.database import ReadYourWritesMiddleware
+from app.core.health import readiness, start_warmup
+from app.core.inflight import InFlightMiddleware, ai_requests
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.profiling import ProfilingMiddleware
+from app.core.query_budget import QueryBudgetMiddleware, budget_mode
+from app.core.workers import shutdown_process_pool
+from app.services.ai_writeback import ai_results
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ai_results.start()
+    warmup = await start_warmup(app)
+    yield
+    # Fail readiness first so load balancers stop routing here while requests drain
+    readiness.draining = True
+    if warmup is not None:
+        warmup.cancel()
+    await ai_requests.drain(settings.GRACEFUL_TIMEOUT)
+    await ai_results.stop()
+    shutdown_process_pool()
 
 app = FastAPI(
     title="Hotel Audit Management API",
     description="AI-powered hotel audit management system with Gemini integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -17,13 +41,26 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(InFlightMiddleware, prefix="/api/ai/", tracker=ai_requests)
+if budget_mode() != "off":
+    app.add_middleware(QueryBudgetMiddleware)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
 
 app.include_router(api_router, prefix="/api")
+app.include_router(health.router, prefix="/health", tags=["health"])
 
 @app.get("/")
 async def root():
     return {"message": "Hotel Audit Management API with Gemini AI"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
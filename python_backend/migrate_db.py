@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Database migration script
+Brings a database created by an earlier release up to the current models
+
+create_all() only creates missing tables, so columns added to existing tables
+are added here with ALTER TABLE and backfilled:
+- audits.updated_at and audit_items.updated_at, set from created_at
+- audit_items.version, starting at 1
+- ai_result_jobs.attempts, starting at 0
+- audit_items.photo_digests, hashed from the stored photos
+
+New tables (search_documents, finding_embeddings, ai_result_jobs,
+idempotency_results, property_managers) are created by create_all(). Safe to
+run repeatedly. Hotel GMs see only properties listed for them in
+property_managers, so add a row per GM and property.
+Afterwards, fill the search and similarity indexes for existing rows:
+
+    python -m app.services.search --reindex
+    python -m app.services.similarity --backfill
+"""
+
+import sys
+from sqlalchemy import JSON, DateTime, bindparam, create_engine, inspect, text
+from app.core.config import settings
+from app.models.models import AuditItem, Base
+from app.services.photo_derivatives import photo_index
+
+def _add_updated_at(connection, table: str, datetime_type: str, index: bool = False):
+    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN updated_at {datetime_type}"))
+    connection.execute(text(
+        f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL"
+    ))
+    if index:
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_updated_at ON {table} (updated_at)"))
+
+def migrate(engine) -> list:
+    """Apply missing schema changes; returns a description of each one applied"""
+    Base.metadata.create_all(bind=engine)
+    datetime_type = DateTime().compile(dialect=engine.dialect)
+    json_type = JSON().compile(dialect=engine.dialect)
+    columns = {table: {column["name"] for column in inspect(engine).get_columns(table)}
+               for table in ("audits", "audit_items", "ai_result_jobs")}
+
+    applied = []
+    with engine.begin() as connection:
+        if "updated_at" not in columns["audits"]:
+            _add_updated_at(connection, "audits", datetime_type)
+            applied.append("audits.updated_at")
+        if "updated_at" not in columns["audit_items"]:
+            _add_updated_at(connection, "audit_items", datetime_type, index=True)
+            applied.append("audit_items.updated_at")
+        if "version" not in columns["audit_items"]:
+            # The default fills existing rows on both PostgreSQL and SQLite
+            connection.execute(text("ALTER TABLE audit_items ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+            applied.append("audit_items.version")
+        if "attempts" not in columns["ai_result_jobs"]:
+            connection.execute(text("ALTER TABLE ai_result_jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0"))
+            applied.append("ai_result_jobs.attempts")
+        if "photo_digests" not in columns["audit_items"]:
+            _add_photo_digests(connection, json_type)
+            applied.append("audit_items.photo_digests")
+    return applied
+
+def _add_photo_digests(connection, json_type: str):
+    connection.execute(text(f"ALTER TABLE audit_items ADD COLUMN photo_digests {json_type}"))
+    rows = connection.execute(
+        AuditItem.__table__.select().with_only_columns(AuditItem.id, AuditItem.photos)
+        .where(AuditItem.photos.isnot(None))
+    ).all()
+    digests = [{"item_id": row.id, "digests": photo_index(row.photos)} for row in rows]
+    if digests:
+        connection.execute(
+            AuditItem.__table__.update()
+            .where(AuditItem.id == bindparam("item_id"))
+            .values(photo_digests=bindparam("digests")),
+            digests,
+        )
+
+def main():
+    try:
+        engine = create_engine(settings.DATABASE_URL)
+        applied = migrate(engine)
+        if applied:
+            print(f"✅ Added {', '.join(applied)}")
+        else:
+            print("ℹ️ Database schema is already up to date")
+    except Exception as e:
+        print(f"❌ Error migrating database: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
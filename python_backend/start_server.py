@@ -1,50 +1,126 @@
 #!/usr/bin/env python3
 """
 Server startup script
-Handles database initialization and server startup
+
+Development (default): single uvicorn process with auto-reload.
+Production (--prod): gunicorn master with WEB_CONCURRENCY uvicorn workers
+(sized to CPU cores when 0), the app preloaded in the master, uvloop/httptools
+when installed and graceful shutdown that drains in-flight AI requests.
+
+Schema setup is not part of startup; run `python init_db.py` once instead.
 """
 
-import uvicorn
-import asyncio
-import sys
+import argparse
+import importlib.util
+import multiprocessing
 import os
+import sys
+import tempfile
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.core.database import create_tables
-from init_db import main as init_db
+from app.core.config import settings
+
+def _select_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+def _select_http() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+def worker_count() -> int:
+    return settings.WEB_CONCURRENCY or multiprocessing.cpu_count()
+
+def start_dev_server():
+    """Start a single reloading server for local development"""
+    import uvicorn
+
+    print("🚀 Starting Hotel Audit Management API Server (development)...")
+    print(f"🌐 Starting FastAPI server on http://localhost:{settings.PORT}")
+    print(f"📖 API documentation available at http://localhost:{settings.PORT}/docs")
 
-def start_server():
-    """Start the FastAPI server"""
-    print("🚀 Starting Hotel Audit Management API Server...")
-    
-    # Initialize database
-    try:
-        print("📊 Setting up database...")
-        create_tables()
-        print("✅ Database setup completed")
-    except Exception as e:
-        print(f"❌ Database setup failed: {e}")
-        print("🔧 Attempting to initialize database...")
-        try:
-            init_db()
-        except Exception as init_error:
-            print(f"❌ Database initialization failed: {init_error}")
-            print("💡 Please ensure PostgreSQL is running and accessible")
-            sys.exit(1)
-    
-    # Start the server
-    print("🌐 Starting FastAPI server on http://localhost:8000")
-    print("📖 API documentation available at http://localhost:8000/docs")
-    
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=settings.HOST,
+        port=settings.PORT,
         reload=True,
         log_level="info"
     )
 
+def _prepare_multiprocess_metrics():
+    """Point prometheus_client at a shared directory before any worker imports it"""
+    metrics_dir = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "hotel-audit-metrics")
+    )
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        os.remove(os.path.join(metrics_dir, name))
+
+def start_prod_server():
+    """Start a preforking gunicorn server with uvicorn workers"""
+    _prepare_multiprocess_metrics()
+    workers = worker_count()
+    print(f"🚀 Starting Hotel Audit Management API Server (production, {workers} workers, "
+          f"{_select_loop()}/{_select_http()})...")
+
+    try:
+        from gunicorn.app.base import BaseApplication
+        from uvicorn.workers import UvicornWorker
+    except ImportError:
+        # gunicorn is unavailable on Windows; fall back to uvicorn's own process manager
+        import uvicorn
+
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=workers,
+            loop=_select_loop(),
+            http=_select_http(),
+            timeout_keep_alive=settings.KEEP_ALIVE,
+            timeout_graceful_shutdown=settings.GRACEFUL_TIMEOUT,
+            log_level="info"
+        )
+        return
+
+    class ProductionUvicornWorker(UvicornWorker):
+        CONFIG_KWARGS = {
+            "loop": _select_loop(),
+            "http": _select_http(),
+            "timeout_graceful_shutdown": settings.GRACEFUL_TIMEOUT,
+        }
+
+    class ProductionApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{settings.HOST}:{settings.PORT}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", ProductionUvicornWorker)
+            self.cfg.set("preload_app", True)
+            self.cfg.set("keepalive", settings.KEEP_ALIVE)
+            self.cfg.set("graceful_timeout", settings.GRACEFUL_TIMEOUT)
+            self.cfg.set("timeout", settings.GRACEFUL_TIMEOUT * 2)
+            self.cfg.set("child_exit", _child_exit)
+            self.cfg.set("accesslog", "-")
+
+        def load(self):
+            from main import app
+            return app
+
+    ProductionApplication().run()
+
+def _child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+def main():
+    parser = argparse.ArgumentParser(description="Start the Hotel Audit Management API server")
+    parser.add_argument("--prod", action="store_true", help="Run the multi-worker production server")
+    args = parser.parse_args()
+
+    if args.prod:
+        start_prod_server()
+    else:
+        start_dev_server()
+
 if __name__ == "__main__":
-    start_server()
+    main()
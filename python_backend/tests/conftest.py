@@ -0,0 +1,49 @@
+"""
+Shared test setup
+
+Settings are read from the environment at import time, so every directory the
+app writes to is pointed at a temporary directory before anything under app/
+is imported. Tests never touch the working tree or a real database.
+"""
+
+import os
+import tempfile
+
+_root = tempfile.mkdtemp(prefix="hotel-audit-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_root}/default.db",
+    "DATABASE_REPLICA_URLS": "[]",
+    "ENVIRONMENT": "test",
+    "QUERY_BUDGET_MODE": "off",  # test_query_budget enforces budgets on real routes itself
+    "LLM_PROVIDER": "stub",
+    "WARMUP_ENABLED": "false",
+    "LLM_RECORDINGS_DIR": os.path.join(_root, "llm_recordings"),
+    "REPORT_CACHE_DIR": os.path.join(_root, "report_cache"),
+    "PHOTO_CACHE_DIR": os.path.join(_root, "photo_cache"),
+    "PROFILE_DIR": os.path.join(_root, "profiles"),
+})
+
+import pytest
+from sqlalchemy import create_engine
+from app.core import database
+from app.models.models import Base
+
+def sqlite_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """A fresh SQLite database used as the application's primary"""
+    engine = sqlite_engine(tmp_path / "primary.db")
+    monkeypatch.setattr(database, "_engine", engine)
+    monkeypatch.setattr(database, "_replica_engines", [])
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    session = database.SessionLocal()
+    yield session
+    session.close()
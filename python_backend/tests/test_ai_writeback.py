@@ -0,0 +1,157 @@
+from sqlalchemy import event, text
+from sqlalchemy.orm.exc import StaleDataError
+from app.core import events
+from app.core.events import InProcessEventBus
+from app.models.models import AIResultJob, Audit, AuditItem, Property
+from app.services.search import search_documents
+from app.services import ai_writeback
+from app.services.ai_writeback import AIResultWriter, item_result_values
+
+def _items(db, count: int):
+    prop = Property(name="P", location="L", region="North")
+    db.add(prop)
+    db.flush()
+    audit = Audit(property_id=prop.id, status="submitted")
+    db.add(audit)
+    db.flush()
+    items = [AuditItem(audit_id=audit.id, category="Lobby", item=f"Item {i}") for i in range(count)]
+    db.add_all(items)
+    db.commit()
+    return audit, [item.id for item in items]
+
+def _suggestion(score):
+    return {"suggested_score": score}
+
+def test_flush_applies_newest_result_per_target(db):
+    audit, (first, second) = _items(db, 2)
+    writer = AIResultWriter(batch_size=10, interval=1)
+    writer.submit_item(first, _suggestion(40), {})
+    writer.submit_item(first, _suggestion(60), {})
+    writer.submit_item(second, _suggestion(80), {})
+    writer.submit_audit(audit.id, {"summary": "ok"}, None, {"insights": []})
+
+    assert writer.flush() == 4
+    db.expire_all()
+    scores = {item.id: (item.ai_suggested_score, item.version) for item in db.query(AuditItem)}
+    assert scores == {first: (60, 1), second: (80, 1)}
+    assert db.get(Audit, audit.id).ai_report == {"summary": "ok"}
+    assert db.query(AIResultJob).count() == 0
+
+def test_applied_reports_are_searchable(db):
+    audit, _ = _items(db, 0)
+    writer = AIResultWriter(batch_size=10, interval=1)
+    writer.submit_audit(audit.id, {"summary": "Recurring mildew in guest bathrooms"}, None, {"insights": []})
+    writer.flush()
+    assert [result["source"] for result in search_documents(db, "mildew")] == ["ai_report"]
+
+class RecordingBus(InProcessEventBus):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, topics, payload):
+        self.published.append((topics, payload))
+
+def test_bulk_writes_publish_change_events(db, monkeypatch):
+    audit, (item_id,) = _items(db, 1)
+    bus = RecordingBus()
+    monkeypatch.setattr(events, "_event_bus", bus)
+    writer = AIResultWriter(batch_size=10, interval=1)
+    writer.submit_item(item_id, _suggestion(55), {})
+    writer.flush()
+
+    [(topics, payload)] = bus.published
+    assert topics == [f"audit:{audit.id}", f"property:{audit.property_id}"]
+    assert (payload["type"], payload["item_id"]) == ("item.updated", item_id)
+    assert payload["fields"] == ["ai_suggested_score", "ai_analysis"]
+    assert payload["changes"] == {"ai_suggested_score": 55}
+
+def test_batches_are_capped(db):
+    _, ids = _items(db, 3)
+    writer = AIResultWriter(batch_size=2, interval=1)
+    for item_id in ids:
+        writer.submit_item(item_id, _suggestion(50), {})
+    assert writer.flush() == 2
+    assert db.query(AIResultJob).count() == 1
+
+def _concurrent_edit(engine, conflicting_id, monkeypatch, again: bool = False):
+    """Bump an item's version from another connection after it was loaded for the batch"""
+    calls = []
+    def values(item, payload):
+        if item.id == conflicting_id:
+            calls.append(item.id)
+            # Odd calls build the batch UPDATE, even ones reload the item after it conflicted
+            if len(calls) % 2:
+                with engine.begin() as connection:
+                    connection.execute(text("UPDATE audit_items SET version = version + 1 WHERE id = :id"),
+                                       {"id": item.id})
+            elif again:
+                # SQLite blocks other writers once the batch has written, so the second edit is simulated
+                raise StaleDataError("saved again")
+        return item_result_values(item, payload)
+    monkeypatch.setitem(ai_writeback.TARGETS, "item", (AuditItem, values))
+
+def test_each_kind_is_written_with_one_update(db, engine):
+    audit, ids = _items(db, 3)
+    writer = AIResultWriter(batch_size=10, interval=1)
+    for item_id in ids:
+        writer.submit_item(item_id, _suggestion(50), {})
+    writer.submit_audit(audit.id, {"summary": "ok"}, None, {"insights": []})
+
+    updates = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE audit"):
+            updates.append((statement.split()[1], executemany))
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert writer.flush() == 4
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert updates == [("audits", False), ("audit_items", True)]
+
+def test_stale_target_is_reloaded_alone(db, engine, monkeypatch):
+    _, (stale, fresh) = _items(db, 2)
+    writer = AIResultWriter(batch_size=10, interval=1)
+    writer.submit_item(stale, _suggestion(40), {})
+    writer.submit_item(stale, _suggestion(45), {})
+    writer.submit_item(fresh, _suggestion(70), {})
+    _concurrent_edit(engine, stale, monkeypatch)
+
+    assert writer.flush() == 3
+    db.expire_all()
+    assert db.get(AuditItem, fresh).ai_suggested_score == 70
+    item = db.get(AuditItem, stale)
+    assert (item.ai_suggested_score, item.version) == (45, 2)
+
+def test_stale_target_is_retried_next_round(db, engine, monkeypatch):
+    _, (stale, fresh) = _items(db, 2)
+    writer = AIResultWriter(batch_size=10, interval=1)
+    writer.submit_item(stale, _suggestion(40), {})
+    writer.submit_item(stale, _suggestion(45), {})
+    writer.submit_item(fresh, _suggestion(70), {})
+    _concurrent_edit(engine, stale, monkeypatch, again=True)
+
+    assert writer.flush() == 2
+    db.expire_all()
+    assert db.get(AuditItem, fresh).ai_suggested_score == 70
+    assert db.get(AuditItem, stale).ai_suggested_score is None
+    [job] = db.query(AIResultJob).all()
+    assert (job.target_id, job.payload["score_suggestion"]["suggested_score"], job.attempts) == (stale, 45, 1)
+
+    monkeypatch.setitem(ai_writeback.TARGETS, "item", (AuditItem, item_result_values))
+    assert writer.flush() == 1
+    db.expire_all()
+    item = db.get(AuditItem, stale)
+    assert (item.ai_suggested_score, item.version) == (45, 2)
+
+def test_stale_target_is_dropped_after_max_attempts(db, engine, monkeypatch):
+    _, (stale,) = _items(db, 1)
+    writer = AIResultWriter(batch_size=10, interval=1, max_attempts=2)
+    writer.submit_item(stale, _suggestion(40), {})
+    _concurrent_edit(engine, stale, monkeypatch, again=True)
+
+    assert writer.flush() == 0
+    assert writer.flush() == 1
+    assert db.query(AIResultJob).count() == 0
+    db.expire_all()
+    assert db.get(AuditItem, stale).ai_suggested_score is None
@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.api.endpoints.dashboard import dashboard_summary
+from app.models.models import Audit, Property, PropertyManager, User
+from app.services.dashboard import summary_cache
+
+@pytest.fixture
+def portfolio(db):
+    summary_cache.clear()
+    gm = User(username="gm", password="x", role="hotelgm", name="GM", email="gm@example.com")
+    managed = Property(name="Managed", location="L", region="North")
+    other = Property(name="Other", location="L", region="South")
+    db.add_all([gm, managed, other])
+    db.flush()
+    db.add(PropertyManager(user_id=gm.id, property_id=managed.id))
+    db.add_all([Audit(property_id=managed.id, status="submitted"), Audit(property_id=other.id, status="scheduled")])
+    db.commit()
+    yield gm, managed, other
+    summary_cache.clear()
+
+def _summary(db, user, property_id=None):
+    return asyncio.run(dashboard_summary(property_id=property_id, limit=5, db=db, current_user=user))
+
+def test_gm_cannot_request_other_property(db, portfolio):
+    gm, _, other = portfolio
+    with pytest.raises(HTTPException) as error:
+        _summary(db, gm, other.id)
+    assert error.value.status_code == 403
+
+def test_gm_summary_is_scoped_to_managed_properties(db, portfolio):
+    gm, managed, _ = portfolio
+    for property_id in (managed.id, None):
+        summary = _summary(db, gm, property_id)
+        assert [audit["property_id"] for audit in summary["lists"]["recent_audits"]] == [managed.id]
+        assert summary["counts"]["audits_by_status"] == {"submitted": 1}
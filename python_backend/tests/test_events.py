@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.core.events import EventBus, InProcessEventBus
+from app.core.security import create_access_token
+from app.models.models import Audit, Property, PropertyManager, User
+from main import app
+
+def test_event_bus_is_abstract():
+    with pytest.raises(TypeError):
+        EventBus()
+
+    class PublishOnly(EventBus):
+        def publish(self, topics, payload):
+            pass
+
+    with pytest.raises(TypeError):
+        PublishOnly()
+
+def test_in_process_bus_delivers_to_topic_subscribers():
+    bus = InProcessEventBus()
+
+    async def main():
+        async with bus.subscribe("audit:1") as events:
+            bus.publish(["audit:2"], {"n": 0})
+            bus.publish(["audit:1", "property:3"], {"n": 1})
+            event = await asyncio.wait_for(events.__anext__(), 1)
+            assert bus.subscriber_count("audit:1") == 1
+        return event
+
+    assert asyncio.run(main()) == {"n": 1}
+    assert bus.subscriber_count() == 0
+
+@pytest.fixture
+def portfolio(db):
+    gm = User(username="gm", password="x", role="hotelgm", name="GM", email="gm@example.com")
+    managed = Property(name="Managed", location="L", region="North")
+    other = Property(name="Other", location="L", region="South")
+    db.add_all([gm, managed, other])
+    db.flush()
+    db.add(PropertyManager(user_id=gm.id, property_id=managed.id))
+    managed_audit = Audit(property_id=managed.id, status="in_progress")
+    other_audit = Audit(property_id=other.id, status="in_progress")
+    db.add_all([managed_audit, other_audit])
+    db.commit()
+    return create_access_token({"sub": gm.username}), managed, other, managed_audit, other_audit
+
+def test_gm_cannot_follow_unmanaged_property(db, portfolio):
+    token, managed, other, managed_audit, other_audit = portfolio
+    client = TestClient(app)
+    for path in (f"/api/events/properties/{other.id}", f"/api/events/audits/{other_audit.id}"):
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect(f"{path}?token={token}"):
+                pytest.fail(f"{path} accepted an unmanaged GM")
+        assert closed.value.code == status.WS_1008_POLICY_VIOLATION
+
+    with client.websocket_connect(f"/api/events/properties/{managed.id}?token={token}"):
+        pass
+    with client.websocket_connect(f"/api/events/audits/{managed_audit.id}?token={token}"):
+        pass
@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from fastapi import HTTPException, Response
+from app.api.endpoints import ai
+from app.core import cache
+from app.core.cache import SingleFlight, TTLCache
+from app.core.config import settings
+from app.models.models import IdempotencyResult
+
+def test_ttl_cache_expires_and_evicts(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    ttl_cache = TTLCache(ttl=10, maxsize=2)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    assert ttl_cache.get("a") == 1
+    ttl_cache.set("c", 3)
+    assert ttl_cache.get("b") is None  # least recently used
+    now[0] += 11
+    assert ttl_cache.get("a") is None
+    assert len(ttl_cache) == 1
+
+def test_single_flight_shares_one_computation():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": len(calls)}
+
+    async def main():
+        return await asyncio.gather(*(flights.do("key", compute) for _ in range(5)))
+
+    assert asyncio.run(main()) == [{"value": 1}] * 5
+    assert calls == [1]
+    assert "key" not in flights
+
+def _call(request_key, digest, key, compute, user_id=1):
+    response = Response()
+    result = asyncio.run(ai._single_flight(request_key, digest, key, user_id, response, compute))
+    return result, response.headers.get("Idempotent-Replayed")
+
+def _counter():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"run": len(calls)}
+    return compute, calls
+
+def test_idempotency_key_replays_stored_result(db, monkeypatch):
+    compute, calls = _counter()
+    assert _call("report:1", "d1", "key-1", compute) == ({"run": 1}, None)
+    # A fresh worker has no in-flight state, but the stored result is shared
+    monkeypatch.setattr(ai, "ai_flights", SingleFlight("ai_single_flight"))
+    assert _call("report:1", "d1", "key-1", compute) == ({"run": 1}, "true")
+    assert calls == [1]
+    assert db.query(IdempotencyResult).count() == 1
+
+def test_idempotency_key_is_scoped_to_user_and_inputs(db):
+    compute, calls = _counter()
+    _call("report:1", "d1", "key-1", compute)
+    assert _call("report:1", "d1", "key-1", compute, user_id=2) == ({"run": 2}, None)
+    assert _call("report:1", "d2", "key-1", compute) == ({"run": 3}, None)
+    assert len(calls) == 3
+
+def test_idempotency_key_reuse_for_other_request_is_rejected(db):
+    compute, _ = _counter()
+    _call("report:1", "d1", "key-1", compute)
+    with pytest.raises(HTTPException) as error:
+        _call("update-item-ai:7", "d1", "key-1", compute)
+    assert error.value.status_code == 422
+
+def test_expired_results_are_recomputed(db, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_TTL_SECONDS", -1)
+    compute, calls = _counter()
+    _call("report:1", "d1", "key-1", compute)
+    assert _call("report:1", "d1", "key-1", compute) == ({"run": 2}, None)
+    assert db.query(IdempotencyResult).count() == 1
@@ -0,0 +1,83 @@
+import asyncio
+from typing import List
+import pytest
+from app.schemas.schemas import ActionPlan, ReportGenerationResponse, ScoreSuggestionResponse
+from app.services.gemini_service import GeminiService
+from app.services.llm_output import JSONExtractor, LLMOutputError, extract_json, parse_output, response_schema
+from app.services.llm_providers import LLMProvider, LLMResponse
+
+SUGGESTION = '{"suggested_score": 72, "confidence": 0.8, "reasoning": "Clean", "compliance_zone": "amber"}'
+
+@pytest.mark.parametrize("text, value, outcome", [
+    ('{"a": 1}', {"a": 1}, "valid"),
+    ('Here you go:\n```json\n{"a": [1, 2]}\n```\nThanks', {"a": [1, 2]}, "extracted"),
+    ('{"a": "x}", "b": 2} trailing {"c": 3}', {"a": "x}", "b": 2}, "extracted"),
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}, "repaired"),
+    ('{"a": {"b": "cut off mid', {"a": {"b": "cut off mid"}}, "repaired"),
+    ('{"a": [1, 2', {"a": [1, 2]}, "repaired"),
+])
+def test_extract_json(text, value, outcome):
+    assert extract_json(text) == (value, outcome)
+
+def test_extract_json_without_json():
+    with pytest.raises(LLMOutputError):
+        extract_json("I cannot help with that")
+
+def test_extractor_stops_at_first_complete_value_when_streamed():
+    extractor = JSONExtractor()
+    chunks = ['Sure: {"a": "{', 'nested}", ', '"b": [1]}', ' and more {"x": 1}']
+    done = [extractor.feed(chunk) for chunk in chunks]
+    assert done == [False, False, True, True]
+    assert extractor.value() == '{"a": "{nested}", "b": [1]}'
+
+def test_parse_output_validates_against_model():
+    result, outcome = parse_output(f"```json\n{SUGGESTION}\n```", ScoreSuggestionResponse)
+    assert outcome == "extracted"
+    assert result["compliance_zone"] == "amber"
+
+    with pytest.raises(LLMOutputError) as error:
+        parse_output('{"suggested_score": "high", "confidence": 0.8}', ScoreSuggestionResponse)
+    assert any(message.startswith("suggested_score:") for message in error.value.errors)
+    assert any(message.startswith("reasoning:") for message in error.value.errors)
+
+def test_parse_output_keeps_extra_keys():
+    result, _ = parse_output('{"actions": [{"action": "Fix", "priority": "high", "owner": "GM"}], "note": 1}',
+                             ActionPlan)
+    assert result["note"] == 1
+    assert result["actions"][0]["issue"] is None
+
+def test_response_schema():
+    schema = response_schema(ScoreSuggestionResponse)
+    assert schema["required"] == ["suggested_score", "confidence", "reasoning", "compliance_zone"]
+    assert schema["properties"]["compliance_zone"] == {"type": "string", "enum": ["green", "amber", "red"]}
+    assert schema["properties"]["confidence"] == {"type": "number"}
+    # Free-form objects cannot be expressed in Gemini's schema subset
+    assert response_schema(ReportGenerationResponse) is None
+
+class ScriptedProvider(LLMProvider):
+    name = "scripted"
+
+    def __init__(self, answers: List[str]):
+        self.answers = list(answers)
+        self.tasks: List[str] = []
+
+    async def generate(self, task, prompt, images=None, json_output=False, schema=None, model=None):
+        self.tasks.append(task)
+        return LLMResponse(self.answers.pop(0), model or "scripted")
+
+def _suggest(answers, monkeypatch, repair_attempts=1):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "LLM_REPAIR_ATTEMPTS", repair_attempts)
+    provider = ScriptedProvider(answers)
+    service = GeminiService(provider)
+    result = asyncio.run(service._generate_json("score_suggestion", "prompt", ScoreSuggestionResponse))
+    return result, provider.tasks
+
+def test_invalid_output_gets_one_repair_call(monkeypatch):
+    result, tasks = _suggest(['{"suggested_score": "high"}', SUGGESTION], monkeypatch)
+    assert result["suggested_score"] == 72
+    assert tasks == ["score_suggestion", "score_suggestion_repair"]
+
+def test_repair_attempts_are_capped(monkeypatch):
+    with pytest.raises(LLMOutputError):
+        _suggest(["nope", "still nope", SUGGESTION], monkeypatch)
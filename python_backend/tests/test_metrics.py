@@ -0,0 +1,31 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from app.core.metrics import route_template
+
+def _templates(path: str) -> list:
+    router = APIRouter()
+
+    @router.get("/items/{item_id}")
+    def get_item(item_id: str):
+        return {}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/audits")
+    seen = []
+
+    async def capture(scope, receive, send):
+        await app(scope, receive, send)
+        if scope["type"] == "http":
+            seen.append(route_template(scope))
+
+    TestClient(capture).get(path)
+    return seen
+
+def test_route_template_includes_router_prefix():
+    assert _templates("/api/audits/items/7") == ["/api/audits/items/{item_id}"]
+
+def test_parameter_values_matching_literal_segments():
+    assert _templates("/api/audits/items/items") == ["/api/audits/items/{item_id}"]
+
+def test_unmatched_paths_share_one_label():
+    assert _templates("/api/audits/nothing/here") == ["unmatched"]
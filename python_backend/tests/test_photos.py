@@ -0,0 +1,85 @@
+import asyncio
+import base64
+import io
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from app.api.endpoints import audits
+from app.api.endpoints.audits import get_audit_item_photo, get_audit_item_photos
+from app.models.models import Audit, AuditItem, Property
+from app.services import photo_derivatives
+from app.services.photo_derivatives import DerivativeCache, photo_content, photo_digest
+
+PHOTO = "aGVsbG8gcGhvdG8="
+
+@pytest.fixture
+def items(db, tmp_path, monkeypatch):
+    cache = DerivativeCache(str(tmp_path / "photos"))
+    monkeypatch.setattr(photo_derivatives, "derivative_cache", cache)
+    prop = Property(name="P", location="L", region="North")
+    db.add(prop)
+    db.flush()
+    audit = Audit(property_id=prop.id, status="in_progress")
+    db.add(audit)
+    db.flush()
+    with_photo = AuditItem(audit_id=audit.id, category="Lobby", item="Floor", photos=[PHOTO])
+    without_photo = AuditItem(audit_id=audit.id, category="Lobby", item="Desk", photos=[])
+    db.add_all([with_photo, without_photo])
+    db.commit()
+    digest = photo_digest(PHOTO)
+    cache.put(digest, "thumb", "webp", b"thumbnail")
+    return with_photo, without_photo, digest
+
+def _serve(db, item_id, digest, fmt="webp"):
+    return asyncio.run(get_audit_item_photo(item_id, digest, "thumb", fmt, db=db, current_user=None))
+
+def test_cached_photo_is_served_for_its_item(db, items):
+    with_photo, _, digest = items
+    response = _serve(db, with_photo.id, digest)
+    assert response.path.endswith(f"{digest}-thumb.webp")
+
+def test_cached_photo_is_not_served_through_another_item(db, items):
+    _, without_photo, digest = items
+    with pytest.raises(HTTPException) as error:
+        _serve(db, without_photo.id, digest)
+    assert error.value.status_code == 404
+
+def _jpeg() -> str:
+    output = io.BytesIO()
+    Image.new("RGB", (640, 480), (200, 40, 40)).save(output, format="JPEG")
+    return base64.b64encode(output.getvalue()).decode()
+
+async def _render_inline(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+def test_photo_content_tells_raw_base64_from_paths():
+    jpeg = _jpeg()
+    assert jpeg.startswith("/9j/")
+    assert photo_content(jpeg) == jpeg
+    assert photo_content("/uploads/items/7/floor.jpg") is None
+    assert photo_content("/9j/not-really-an-image") is None
+    assert photo_content("https://cdn.example.com/floor.jpg") is None
+
+def test_raw_base64_jpeg_gets_derivatives(db, items, monkeypatch):
+    monkeypatch.setattr(photo_derivatives, "run_in_process", _render_inline)
+    with_photo, _, _ = items
+    jpeg = _jpeg()
+    with_photo.photos = [jpeg, "/uploads/items/floor.jpg"]
+    db.commit()
+
+    [photo] = asyncio.run(get_audit_item_photos(with_photo.id, format="jpeg", db=db, current_user=None))
+    assert (photo["index"], photo["digest"]) == (0, photo_digest(jpeg))
+    response = _serve(db, with_photo.id, photo["digest"], fmt="jpeg")
+    with Image.open(response.path) as thumbnail:
+        assert max(thumbnail.size) == 160
+
+def test_cache_hit_reads_stored_digests_only(db, items, monkeypatch):
+    with_photo, _, digest = items
+    assert with_photo.photo_digests == [{"index": 0, "digest": digest}]
+
+    def load_originals(photos):
+        raise AssertionError("originals were hashed on a cache hit")
+    monkeypatch.setattr(audits, "item_photos", load_originals)
+    assert _serve(db, with_photo.id, digest).path.endswith(f"{digest}-thumb.webp")
+    with pytest.raises(HTTPException):
+        _serve(db, with_photo.id, photo_digest("other photo"))
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+from pathlib import Path
+from sqlalchemy import null
+from app.models.models import Audit, Property
+from app.services.precompute import due_audit_ids
+
+def test_due_audits_include_sql_and_json_nulls(db):
+    prop = Property(name="P", location="L", region="North")
+    db.add(prop)
+    db.flush()
+    done = Audit(property_id=prop.id, status="submitted", ai_report={"summary": "ok"}, ai_insights={"insights": []})
+    json_null = Audit(property_id=prop.id, status="submitted", ai_report={"summary": "ok"}, ai_insights=None)
+    sql_null = Audit(property_id=prop.id, status="reviewed", ai_report=null(), ai_insights={"insights": []})
+    not_ready = Audit(property_id=prop.id, status="in_progress", ai_insights=None)
+    db.add_all([done, json_null, sql_null, not_ready])
+    db.commit()
+
+    assert due_audit_ids(db, 10, set()) == [json_null.id, sql_null.id]
+    assert due_audit_ids(db, 10, {json_null.id}) == [sql_null.id]
+
+def test_scheduler_registers_indexing_hooks():
+    # The scheduler runs without the API, so the hooks must come in through its own imports
+    code = ("import sys; from sqlalchemy import event; from sqlalchemy.orm import Session; "
+            "import app.services.precompute; "
+            "assert event.contains(Session, 'after_flush', sys.modules['app.services.search']._index_on_flush)")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parents[1])
@@ -0,0 +1,33 @@
+import pytest
+from app.core.profiling import _is_admin, _profiling_requested
+from app.core.security import create_access_token
+
+def _scope(query_string=b"", headers=()):
+    return {"type": "http", "query_string": query_string, "headers": list(headers)}
+
+@pytest.mark.parametrize("query_string, requested", [
+    (b"profile=1", True),
+    (b"format=webp&profile=1", True),
+    (b"noprofile=1", False),
+    (b"profile=10", False),
+    (b"q=profile=1", False),
+    (b"", False),
+])
+def test_profile_query_parameter(query_string, requested):
+    assert _profiling_requested(_scope(query_string)) is requested
+
+def test_profile_header():
+    assert _profiling_requested(_scope(headers=[(b"x-profile", b"1")]))
+
+@pytest.mark.parametrize("claims, admin", [
+    ({"sub": "admin", "role": "admin"}, True),
+    ({"sub": "sarah", "role": "auditor"}, False),
+    ({"sub": "admin"}, False),
+])
+def test_admin_check_uses_role_claim(claims, admin):
+    token = create_access_token(claims)
+    assert _is_admin(_scope(headers=[(b"authorization", f"Bearer {token}".encode())])) is admin
+
+def test_admin_check_rejects_invalid_tokens():
+    assert not _is_admin(_scope(headers=[(b"authorization", b"Bearer not-a-token")]))
+    assert not _is_admin(_scope())
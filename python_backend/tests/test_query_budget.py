@@ -0,0 +1,75 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app.core import query_budget
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.query_budget import QueryBudgetMiddleware, statement_shape
+from app.core.security import create_access_token
+from app.models.models import Audit, Property, User
+from app.services.dashboard import summary_cache
+from main import app as main_app
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    query_budget.instrument_engine(engine)
+    monkeypatch.setattr(settings, "QUERY_BUDGET_DEFAULT", 3)
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 100)
+    app = FastAPI()
+
+    @app.get("/queries/{count}")
+    def run_queries(count: int, db=Depends(get_db)):
+        for i in range(count):
+            db.execute(text(f"SELECT {i}"))
+        return {"ran": count}
+
+    return TestClient(QueryBudgetMiddleware(app))
+
+def test_statement_shape_collapses_literals():
+    assert statement_shape("SELECT * FROM t WHERE a = 'x' AND b IN (1, 2, 3) AND c = 4") == \
+        "SELECT * FROM t WHERE a = ? AND b IN (?) AND c = ?"
+
+def test_within_budget(client, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "raise")
+    response = client.get("/queries/2")
+    assert response.status_code == 200
+    assert "x-query-budget-violation" not in response.headers
+
+def test_violation_replaces_response_in_raise_mode(client, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "raise")
+    response = client.get("/queries/5")
+    assert response.status_code == 500
+    assert "5 statements exceeds budget of 3" in response.json()["detail"]
+    assert "GET /queries/{count}" in response.json()["detail"]
+
+def test_violation_is_reported_in_log_mode(client, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "log")
+    response = client.get("/queries/5")
+    assert response.status_code == 200
+    assert response.json() == {"ran": 5}
+    assert "exceeds budget of 3" in response.headers["x-query-budget-violation"]
+
+@pytest.fixture
+def api(engine, monkeypatch):
+    """The real application with budgets enforced; the suite otherwise runs with QUERY_BUDGET_MODE=off"""
+    query_budget.instrument_engine(engine)
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "raise")
+    return TestClient(QueryBudgetMiddleware(main_app))
+
+def test_dashboard_summary_stays_within_budget(db, api):
+    admin = User(username="admin", password="x", role="admin", name="Admin", email="admin@example.com")
+    properties = [Property(name=f"P{i}", location="L", region="North") for i in range(settings.N_PLUS_ONE_THRESHOLD * 2)]
+    db.add_all([admin, *properties])
+    db.flush()
+    db.add_all([Audit(property_id=prop.id, status="submitted") for prop in properties])
+    db.commit()
+    summary_cache.clear()
+
+    token = create_access_token({"sub": admin.username})
+    try:
+        response = api.get("/api/dashboard/summary?limit=20", headers={"Authorization": f"Bearer {token}"})
+    finally:
+        summary_cache.clear()
+    assert response.status_code == 200, response.json()
+    assert "x-query-budget-violation" not in response.headers
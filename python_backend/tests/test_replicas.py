@@ -0,0 +1,82 @@
+import time
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.core import database
+from app.core.database import PRIMARY_COOKIE, ReadYourWritesMiddleware, ReplicaSelector, get_db, get_read_db
+from app.models.models import Property
+from tests.conftest import sqlite_engine
+
+def _add_property(engine, name: str):
+    session = Session(bind=engine)
+    session.add(Property(name=name, location="L", region="R"))
+    session.commit()
+    session.close()
+
+@pytest.fixture
+def replica(engine, tmp_path, monkeypatch):
+    replica = sqlite_engine(tmp_path / "replica.db")
+    # Different marker rows tell which database served a read
+    _add_property(engine, "primary")
+    _add_property(replica, "replica")
+    monkeypatch.setattr(database, "_replica_engines", [replica])
+    yield replica
+    replica.dispose()
+
+@pytest.fixture
+def client(replica):
+    app = FastAPI()
+
+    @app.get("/read")
+    def read(db: Session = Depends(get_read_db)):
+        return {"source": db.query(Property.name).order_by(Property.id).first()[0]}
+
+    @app.post("/write")
+    def write(db: Session = Depends(get_db)):
+        db.add(Property(name="new", location="L", region="R"))
+        db.commit()
+        return {"ok": True}
+
+    app.add_middleware(ReadYourWritesMiddleware)
+    return TestClient(app)
+
+def test_reads_go_to_replica(client):
+    assert client.get("/read").json() == {"source": "replica"}
+
+def test_write_pins_next_read_to_primary(client):
+    response = client.post("/write")
+    assert PRIMARY_COOKIE in response.headers["set-cookie"]
+    assert client.get("/read").json() == {"source": "primary"}
+
+def test_expired_pin_reads_replica_again(client):
+    client.cookies.set(PRIMARY_COOKIE, str(int(time.time()) - 1))
+    assert client.get("/read").json() == {"source": "replica"}
+
+def test_reads_do_not_set_cookie(client):
+    assert "set-cookie" not in client.get("/read").headers
+
+def test_round_robin_alternates():
+    selector = ReplicaSelector("round_robin")
+    engines = ["a", "b"]
+    assert [selector.select(engines) for _ in range(4)] == ["a", "b", "a", "b"]
+
+def test_least_connections_picks_idle_replica(tmp_path):
+    busy, idle = sqlite_engine(tmp_path / "busy.db"), sqlite_engine(tmp_path / "idle.db")
+    selector = ReplicaSelector("least_connections")
+    connection = busy.connect()
+    try:
+        assert selector.select([busy, idle]) is idle
+    finally:
+        connection.close()
+    held = idle.connect()
+    try:
+        assert selector.select([busy, idle]) is busy
+    finally:
+        held.close()
+        busy.dispose()
+        idle.dispose()
+
+def test_unknown_strategy_rejected():
+    with pytest.raises(ValueError):
+        ReplicaSelector("random")
@@ -0,0 +1,42 @@
+import asyncio
+import os
+from app.models.models import Audit, AuditItem, Property
+from app.services import report_renderer
+from app.services.report_renderer import ReportCache, get_rendered_report
+
+async def _render_inline(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+def _audit(db) -> Audit:
+    prop = Property(name="P", location="L", region="North")
+    db.add(prop)
+    db.flush()
+    audit = Audit(property_id=prop.id, status="submitted", overall_score=80)
+    db.add(audit)
+    db.flush()
+    db.add(AuditItem(audit_id=audit.id, category="Lobby", item="Floor", score=4, comments="Clean"))
+    db.commit()
+    return audit
+
+def test_writes_do_not_touch_cache(db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ReportCache, "invalidate", lambda self, *args, **kwargs: calls.append(args))
+    audit = _audit(db)
+    audit.audit_items[0].comments = "Scuffed"
+    audit.notes = "Follow up"
+    db.commit()
+    assert calls == []
+
+def test_render_prunes_older_versions(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(report_renderer, "report_cache", ReportCache(str(tmp_path / "reports")))
+    monkeypatch.setattr(report_renderer, "run_in_process", _render_inline)
+    audit = _audit(db)
+
+    first = asyncio.run(get_rendered_report(audit))
+    assert asyncio.run(get_rendered_report(audit)) == first
+
+    audit.audit_items[0].comments = "Scuffed"
+    db.commit()
+    second = asyncio.run(get_rendered_report(audit))
+    assert second != first
+    assert os.listdir(tmp_path / "reports") == [os.path.basename(second)]
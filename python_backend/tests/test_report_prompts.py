@@ -0,0 +1,65 @@
+import asyncio
+import json
+from app.services.gemini_service import GeminiService
+from app.services.llm_providers import LLMProvider, LLMResponse
+from app.services.report_prompts import chunk_items, encode_items, estimate_tokens, fit_items
+
+def _items(category, count, comment="Carpet worn near the window and stained by the door " * 4):
+    return [{"category": category, "item": f"{category} {i}", "score": i % 5, "comments": comment}
+            for i in range(count)]
+
+def test_encode_items_drops_empty_trailing_fields():
+    items = [{"category": "Lobby", "item": "Desk", "score": 4, "comments": "", "photos_count": 0},
+             {"category": "Lobby", "item": "Floor", "score": 2, "comments": "Scuffed", "photos_count": 1}]
+    assert json.loads(encode_items(items)) == {"Lobby": [["Desk", 4], ["Floor", 2, "Scuffed", 1]]}
+
+def test_fit_items_trims_comments_before_giving_up():
+    items = _items("Lobby", 20)
+    full = encode_items(items, 1000)
+    encoded, fits = fit_items(items, estimate_tokens(full) // 2)
+    assert fits and len(encoded) < len(full)
+    trimmed, fits = fit_items(items, 10)
+    assert not fits and len(trimmed) < len(encoded)
+
+def test_chunk_items_splits_categories_within_budget():
+    items = _items("Lobby", 40) + _items("Spa", 3)
+    budget = 400
+    chunks = chunk_items(items, budget)
+    assert [category for category, _ in chunks].count("Spa") == 1
+    assert sum(len(part) for _, part in chunks) == len(items)
+    assert all(fit_items(part, budget)[1] for _, part in chunks)
+
+class SectionProvider(LLMProvider):
+    """Valid section analyses, except for categories named in broken"""
+    name = "sections"
+
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+        self.tasks = []
+
+    async def generate(self, task, prompt, images=None, json_output=False, schema=None, model=None):
+        self.tasks.append(task)
+        if task == "report_reduce":
+            text = json.dumps({"summary": "Combined", "key_findings": [], "recommendations": [],
+                               "compliance_overview": {}, "ai_insights": {}})
+        elif any(f'"{category}"' in prompt for category in self.broken):
+            text = "Sorry, no JSON today"
+        else:
+            text = json.dumps({"summary": "Fine", "key_findings": ["ok"], "recommendations": [],
+                               "compliance": "compliant"})
+        return LLMResponse(text, model or self.name)
+
+def test_map_reduce_marks_only_failed_sections(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "LLM_REPAIR_ATTEMPTS", 0)
+    provider = SectionProvider(broken=["Spa"])
+    service = GeminiService(provider)
+    items = _items("Lobby", 3) + _items("Spa", 2)
+
+    sections = asyncio.run(service.analyze_report_sections("Audit 1", items))
+    assert sections["Lobby"]["key_findings"] == ["ok"] and not sections["Lobby"].get("failed")
+    assert sections["Spa"]["failed"] and sections["Spa"]["compliance"] == "unknown"
+
+    report = asyncio.run(service.reduce_report_sections("Audit 1", sections))
+    assert report["summary"] == "Combined"
+    assert provider.tasks.count("report_section") == 2 and provider.tasks[-1] == "report_reduce"
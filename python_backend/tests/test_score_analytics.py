@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app.models.models import Audit, AuditItem, Property
+from app.services.score_analytics import (
+    PERCENTILES, SCORE_FIELDS, analyze_scores, auditor_bias, grouped_percentiles, outlier_audits, score_changes
+)
+
+START = datetime(2026, 1, 1)
+
+def _audits(rows):
+    """Columnar audits from (property_id, auditor_id, overall_score) rows, one day apart"""
+    count = len(rows)
+    audits = {
+        "id": np.arange(1, count + 1, dtype=np.int64),
+        "property_id": np.array([row[0] for row in rows], dtype=np.int64),
+        "auditor_id": np.array([row[1] for row in rows], dtype=np.int64),
+        "created_at": np.array([START + timedelta(days=i) for i in range(count)], dtype="datetime64[s]"),
+    }
+    for field in SCORE_FIELDS:
+        audits[field] = np.array([np.nan if row[2] is None else row[2] for row in rows], dtype=np.float64)
+    return audits
+
+def test_grouped_percentiles_match_numpy():
+    rng = np.random.default_rng(7)
+    groups = rng.integers(0, 4, 500)
+    groups[groups == 2] = 3  # group 2 stays empty
+    values = rng.normal(70, 12, 500)
+
+    table = grouped_percentiles(groups, values, 4)
+    for group in (0, 1, 3):
+        np.testing.assert_allclose(table[group], np.percentile(values[groups == group], PERCENTILES))
+    assert np.isnan(table[2]).all()
+
+def test_auditor_bias_flags_consistently_generous_auditor():
+    rng = np.random.default_rng(3)
+    rows = []
+    for property_id in range(1, 9):
+        base = 60 + property_id * 3
+        rows.append((property_id, 1, base + 12 + rng.normal(0, 1)))
+        rows.append((property_id, 2, base + rng.normal(0, 1)))
+        rows.append((property_id, 3, base + rng.normal(0, 1)))
+
+    result = auditor_bias(_audits(rows), min_audits=5)
+    # Property means include the generous auditor, so the others sit 4 points below them
+    assert [entry["auditor_id"] for entry in result][0] == 1
+    bias = {entry["auditor_id"]: entry for entry in result}
+    assert bias[1]["flagged"] and bias[1]["audits"] == 8
+    assert bias[1]["bias"] == pytest.approx(8, abs=1.5)
+    assert bias[2]["bias"] == pytest.approx(-4, abs=1.5)
+    assert bias[1]["t_statistic"] > abs(bias[2]["t_statistic"])
+
+def test_auditor_bias_ignores_properties_audited_once():
+    rows = [(1, 1, 90.0), (2, 2, 50.0), (3, 2, 55.0)]
+    assert auditor_bias(_audits(rows), min_audits=1) == []
+
+def test_score_changes_compare_last_two_windows():
+    rows = ([(1, 1, 90.0)] * 3 + [(1, 1, 70.0)] * 3      # drop of 20
+            + [(2, 1, 80.0)] * 6                          # stable
+            + [(3, 1, 90.0)] * 2 + [(3, 1, 60.0)] * 3     # too few audits
+            + [(4, 1, 90.0), (4, 1, None), (4, 1, 90.0)] + [(4, 1, 60.0)] * 3)  # window with a gap
+    changes = score_changes(_audits(rows), limit=10)
+    overall = [change for change in changes if change["score"] == "overall_score"]
+    assert overall == [{"property_id": 1, "score": "overall_score", "previous_mean": 90.0,
+                        "recent_mean": 70.0, "change": -20.0}]
+
+def test_outlier_audits():
+    rows = [(i % 5 + 1, 1, 80.0 + (i % 3)) for i in range(40)] + [(1, 1, 10.0)]
+    [outlier] = outlier_audits(_audits(rows), limit=5)
+    assert outlier["audit_id"] == 41 and outlier["z_score"] < -3
+
+def test_analyze_scores_end_to_end(db):
+    prop = Property(name="P", location="L", region="North")
+    other = Property(name="Q", location="L", region="South")
+    db.add_all([prop, other])
+    db.flush()
+    for i, score in enumerate([60, 70, 80, 90]):
+        audit = Audit(property_id=prop.id, overall_score=score, created_at=START + timedelta(days=i))
+        db.add(audit)
+        db.flush()
+        db.add(AuditItem(audit_id=audit.id, category="Lobby", item="Floor", score=i + 1))
+    db.add(Audit(property_id=other.id, overall_score=10, created_at=START))
+    db.commit()
+
+    result = analyze_scores(db, region="North")
+    assert result["audits"] == 4 and result["items"] == 4
+    assert result["percentiles"]["overall_score"]["p50"] == 75.0
+    assert result["category_percentiles"]["Lobby"]["p50"] == 2.5
@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from app.api.endpoints.search import search as search_endpoint
+from app.models.models import Audit, AuditItem, Property
+from app.services import search
+from app.services.search import highlight_html, search_documents
+
+def _item(db, comments: str) -> AuditItem:
+    prop = Property(name="P", location="L", region="North")
+    db.add(prop)
+    db.flush()
+    audit = Audit(property_id=prop.id, status="submitted")
+    db.add(audit)
+    db.flush()
+    item = AuditItem(audit_id=audit.id, category="Lobby", item="Floor", comments=comments)
+    db.add(item)
+    db.commit()
+    return item
+
+def test_highlight_escapes_source_text(db):
+    _item(db, 'Mould behind sink <img src=x onerror="alert(1)"> reported')
+    [result] = search_documents(db, "mould")
+    assert "<img" not in result["highlight"]
+    assert "&lt;img" in result["highlight"]
+    assert "<mark>Mould</mark>" in result["highlight"]
+
+def test_highlight_html_marks_only_sentinels():
+    assert highlight_html("a \x02<b>\x03 c") == "a <mark>&lt;b&gt;</mark> c"
+    assert highlight_html(None) == ""
+
+def test_indexed_text_strips_sentinels(db):
+    _item(db, "stain \x02<script>\x03 near bed")
+    [result] = search_documents(db, "stain")
+    assert "<script>" not in result["highlight"]
+    assert result["highlight"].count("<mark>") == 1
+
+def test_only_indexed_changes_reindex(db, monkeypatch):
+    item = _item(db, "Cracked tile")
+    calls = []
+    original = search.index_changes
+    monkeypatch.setattr(search, "index_changes", lambda *args: calls.append(args) or original(*args))
+
+    item.ai_suggested_score = 80
+    item.version = item.version + 1
+    db.commit()
+    assert calls == []
+
+    item.comments = "Cracked tile replaced"
+    db.commit()
+    assert len(calls) == 1
+    assert [r["item_id"] for r in search_documents(db, "replaced")] == [item.id]
+
+def test_unsupported_database_answers_501():
+    mysql = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(search_endpoint(q="mould", property_id=None, region=None, date_from=None, date_to=None,
+                                    source=None, limit=20, offset=0, db=mysql, current_user=None))
+    assert error.value.status_code == 501
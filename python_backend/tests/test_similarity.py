@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime
+import pytest
+from fastapi import BackgroundTasks
+from sqlalchemy import event
+from app.api.endpoints.audits import sync_audit_items
+from app.models.models import Audit, AuditItem, FindingEmbedding, Property, User
+from app.schemas.schemas import SyncItemChange, SyncRequest
+from app.services import similarity
+from app.services.similarity import FindingIndex, IndexNotReady, find_similar, index_findings
+
+def _audit(db):
+    user = User(username="auditor", password="x", role="auditor", name="A", email="a@example.com")
+    prop = Property(name="P", location="L", region="North")
+    db.add_all([user, prop])
+    db.flush()
+    audit = Audit(property_id=prop.id, auditor_id=user.id, status="in_progress")
+    db.add(audit)
+    db.flush()
+    items = [AuditItem(audit_id=audit.id, category="Bathroom", item="Shower", comments="Mould on shower grout"),
+             AuditItem(audit_id=audit.id, category="Lobby", item="Desk", comments="Desk scratched")]
+    db.add_all(items)
+    db.commit()
+    return user, items
+
+def test_similar_findings_wait_for_index(db, monkeypatch):
+    _, (shower, desk) = _audit(db)
+    monkeypatch.setattr(similarity, "finding_index", FindingIndex())
+
+    async def main():
+        await index_findings(item_ids=[shower.id, desk.id])
+        # A fresh worker has not loaded the index yet; the first request starts the load
+        fresh = FindingIndex()
+        monkeypatch.setattr(similarity, "finding_index", fresh)
+        with pytest.raises(IndexNotReady):
+            await find_similar(db, "grout mould in shower")
+        await fresh.load()
+        return await find_similar(db, "grout mould in shower", limit=1)
+
+    [result] = asyncio.run(main())
+    assert result["item_id"] == shower.id
+
+def test_sync_schedules_reindex_for_comment_edits(db):
+    user, (shower, desk) = _audit(db)
+    now = datetime.utcnow()
+    request = SyncRequest(changes=[
+        SyncItemChange(item_id=shower.id, version=1, client_updated_at=now, comments="Grout cleaned"),
+        SyncItemChange(item_id=desk.id, version=1, client_updated_at=now, score=4),
+    ])
+    background_tasks = BackgroundTasks()
+    result = asyncio.run(sync_audit_items(request, background_tasks, db, user))
+
+    assert sorted(result["applied"]) == sorted([shower.id, desk.id])
+    [task] = background_tasks.tasks
+    assert task.func is index_findings
+    assert task.kwargs["item_ids"] == [shower.id]
+
+def test_reindex_replaces_rows_with_one_delete(db, engine, monkeypatch):
+    _, (shower, desk) = _audit(db)
+    audit_id = shower.audit_id
+    db.get(Audit, audit_id).findings = {"summary": "Mould in guest bathrooms"}
+    db.commit()
+    monkeypatch.setattr(similarity, "finding_index", FindingIndex())
+    asyncio.run(index_findings(item_ids=[shower.id, desk.id], audit_ids=[audit_id]))
+
+    deletes = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("DELETE FROM finding_embeddings"):
+            deletes.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        asyncio.run(index_findings(item_ids=[shower.id, desk.id], audit_ids=[audit_id]))
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    db.expire_all()
+    rows = db.query(FindingEmbedding).all()
+    assert len(deletes) == 1
+    assert sorted(row.source for row in rows) == ["findings", "item_comment", "item_comment"]
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+import pytest
+from app.core.config import settings
+from app.models.models import Audit, AuditItem, Property, User
+from app.schemas.schemas import SyncItemChange, SyncRequest
+from app.services.sync import apply_sync
+
+NOW = datetime(2026, 10, 1, 12, 0)
+
+@pytest.fixture
+def assignment(db):
+    auditor = User(username="auditor", password="x", role="auditor", name="A", email="a@example.com")
+    other = User(username="other", password="x", role="auditor", name="B", email="b@example.com")
+    prop = Property(name="P", location="L", region="North")
+    db.add_all([auditor, other, prop])
+    db.flush()
+    mine = Audit(property_id=prop.id, auditor_id=auditor.id, status="in_progress")
+    theirs = Audit(property_id=prop.id, auditor_id=other.id, status="in_progress")
+    db.add_all([mine, theirs])
+    db.flush()
+    items = [AuditItem(audit_id=mine.id, category="Lobby", item="Floor", score=3),
+             AuditItem(audit_id=mine.id, category="Lobby", item="Desk", score=4),
+             AuditItem(audit_id=theirs.id, category="Spa", item="Pool", score=2)]
+    db.add_all(items)
+    db.commit()
+    return auditor, items
+
+def _change(item, minutes, version=1, **fields):
+    return SyncItemChange(item_id=item.id, version=version, client_updated_at=NOW + timedelta(minutes=minutes), **fields)
+
+def test_edits_to_one_item_merge_in_client_time_order(db, assignment):
+    auditor, (floor, _, _) = assignment
+    result = apply_sync(db, auditor, SyncRequest(changes=[
+        _change(floor, 2, score=5),
+        _change(floor, 1, score=1, comments="Scuffed"),
+    ]))
+    assert result["applied"] == [floor.id]
+    db.expire_all()
+    item = db.get(AuditItem, floor.id)
+    assert (item.score, item.comments, item.version) == (5, "Scuffed", 2)
+
+def test_stale_version_is_a_conflict_with_server_copy(db, assignment):
+    auditor, (floor, desk, _) = assignment
+    floor.score, floor.version = 2, 2
+    db.commit()
+
+    result = apply_sync(db, auditor, SyncRequest(changes=[_change(floor, 1, score=5), _change(desk, 1, score=1)]))
+    assert result["applied"] == [desk.id]
+    [conflict] = result["conflicts"]
+    assert (conflict.item_id, conflict.reason, conflict.client_version) == (floor.id, "version", 1)
+    assert (conflict.server.score, conflict.server.version) == (2, 2)
+    db.expire_all()
+    assert db.get(AuditItem, floor.id).score == 2
+
+def test_retried_edit_is_not_a_conflict(db, assignment):
+    auditor, (floor, _, _) = assignment
+    request = SyncRequest(changes=[_change(floor, 1, score=5)])
+    apply_sync(db, auditor, request)
+    # The response was lost; the device resends the same edit against the old version
+    result = apply_sync(db, auditor, request)
+    assert result["applied"] == [floor.id] and result["conflicts"] == []
+    db.expire_all()
+    assert db.get(AuditItem, floor.id).version == 2
+
+def test_empty_change_at_stale_version_is_a_conflict(db, assignment):
+    auditor, (floor, desk, _) = assignment
+    floor.version = 2
+    db.commit()
+
+    result = apply_sync(db, auditor, SyncRequest(changes=[_change(floor, 1), _change(desk, 1)]))
+    assert result["applied"] == [desk.id]
+    assert [(conflict.item_id, conflict.reason) for conflict in result["conflicts"]] == [(floor.id, "version")]
+    db.expire_all()
+    assert (db.get(AuditItem, floor.id).version, db.get(AuditItem, desk.id).version) == (2, 1)
+
+def test_items_outside_scope_are_rejected(db, assignment):
+    auditor, (_, _, pool) = assignment
+    result = apply_sync(db, auditor, SyncRequest(changes=[
+        _change(pool, 1, score=5),
+        SyncItemChange(item_id=9999, version=1, client_updated_at=NOW, score=1),
+    ]))
+    assert result["applied"] == []
+    assert sorted((c.item_id, c.reason) for c in result["conflicts"]) == [(pool.id, "forbidden"), (9999, "not_found")]
+
+def test_cursor_overlap_returns_recent_changes_again(db, assignment):
+    auditor, (floor, desk, pool) = assignment
+    first = apply_sync(db, auditor, SyncRequest())
+    assert sorted(item.id for item in first["items"]) == [floor.id, desk.id]
+
+    cursor = first["cursor"]
+    overlap = timedelta(seconds=settings.SYNC_CURSOR_OVERLAP_SECONDS)
+    # Committed just before the cursor was taken, e.g. by a transaction still open during the sync
+    db.query(AuditItem).filter(AuditItem.id == floor.id).update({"updated_at": cursor - overlap / 2})
+    db.query(AuditItem).filter(AuditItem.id == desk.id).update({"updated_at": cursor - overlap * 2})
+    db.commit()
+
+    second = apply_sync(db, auditor, SyncRequest(cursor=cursor))
+    assert [item.id for item in second["items"]] == [floor.id]
+    assert second["cursor"] >= cursor